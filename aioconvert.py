@@ -0,0 +1,312 @@
+#!python3
+
+import asyncio
+import concurrent.futures
+import os
+import os.path
+import threading
+import time
+import converter
+
+# options of excel-to-json-3.py taken by Options, and their defaults.
+DEFAULTS = {
+    'origin': 'A1',
+    'columns': None,
+    'url': None,
+    'noheader': False,
+    'text': False,
+    'textmode': 'bulk',
+    'formula': False,
+    'invisible': True,
+    'backend': 'excel',
+    'compact': False,
+    'block': 0,
+    'layout': 'rows',
+    'ndjson': False,
+    'offset_every': 1,
+    'rows_per_file': 0,
+    'fast': False,
+    'recycle': 50,
+    'verbose': False,
+}
+
+class Options(object):
+    """
+    options of a conversion, named as the command line options of excel-to-json-3.py.
+    Options(url='C', layout='records'); an unknown name raises TypeError,
+    a combination the command line refuses raises ValueError.
+    """
+    def __init__(self, **options):
+        unknown = set(options) - set(DEFAULTS)
+        if unknown:
+            raise TypeError('unknown options: %s' % ', '.join(sorted(unknown)))
+        self.__dict__.update(DEFAULTS)
+        self.__dict__.update(options)
+        if self.backend == 'xlsx' and (self.text or self.formula):
+            raise ValueError('text and formula need the excel backend')
+        if self.ndjson and self.layout in ('columns', 'runs'):
+            raise ValueError('ndjson writes rows or records, not columns or runs')
+        if self.offset_every < 1 or self.rows_per_file < 0:
+            raise ValueError('offset_every must be 1 or more, rows_per_file 0 or more')
+        if self.block < 0:
+            raise ValueError('block must be 0 or more')
+    
+    def namespace(self, filename=None, dest=None):
+        """
+        returns args of the converter for a book; options the async API does not take
+        are left as the command line gives them.
+        """
+        return converter.load().default_args(filename=filename, dest=dest, **vars(self))
+
+class Progress(object):
+    """
+    an event of a conversion.
+    kind: 'sheet' when a sheet is written, with position (0-based), title and rows,
+    'book' when index.json is, with index, or 'failed' with error.
+    seconds: since the book began converting.
+    """
+    __slots__ = ('kind', 'filename', 'position', 'title', 'rows', 'index', 'error', 'seconds')
+    
+    def __init__(self, kind, filename, seconds, position=None, title=None, rows=None,
+                 index=None, error=None):
+        self.kind = kind
+        self.filename = filename
+        self.seconds = seconds
+        self.position = position
+        self.title = title
+        self.rows = rows
+        self.index = index
+        self.error = error
+    
+    def __repr__(self):
+        if self.kind == 'sheet':
+            return '<sheet %d %s of %s: %d rows>' % (self.position, self.title, self.filename,
+                                                     self.rows)
+        if self.kind == 'book':
+            return '<book %s: %d sheets>' % (self.filename, len(self.index))
+        return '<failed %s: %s>' % (self.filename, self.error)
+
+def read_book(pool, args, emit):
+    """
+    reads sheets of a book with an app of pool, on the thread of the pool.
+    emits ('params', params), then ('sheet', position, title, data) per sheet to convert.
+    rows of args.block are read here too, as COM objects belong to this thread.
+    """
+    x = converter.load()
+    
+    def read(app):
+        with x.ExcelBook(app, args.filename, read_only=args.fast) as book:
+            sheets = book.Worksheets
+            first = x.SheetGeometry(sheets[0], args.origin)
+            params = x.make_params(args, first.sheet, first)
+            emit(('params', params))
+            for position, sheet in enumerate(sheets):
+                geometry = first if position == 0 else x.SheetGeometry(sheet, args.origin)
+                data = x.convert_sheet(params, args, sheet, geometry)
+                if data is None:
+                    continue
+                if not isinstance(data, (tuple, list)):
+                    data = list(data)
+                emit(('sheet', position, sheet.name, data))
+    pool.convert(read)
+
+def encode_sheet(args, temp_base, data, params):
+    """
+    writes a sheet into temporary files, in a worker of the encoding pool.
+    returns what write_temps does.
+    """
+    return converter.load().write_temps(args, temp_base, data, params)
+
+class Instance(object):
+    """
+    an Excel instance on a thread of its own, as COM objects stay on the thread
+    which created them. the ExcelPool recycles it as the command line does.
+    """
+    def __init__(self, factory, recycle):
+        self.factory = factory
+        self.recycle = recycle
+        self.executor = concurrent.futures.ThreadPoolExecutor(1)
+        self.pool = None
+    
+    def read(self, args, emit):
+        """
+        reads a book on the thread; emits ('end',) at last, even on failure.
+        """
+        if self.pool is None:
+            self.pool = converter.load().ExcelPool(self.factory, self.recycle)
+        try:
+            read_book(self.pool, args, emit)
+        finally:
+            emit(('end',))
+    
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+
+class AsyncConverter(object):
+    """
+    converts books from asyncio.
+    instances: Excel instances, each reading books on a thread of its own.
+    limit: books converted at once, all instances together; more books wait.
+    no more than limit sheets are held waiting for or in encoding, all books together;
+    an instance waits to hand over the next sheet until one is written.
+    workers: an executor encoding sheets into files,
+    a process pool of the CPU count by default.
+    factory: returns an ExcelApp like context; called on the thread of an instance.
+    an instance is free for the next book when a book is read,
+    while its sheets are still encoded.
+    
+    async with AsyncConverter(Options(url='C'), instances=2) as converter:
+        async for progress in converter.convert_many([(filename, dest), ...]):
+            print(progress)
+    """
+    def __init__(self, options=None, instances=1, limit=4, workers=None, factory=None):
+        self.options = options or Options()
+        self.count = instances
+        self.limit = limit
+        self.workers = workers
+        self.own_workers = workers is None
+        if factory is None:
+            x = converter.load()
+            args = self.options.namespace()
+            factory = lambda: x.make_app(args, coinitialize=args.backend == 'excel')
+        self.factory = factory
+        self.instances = None
+        self.free = None
+        self.running = None
+        self.sheets = None
+    
+    async def __aenter__(self):
+        if self.own_workers:
+            self.workers = concurrent.futures.ProcessPoolExecutor()
+        self.instances = [Instance(self.factory, self.options.recycle)
+                          for i in range(self.count)]
+        self.free = asyncio.Queue()
+        for instance in self.instances:
+            self.free.put_nowait(instance)
+        self.running = asyncio.Semaphore(self.limit)
+        self.sheets = asyncio.Semaphore(self.limit)
+        return self
+    
+    async def __aexit__(self, type, value, traceback):
+        loop = asyncio.get_running_loop()
+        for instance in self.instances:
+            # quit Excel on the thread which started it.
+            await loop.run_in_executor(instance.executor, instance.close)
+            instance.executor.shutdown()
+        if self.own_workers:
+            self.workers.shutdown()
+    
+    async def convert(self, filename, dest, events=None):
+        """
+        converts a book into dest, putting Progress into events, an asyncio.Queue.
+        returns index; raises what failed the book.
+        """
+        loop = asyncio.get_running_loop()
+        events = events if events is not None else asyncio.Queue()
+        args = self.options.namespace(filename, dest)
+        async with self.running:
+            start = time.perf_counter()
+            encoding = []
+            reading = None
+            items = asyncio.Queue(maxsize=self.limit)
+            aborted = threading.Event()
+            
+            def emit(item):
+                # on the thread of the instance; waits for room in items, unless aborted.
+                if not aborted.is_set():
+                    asyncio.run_coroutine_threadsafe(items.put(item), loop).result()
+            
+            try:
+                os.makedirs(dest, exist_ok=True)
+                instance = await self.free.get()
+                reading = loop.run_in_executor(instance.executor, instance.read, args, emit)
+                reading.add_done_callback(lambda future: self.free.put_nowait(instance))
+                params = None
+                while True:
+                    item = await items.get()
+                    if item[0] == 'end':
+                        break
+                    if item[0] == 'params':
+                        params = item[1]
+                        continue
+                    position, title, data = item[1:]
+                    await self.sheets.acquire()
+                    encoding.append(asyncio.ensure_future(self.encode(
+                        args, params, position, title, data, start, events)))
+                await reading
+                done = await asyncio.gather(*encoding)
+                x = converter.load()
+                index = await run_through(None, x.place_sheets, params, args, done)
+            except BaseException as e:
+                # failed or cancelled; let the reader finish and remove partial files.
+                aborted.set()
+                try:
+                    await self.drain(items, reading)
+                    await asyncio.gather(*encoding, return_exceptions=True)
+                finally:
+                    converter.load().remove_temps(dest)
+                if isinstance(e, Exception):
+                    events.put_nowait(Progress('failed', filename, time.perf_counter() - start,
+                                               error=e))
+                raise
+            events.put_nowait(Progress('book', filename, time.perf_counter() - start,
+                                       index=index))
+            return index
+    
+    async def drain(self, items, reading):
+        """
+        takes items until the reader ends, so that it is not left waiting for room.
+        """
+        if reading is None:
+            return
+        while not reading.done():
+            getter = asyncio.ensure_future(items.get())
+            await asyncio.wait({getter, reading}, return_when=asyncio.FIRST_COMPLETED)
+            getter.cancel()
+        await asyncio.gather(reading, return_exceptions=True)
+    
+    async def encode(self, args, params, position, title, data, start, events):
+        """
+        encodes a sheet in a worker. returns (position, title, files written).
+        """
+        temp_base = os.path.join(args.dest, '.sheet%d' % position)
+        try:
+            written = await run_through(self.workers, encode_sheet, args, temp_base, data, params)
+        finally:
+            self.sheets.release()
+        events.put_nowait(Progress('sheet', args.filename, time.perf_counter() - start,
+                                   position, title, sum(w[1] for w in written)))
+        return (position, title, written)
+    
+    async def convert_many(self, books):
+        """
+        converts books, [(filename, dest)], yielding Progress of sheets and books
+        as they complete. a failed book yields 'failed' and the others go on.
+        """
+        events = asyncio.Queue()
+        tasks = [asyncio.ensure_future(self.convert(filename, dest, events))
+                 for filename, dest in books]
+        remaining = len(tasks)
+        try:
+            while remaining:
+                progress = await events.get()
+                if progress.kind != 'sheet':
+                    remaining -= 1
+                yield progress
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+async def run_through(executor, function, *args):
+    """
+    calls function in executor. a call running cannot be stopped;
+    when cancelled, waits for it to end, so that files it writes can be removed.
+    """
+    future = asyncio.get_running_loop().run_in_executor(executor, function, *args)
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        await asyncio.wait({future})
+        raise
@@ -0,0 +1,122 @@
+#!python3
+
+import argparse
+import random
+import re
+import time
+import cellrange
+import converter
+
+class RegexHelper:
+    """
+    AddressHelper as it was, parsing with regular expressions on every call.
+    """
+    p1 = re.compile(r'^([$\w]+)(?::([$\w]+))?$')
+    p2 = re.compile(r'\$')
+    p3 = re.compile(r'(\$?[a-zA-Z]+)(\$?[0-9]+)')
+    p4 = re.compile(r'\$?([a-zA-Z]+)\$?([0-9]+)')
+    p5 = re.compile(r'(?<!\$)((?<![a-zA-Z])[a-zA-Z]+|(?<![0-9])[0-9]+)')
+    
+    @classmethod
+    def split(cls, address):
+        return cls.p1.match(address).groups()
+    
+    @classmethod
+    def begin_at(cls, address):
+        return cls.split(address)[0]
+    
+    @classmethod
+    def end_at(cls, address):
+        range = cls.split(address)
+        return range[1] if range[1] else range[0]
+    
+    @classmethod
+    def col_row(cls, address, absolute=None):
+        if absolute == None:
+            cr = cls.p3.match(address).groups()
+        elif absolute == False:
+            cr = cls.p4.match(address).groups()
+        else:
+            cr = cls.p3.match(re.sub(cls.p5, r'$\1', address)).groups()
+        return cr
+    
+    @classmethod
+    def col(cls, address):
+        return cls.col_row(address, False)[0]
+    
+    @classmethod
+    def row(cls, address):
+        return int(cls.col_row(address, False)[1])
+
+def make_addresses(n, distinct):
+    """
+    returns n range addresses drawn from distinct ones, some absolute.
+    """
+    random.seed(1)
+    pool = []
+    for i in range(distinct):
+        row = random.randint(1, cellrange.MAX_ROW - 100)
+        col = random.randint(1, cellrange.MAX_COL - 10)
+        pool.append(cellrange.range_address(row, col, row + random.randint(1, 100),
+                                            col + random.randint(0, 10), i % 3 == 0))
+    return [pool[random.randrange(distinct)] for i in range(n)]
+
+def with_regex(addresses):
+    """
+    rows and columns of both ends, then the same range moved down a row.
+    """
+    h = RegexHelper
+    out = []
+    for a in addresses:
+        begin, end = h.begin_at(a), h.end_at(a)
+        row1, row2 = h.row(begin), h.row(end)
+        out.append('%s%d:%s%d' % (h.col(begin), row1 + 1, h.col(end), row2 + 1))
+    return out
+
+def with_helper(helper):
+    def run(addresses):
+        h = helper
+        out = []
+        for a in addresses:
+            begin, end = h.begin_at(a), h.end_at(a)
+            row1, row2 = h.row(begin), h.row(end)
+            out.append('%s%d:%s%d' % (h.col(begin), row1 + 1, h.col(end), row2 + 1))
+        return out
+    return run
+
+def with_coordinates(addresses):
+    parse_range = cellrange.parse_range
+    offset = cellrange.offset
+    range_address = cellrange.range_address
+    return [range_address(*offset(parse_range(a), 1, 0)) for a in addresses]
+
+def main():
+    """
+    parses and rewrites range addresses with the regex helper as it was,
+    AddressHelper over cellrange, and cellrange directly.
+    
+    bench-address.py --count 2000000 --distinct 1000
+    """
+    parser = argparse.ArgumentParser(description='address parsing throughput')
+    parser.add_argument('--count', type=int, default=1000000, help='addresses to parse')
+    parser.add_argument('--distinct', type=int, default=1000, help='distinct addresses among them')
+    args = parser.parse_args()
+    
+    x = converter.load()
+    addresses = make_addresses(args.count, args.distinct)
+    expected = None
+    print('%-12s %10s %14s' % ('engine', 'seconds', 'addresses/sec'))
+    for name, run in (('regex', with_regex), ('helper', with_helper(x.AddressHelper)),
+                      ('cellrange', with_coordinates)):
+        cellrange.parse_range.cache_clear()
+        start = time.perf_counter()
+        out = run(addresses)
+        elapsed = time.perf_counter() - start
+        if expected is None:
+            expected = out
+        elif out != expected:
+            print('%s differs from regex' % name)
+        print('%-12s %10.3f %14.0f' % (name, elapsed, args.count / elapsed))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+#!python3
+
+import argparse
+import asyncio
+import concurrent.futures
+import contextlib
+import filecmp
+import functools
+import io
+import os
+import shutil
+import tempfile
+import time
+import aioconvert
+import converter
+import fakeexcel
+
+def make_books(n, sheets, rows):
+    """
+    returns a registry of n small books of some sheets, shared by fake applications.
+    """
+    books = {}
+    app = fakeexcel.FakeApplication(books=books)
+    for i in range(n):
+        book = app.Workbooks.add('book%04d.xlsx' % i)
+        for s in range(sheets):
+            data = [('id', 'name', 'value')] + [(float(r), 'name%d-%d' % (i, r), r * 0.5)
+                                                 for r in range(rows)]
+            book.add_sheet('sheet%d' % s, data)
+    return books
+
+def same_tree(left, right):
+    """
+    tells if two directories have the same files of the same content, recursively.
+    """
+    compared = filecmp.dircmp(left, right)
+    if compared.left_only or compared.right_only or compared.funny_files:
+        return False
+    match, mismatch, errors = filecmp.cmpfiles(left, right, compared.common_files, shallow=False)
+    if mismatch or errors:
+        return False
+    return all(same_tree(os.path.join(left, d), os.path.join(right, d))
+               for d in compared.common_dirs)
+
+async def convert_async(books, dest, dispatch, instances, limit, workers):
+    """
+    returns (sheet events, book events, failed events, the most books in flight).
+    """
+    x = converter.load()
+    factory = lambda: x.ExcelApp(visible=False, dispatch=dispatch)
+    counts = {'sheet': 0, 'book': 0, 'failed': 0}
+    async with aioconvert.AsyncConverter(aioconvert.Options(), instances, limit, workers,
+                                         factory) as service:
+        jobs = [(f, os.path.join(dest, os.path.splitext(f)[0])) for f in books]
+        async for progress in service.convert_many(jobs):
+            counts[progress.kind] += 1
+    return counts
+
+def main():
+    """
+    pushes hundreds of small fake books through the asyncio API,
+    with one and more Excel instances, and compares with the sequential batch.
+    the fake waits its latency with time.sleep, letting other threads run
+    as a call to Excel out of process does. a missing book fails on the way.
+    outputs of every run are compared with those of the batch.
+    
+    bench-async.py --books 500 --instances 4 --limit 16
+    """
+    parser = argparse.ArgumentParser(description='asyncio API load test on a fake Excel')
+    parser.add_argument('--books', type=int, default=300, help='number of books')
+    parser.add_argument('--sheets', type=int, default=3, help='sheets per book')
+    parser.add_argument('--rows', type=int, default=200, help='rows per sheet')
+    parser.add_argument('--latency', type=float, default=200.0, help='microseconds per call')
+    parser.add_argument('--startup', type=float, default=50.0, help='milliseconds to start Excel')
+    parser.add_argument('--instances', type=int, default=4, help='Excel instances')
+    parser.add_argument('--limit', type=int, default=16, help='books converted at once')
+    args = parser.parse_args()
+    
+    x = converter.load()
+    books = make_books(args.books, args.sheets, args.rows)
+    filenames = sorted(books)
+    filenames.insert(len(filenames) // 2, 'missing.xlsx')
+    dispatch = functools.partial(fakeexcel.DispatchEx, latency=args.latency * 1e-6,
+                                 startup=args.startup / 1000.0, books=books, wait=time.sleep)
+    
+    dest = tempfile.mkdtemp()
+    try:
+        report = []
+        batch_dest = os.path.join(dest, 'batch')
+        options = aioconvert.Options().namespace(batch_dest, batch_dest)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = x.excel_to_json_batch(
+                options, filenames, lambda: x.ExcelApp(visible=False, dispatch=dispatch))
+        report.append(('batch', 1, time.perf_counter() - start,
+                       {'book': sum(1 for r in results if r[2] is not None),
+                        'failed': sum(1 for r in results if r[2] is None)}, True))
+        
+        runs = [('async thread', 1, concurrent.futures.ThreadPoolExecutor(1)),
+                ('async thread', args.instances, concurrent.futures.ThreadPoolExecutor(2)),
+                ('async process', args.instances, None)]
+        for label, instances, workers in runs:
+            run_dest = os.path.join(dest, '%s-%d' % (label.replace(' ', '-'), instances))
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                counts = asyncio.run(convert_async(filenames, run_dest, dispatch, instances,
+                                                   args.limit, workers))
+            elapsed = time.perf_counter() - start
+            if workers:
+                workers.shutdown()
+            report.append((label, instances, elapsed, counts, same_tree(batch_dest, run_dest)))
+        
+        print('%-14s %9s %9s %10s %10s %7s %7s %5s' % ('run', 'instances', 'seconds',
+                                                       'books/sec', 'sheets/sec', 'books',
+                                                       'failed', 'same'))
+        for label, instances, elapsed, counts, same in report:
+            print('%-14s %9d %9.3f %10.1f %10.1f %7d %7d %5s' % (
+                label, instances, elapsed, args.books / elapsed,
+                args.books * args.sheets / elapsed, counts['book'], counts['failed'],
+                'yes' if same else 'no'))
+    finally:
+        shutil.rmtree(dest)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+#!python3
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+import converter
+import fakeexcel
+
+def main():
+    """
+    converts a large fake sheet with several block sizes,
+    and reports wall time, round trips and peak memory of the conversion.
+    block 0 reads the whole table at once.
+    memory is traced in a second run, as tracing slows the first down.
+    
+    bench-blocks.py --rows 200000 --cols 10 --blocks 0,1000,10000,50000
+    """
+    parser = argparse.ArgumentParser(description='row block size trade-off')
+    parser.add_argument('--rows', type=int, default=100000, help='data rows')
+    parser.add_argument('--cols', type=int, default=10, help='columns')
+    parser.add_argument('--latency', type=float, default=100.0, help='microseconds per call')
+    parser.add_argument('--cell-latency', type=float, default=0.2, help='microseconds per cell')
+    parser.add_argument('--blocks', default='0,1000,10000,50000', help='block sizes')
+    args = parser.parse_args()
+    
+    x = converter.load()
+    app = fakeexcel.FakeApplication(args.latency * 1e-6, args.cell_latency * 1e-6)
+    book = app.Workbooks.add('bench.xlsx')
+    data = [tuple('col%d' % c for c in range(args.cols))]
+    for r in range(args.rows):
+        data.append(tuple(float(r * args.cols + c) if c % 2 else 'text%d' % r
+                          for c in range(args.cols)))
+    sheet = book.add_sheet('bench', data)
+    del data
+    
+    dest = tempfile.mkdtemp()
+    file_name = os.path.join(dest, 'sheet1.json')
+    print('%8s %10s %12s %14s %10s' % ('block', 'seconds', 'round trips', 'peak MB', 'rows/sec'))
+    for block in [int(b) for b in args.blocks.split(',')]:
+        options = x.default_args(block=block)
+        params = x.make_params(options, sheet)
+        app.com.reset()
+        start = time.perf_counter()
+        x.write_json(options, file_name, x.convert_sheet(params, options, sheet))
+        elapsed = time.perf_counter() - start
+        calls = app.com.total
+        tracemalloc.start()
+        x.write_json(options, file_name, x.convert_sheet(params, options, sheet))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print('%8d %10.3f %12d %14.1f %10.0f' % (block, elapsed, calls,
+                                                  peak / 1e6, args.rows / elapsed))
+    os.remove(file_name)
+    os.rmdir(dest)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+#!python3
+
+import argparse
+import shutil
+import tempfile
+import time
+import converter
+import fakeexcel
+
+def make_books(n, rows, formulas, on_open, links):
+    """
+    returns a registry of n books, each with a formula per row in formulas columns,
+    a Workbook_Open handler of on_open seconds and links updated in links seconds.
+    """
+    books = {}
+    app = fakeexcel.FakeApplication(books=books)
+    for i in range(n):
+        book = app.Workbooks.add('book%04d.xlsx' % i)
+        book.on_open = on_open
+        book.links = links
+        data = [('id', 'price') + tuple('total%d' % k for k in range(formulas))]
+        data += [(float(r), r * 1.5) + tuple(r * 1.5 * (k + 2) for k in range(formulas))
+                 for r in range(rows)]
+        sheet = book.add_sheet('sheet', data)
+        for r in range(rows):
+            for k in range(formulas):
+                sheet.formulas[(r + 2, k + 3)] = '=RC2*%d+NOW()*0' % (k + 2)
+    return books
+
+def main():
+    """
+    converts formula-heavy fake books with the default profile and with --fast,
+    on a fake Excel recalculating on open, running Workbook_Open and updating links.
+    checks every instance got its settings back before quitting.
+    a missing book in the middle fails, and its instance is retired.
+    
+    bench-fast-read.py --books 50 --rows 2000 --recalc 2
+    """
+    parser = argparse.ArgumentParser(description='fast read profile on a fake Excel')
+    parser.add_argument('--books', type=int, default=20, help='number of books')
+    parser.add_argument('--rows', type=int, default=1000, help='rows per book')
+    parser.add_argument('--formulas', type=int, default=4, help='formula columns')
+    parser.add_argument('--recalc', type=float, default=2.0, help='microseconds per formula cell')
+    parser.add_argument('--on-open', type=float, default=30.0, help='milliseconds of Workbook_Open')
+    parser.add_argument('--links', type=float, default=50.0, help='milliseconds to update links')
+    args = parser.parse_args()
+    
+    x = converter.load()
+    books = make_books(args.books, args.rows, args.formulas, args.on_open / 1000.0,
+                       args.links / 1000.0)
+    filenames = sorted(books)
+    filenames.insert(len(filenames) // 2, 'missing.xlsx')
+    
+    dest = tempfile.mkdtemp()
+    try:
+        report = []
+        for fast in (False, True):
+            apps = []
+            def dispatch(progid):
+                app = fakeexcel.DispatchEx(progid, books=books,
+                                           recalc_latency=args.recalc / 1e6)
+                apps.append(app)
+                return app
+            factory = lambda: x.ExcelApp(visible=False, dispatch=dispatch, fast=fast)
+            options = x.default_args(dest=dest, invisible=True, fast=fast)
+            start = time.perf_counter()
+            x.excel_to_json_batch(options, filenames, factory)
+            elapsed = time.perf_counter() - start
+            restored = all(app.quitted and app.ScreenUpdating and app.EnableEvents and
+                           app.DisplayAlerts and
+                           app.calculation == fakeexcel.XL_CALCULATION_AUTOMATIC and
+                           not app.Workbooks.opened for app in apps)
+            recalculated = sum(app.recalculated for app in apps)
+            report.append(('fast' if fast else 'default', elapsed, recalculated, len(apps),
+                           restored))
+        print('%-8s %10s %10s %14s %6s %9s' % ('profile', 'seconds', 'books/sec',
+                                               'recalculated', 'Excel', 'restored'))
+        for label, seconds, recalculated, started, restored in report:
+            print('%-8s %10.3f %10.1f %14d %6d %9s' % (label, seconds, args.books / seconds,
+                                                       recalculated, started,
+                                                       'yes' if restored else 'no'))
+    finally:
+        shutil.rmtree(dest)
+
+if __name__ == '__main__':
+    main()
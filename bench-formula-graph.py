@@ -0,0 +1,68 @@
+#!python3
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import formulagraph
+import jsonstream
+
+def formula_matrix(rows):
+    """
+    returns FormulaR1C1 of a sheet of a value column and ten formula columns,
+    with running totals, ranges across columns and a reference to another sheet.
+    """
+    matrix = []
+    for r in range(rows):
+        matrix.append((str(r), '=RC[-1]*2', '=R[-1]C+RC[-1]' if r else '=RC[-1]',
+                       '=SUM(R1C2:RC2)', "=RC[-3]+'Sheet 2'!R1C1", '=RC[-1]*1.1',
+                       '=IF(RC[-1]>0,RC[-5],0)', '=RC[-1]&"x"', '=ROUND(RC[-6],2)',
+                       '=RC[-1]+R1C1', '=MAX(RC2:RC10)'))
+    return matrix
+
+def main():
+    """
+    builds the dependency graph of a sheet of many formulas, orders it for calculation,
+    writes and reads the adjacency file, and finds formulas affected by a changed cell.
+    
+    bench-formula-graph.py --rows 100000
+    """
+    parser = argparse.ArgumentParser(description='formula dependency graph')
+    parser.add_argument('--rows', type=int, default=100000, help='rows of ten formulas each')
+    args = parser.parse_args()
+    
+    matrix = formula_matrix(args.rows)
+    dest = tempfile.mkdtemp()
+    try:
+        report = []
+        def timed(label, function, *args):
+            start = time.perf_counter()
+            result = function(*args)
+            report.append((label, time.perf_counter() - start))
+            return result
+        
+        graph = formulagraph.Graph()
+        count = timed('add_sheet', graph.add_sheet, 'Sheet1', matrix)
+        order = timed('order', graph.order)
+        file_name = os.path.join(dest, 'sheet1.deps.json')
+        timed('write', formulagraph.write_adjacency, graph, 'Sheet1', file_name)
+        jsonstream.dump([{'title': 'Sheet1', 'url': 'sheet1.json', 'deps': 'sheet1.deps.json'}],
+                        os.path.join(dest, 'index.json'))
+        loaded = timed('load', formulagraph.load, dest)
+        affected = timed('affected', loaded.affected, [('Sheet1', args.rows // 2, 1)])
+        
+        position = dict((cell, i) for i, cell in enumerate(order))
+        ordered = all(position.get(precedent, -1) < position[cell] for cell in order
+                      for precedent in graph.precedents(cell)
+                      if precedent[1:3] == precedent[3:5])
+        print('%d formulas, %d ordered, %d affected, cells before formulas: %s' % (
+            count, len(order), len(affected), 'yes' if ordered else 'NO'))
+        print('adjacency file: %d bytes' % os.path.getsize(file_name))
+        for label, seconds in report:
+            print('%-10s %8.3f seconds' % (label, seconds))
+    finally:
+        shutil.rmtree(dest)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+#!python3
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+import converter
+import formularuns
+
+def formula_matrix(rows, cols):
+    """
+    returns FormulaR1C1 of a fill-down heavy sheet: a header, an id and a name column,
+    formulas filled down the other columns, and a total row of a formula filled right.
+    """
+    matrix = [tuple(['id', 'name'] + ['f%d' % c for c in range(cols - 2)])]
+    for r in range(rows):
+        line = [str(r + 1), 'name%d' % (r % 50)]
+        line += ['=RC[-%d]*%d+R[-1]C' % (c + 1, c + 2) if r else '=RC[-%d]*%d' % (c + 1, c + 2)
+                 for c in range(cols - 2)]
+        matrix.append(tuple(line))
+    matrix.append(tuple(['', 'total'] + ['=SUM(R[-%d]C:R[-1]C)' % rows] * (cols - 2)))
+    return matrix
+
+def main():
+    """
+    writes a fill-down heavy formula matrix in the rows layout and in the runs layout,
+    and reads the runs back.
+    
+    bench-formula-runs.py --rows 200000 --cols 12
+    """
+    parser = argparse.ArgumentParser(description='runs layout of R1C1 formulas')
+    parser.add_argument('--rows', type=int, default=100000, help='rows of the sheet')
+    parser.add_argument('--cols', type=int, default=10, help='columns of the sheet')
+    args = parser.parse_args()
+    
+    x = converter.load()
+    matrix = formula_matrix(args.rows, args.cols)
+    dest = tempfile.mkdtemp()
+    try:
+        report = []
+        for layout in ('rows', 'runs'):
+            for compact in (False, True):
+                options = x.default_args(layout=layout, compact=compact)
+                file_name = os.path.join(dest, '%s%d.json' % (layout, compact))
+                start = time.perf_counter()
+                x.write_json(options, file_name, matrix)
+                elapsed = time.perf_counter() - start
+                report.append((layout + (' compact' if compact else ''), elapsed,
+                               os.path.getsize(file_name)))
+        with open(os.path.join(dest, 'runs1.json'), encoding='utf-8') as infile:
+            table = json.load(infile)
+        start = time.perf_counter()
+        decoded = formularuns.decode_rows(table)
+        decode = time.perf_counter() - start
+        same = decoded == [list(row) for row in matrix]
+        
+        print('%-14s %10s %14s' % ('layout', 'seconds', 'bytes'))
+        for label, elapsed, size in report:
+            print('%-14s %10.3f %14d' % (label, elapsed, size))
+        print('decode %.3f seconds, %d values, same: %s' % (decode, len(table['values']),
+                                                            'yes' if same else 'NO'))
+    finally:
+        shutil.rmtree(dest)
+
+if __name__ == '__main__':
+    main()
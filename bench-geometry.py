@@ -0,0 +1,43 @@
+#!python3
+
+import argparse
+import converter
+import fakeexcel
+
+def main():
+    """
+    counts round trips per sheet to find the origin value and the current region,
+    besides reading the table itself. a blank sheet stops at the origin value.
+    
+    bench-geometry.py --sheets 5
+    """
+    parser = argparse.ArgumentParser(description='round trips per sheet for the geometry')
+    parser.add_argument('--sheets', type=int, default=4, help='sheets with data')
+    parser.add_argument('--rows', type=int, default=100, help='data rows per sheet')
+    args = parser.parse_args()
+    
+    x = converter.load()
+    app = fakeexcel.FakeApplication()
+    book = app.Workbooks.add('bench.xlsx')
+    for s in range(args.sheets):
+        data = [('id', 'name')] + [(float(r), 'name%d' % r) for r in range(args.rows)]
+        book.add_sheet('sheet%d' % s, data)
+    book.add_sheet('blank', [])
+    options = x.default_args()
+    
+    sheets = book.Worksheets
+    first = x.SheetGeometry(sheets[0], options.origin)
+    app.com.reset()
+    params = x.make_params(options, first.sheet, first)
+    print('%-8s %8s %8s  %s' % ('sheet', 'geometry', 'total', 'members'))
+    print('%-8s %8d %8d  %s' % ('params', first.calls, app.com.total, dict(app.com.calls)))
+    for position, sheet in enumerate(sheets):
+        geometry = first if position == 0 else x.SheetGeometry(sheet, options.origin)
+        before = geometry.calls
+        app.com.reset()
+        x.convert_sheet(params, options, sheet, geometry)
+        print('%-8s %8d %8d  %s' % (sheet.name, geometry.calls - before, app.com.total,
+                                    dict(app.com.calls)))
+
+if __name__ == '__main__':
+    main()
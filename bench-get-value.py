@@ -0,0 +1,101 @@
+#!python3
+
+import argparse
+import time
+import cellrange
+import converter
+import fakeexcel
+
+def make_book(app, rows, cols, url_every):
+    """
+    registers a book with a header row and rows x cols of mixed values.
+    every url_every-th row gets a hyperlink at the last column.
+    """
+    book = app.Workbooks.add('bench.xlsx')
+    data = [tuple('col%d' % c for c in range(cols))]
+    for r in range(rows):
+        data.append(tuple(float(r * cols + c) if c % 2 else 'text%d' % r
+                          for c in range(cols)))
+    sheet = book.add_sheet('bench', data)
+    if url_every:
+        for r in range(2, rows + 2, url_every):
+            sheet.hyperlinks.append(
+                fakeexcel.FakeHyperlink(sheet, r, cols, 'http://example.com/%d' % r))
+    return book
+
+def run(x, app, mode, url_col):
+    """
+    reads the table once and returns (seconds, round trips, top members, rows).
+    """
+    args = x.default_args(url=url_col, text=mode.startswith('text'), formula=mode == 'formula',
+                          textmode='cell' if mode == 'textcell' else 'bulk')
+    sheet = app.Workbooks.Open('bench.xlsx').Worksheets[0]
+    params = x.make_params(args, sheet)
+    whole_table, url_table = x.get_region(params, args, sheet)
+    app.com.reset()
+    start = time.perf_counter()
+    data = x.get_value(args, sheet, whole_table, url_table)
+    elapsed = time.perf_counter() - start
+    return (elapsed, app.com.total, app.com.calls.most_common(3), len(data))
+
+def check_texts(x, app):
+    """
+    returns mismatches of get_text from Text of the fake, as (value, format, got, expected):
+    the values captured from Excel, then the bench table in a narrow column.
+    """
+    book = app.Workbooks.add('texts.xlsx')
+    sheet = book.add_sheet('texts', [tuple('col%d' % c for c in range(len(fakeexcel.TEXTS))),
+                                     tuple(value for value, format, text in fakeexcel.TEXTS)])
+    for c, (value, format, text) in enumerate(fakeexcel.TEXTS):
+        sheet.formats[(2, c + 1)] = format
+    expected = [[text for value, format, text in fakeexcel.TEXTS]]
+    last = cellrange.col_letters(len(fakeexcel.TEXTS))
+    cases = [(sheet, 'A2:%s2' % last, expected)]
+    bench = app.Workbooks.Open('bench.xlsx').Worksheets[0]
+    bench.widths[2] = 4
+    whole_table = bench.Range('A1').CurrentRegion.Address
+    cases.append((bench, whole_table, x.get_text_by_cell(bench, whole_table)))
+    mismatches = []
+    for sheet, address, expected in cases:
+        got = x.get_text(sheet, address)
+        values = x.as_matrix(sheet.Range(address).Value)
+        formats = [sheet.number_format(2, c + 1) for c in range(len(values[0]))]
+        for row_values, row_got, row_expected in zip(values, got, expected):
+            for value, format, g, e in zip(row_values, formats, row_got, row_expected):
+                if g != e:
+                    mismatches.append((value, format, g, e))
+    del bench.widths[2]
+    return mismatches
+
+def main():
+    """
+    measures get_value of excel-to-json-3.py on a fake Excel.
+    
+    bench-get-value.py --rows 10000 --cols 10 --latency 20
+    """
+    parser = argparse.ArgumentParser(description='get_value round trips and wall time')
+    parser.add_argument('--rows', type=int, default=10000, help='data rows')
+    parser.add_argument('--cols', type=int, default=10, help='columns')
+    parser.add_argument('--latency', type=float, default=0.0, help='microseconds per call')
+    parser.add_argument('--url-every', type=int, default=10, help='rows per hyperlink')
+    parser.add_argument('--modes', default='value,formula,text,textcell', help='modes to run')
+    args = parser.parse_args()
+    
+    x = converter.load()
+    app = fakeexcel.FakeApplication(latency=args.latency * 1e-6)
+    make_book(app, args.rows, args.cols, args.url_every)
+    
+    print('%-12s %10s %12s  %s' % ('mode', 'seconds', 'round trips', 'top members'))
+    for mode in args.modes.split(','):
+        for url_col in (None, cellrange.col_letters(args.cols)):
+            elapsed, total, top, n = run(x, app, mode, url_col)
+            label = mode + ('+url' if url_col else '')
+            print('%-12s %10.3f %12d  %s' % (label, elapsed, total, top))
+    
+    mismatches = check_texts(x, app)
+    print('text mismatches: %d' % len(mismatches))
+    for mismatch in mismatches[:10]:
+        print('  %r in %r: %r, Excel shows %r' % mismatch)
+
+if __name__ == '__main__':
+    main()
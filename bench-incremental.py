@@ -0,0 +1,77 @@
+#!python3
+
+import argparse
+import functools
+import os
+import shutil
+import tempfile
+import time
+import converter
+import fakeexcel
+
+def make_books(folder, n, rows):
+    """
+    writes n small files standing for books, and registers fake books at their paths.
+    """
+    books = {}
+    app = fakeexcel.FakeApplication(books=books)
+    for i in range(n):
+        filename = os.path.join(folder, 'book%05d.xlsx' % i)
+        with open(filename, 'wb') as outfile:
+            outfile.write(b'book %d\n' % i)
+        book = app.Workbooks.add(filename)
+        data = [('id', 'name')] + [(float(r), 'name%d' % r) for r in range(rows)]
+        book.add_sheet('sheet', data)
+        book.add_sheet('fixed', [('id',), (1.0,)])
+    return books
+
+def main():
+    """
+    converts many fake books with --incremental, then reruns over them unchanged,
+    and once more after touching one book and changing a sheet of another.
+    
+    bench-incremental.py --books 2000
+    """
+    parser = argparse.ArgumentParser(description='reruns with a manifest on a fake Excel')
+    parser.add_argument('--books', type=int, default=1000, help='number of books')
+    parser.add_argument('--rows', type=int, default=20, help='rows per book')
+    parser.add_argument('--startup', type=float, default=20.0, help='milliseconds to start Excel')
+    args = parser.parse_args()
+    
+    x = converter.load()
+    folder = tempfile.mkdtemp()
+    dest = tempfile.mkdtemp()
+    try:
+        books = make_books(folder, args.books, args.rows)
+        filenames = sorted(books)
+        started = []
+        def factory():
+            started.append(1)
+            dispatch = functools.partial(fakeexcel.DispatchEx, startup=args.startup / 1000.0,
+                                         books=books)
+            return x.ExcelApp(visible=False, dispatch=dispatch)
+        options = x.default_args(dest=dest, invisible=True, incremental=True)
+        
+        runs = [('first', None), ('unchanged', None), ('touched', filenames[0]),
+                ('changed', filenames[-1])]
+        report = []
+        for label, filename in runs:
+            if label == 'touched':
+                os.utime(filename)
+            elif label == 'changed':
+                with open(filename, 'ab') as outfile:
+                    outfile.write(b'changed\n')
+                books[filename].Worksheets[0].grid.set(2, 2, 'changed')
+            del started[:]
+            start = time.perf_counter()
+            x.excel_to_json_batch(options, filenames, factory)
+            report.append((label, time.perf_counter() - start, len(started)))
+        print('%-10s %10s %8s' % ('run', 'seconds', 'Excel'))
+        for label, seconds, count in report:
+            print('%-10s %10.3f %8d' % (label, seconds, count))
+    finally:
+        shutil.rmtree(folder)
+        shutil.rmtree(dest)
+
+if __name__ == '__main__':
+    main()
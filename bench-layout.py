@@ -0,0 +1,98 @@
+#!python3
+
+import argparse
+import gzip
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import columnar
+import converter
+
+# JSON.parse and decoding of typed arrays, as a web front end does.
+NODE_SCRIPT = r'''
+const fs = require('fs');
+const text = fs.readFileSync(process.argv[1], 'utf8');
+const kinds = {uint8: Uint8Array, uint16: Uint16Array, int32: Int32Array, float64: Float64Array};
+function typed(data, kind) {
+    const bytes = Buffer.from(data, 'base64');
+    const copy = new Uint8Array(bytes).buffer;
+    return new kinds[kind](copy);
+}
+const start = process.hrtime.bigint();
+for (let i = 0; i < 5; i++) {
+    const table = JSON.parse(text);
+    if (!Array.isArray(table)) {
+        for (const c of table.columns) {
+            if (c.type === 'dict') typed(c.data, c.codes);
+            else if (c.type !== 'list') typed(c.data, c.type);
+        }
+    }
+}
+console.log(Number(process.hrtime.bigint() - start) / 5e6);
+'''
+
+def make_sheet(rows):
+    """
+    returns headers and rows like Hello2.tsv, with repeated years and categories.
+    """
+    headers = ('年度', '分類', 'タイトル', 'URL', '件数', '面積')
+    data = []
+    for r in range(rows):
+        data.append(('平成%d年' % (20 + r % 10), '分類%d' % (r % 20), 'タイトル%d' % r,
+                     'crop/item%d' % r, float(r % 1000), r * 0.25 + 0.1))
+    return headers, data
+
+def node_parse(file_name):
+    node = shutil.which('node')
+    if not node:
+        return None
+    out = subprocess.run([node, '-e', NODE_SCRIPT, file_name], capture_output=True, text=True)
+    return float(out.stdout) if out.returncode == 0 else None
+
+def python_parse(file_name):
+    start = time.perf_counter()
+    with open(file_name, encoding='utf-8') as infile:
+        table = json.load(infile)
+    if isinstance(table, dict):
+        columnar.decode_rows(table)
+    return (time.perf_counter() - start) * 1000
+
+def main():
+    """
+    writes a sheet like Hello2.tsv in the rows and columns layouts,
+    and reports file size, gzipped size and parse time in node and python.
+    the node time includes decoding typed arrays, python rebuilds rows.
+    
+    bench-layout.py --rows 100000
+    """
+    parser = argparse.ArgumentParser(description='rows vs columns layout')
+    parser.add_argument('--rows', type=int, default=100000, help='data rows')
+    args = parser.parse_args()
+    
+    x = converter.load()
+    headers, data = make_sheet(args.rows)
+    params = {'has_header': True, 'headers': headers}
+    dest = tempfile.mkdtemp()
+    try:
+        print('%-16s %12s %12s %10s %10s' % ('layout', 'bytes', 'gzip bytes', 'node ms',
+                                             'python ms'))
+        for layout in ('rows', 'columns'):
+            for compact in (False, True):
+                options = x.default_args(layout=layout, compact=compact)
+                file_name = os.path.join(dest, '%s-%d.json' % (layout, compact))
+                x.write_json(options, file_name, data, params)
+                with open(file_name, 'rb') as infile:
+                    gzipped = len(gzip.compress(infile.read()))
+                node = node_parse(file_name)
+                label = layout + (' compact' if compact else '')
+                print('%-16s %12d %12d %10s %10.1f' % (
+                    label, os.path.getsize(file_name), gzipped,
+                    '%.1f' % node if node is not None else '-', python_parse(file_name)))
+    finally:
+        shutil.rmtree(dest)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#!python3
+
+import argparse
+import filecmp
+import functools
+import io
+import os
+import shutil
+import contextlib
+import tempfile
+import time
+import converter
+import fakeexcel
+
+def make_book(books, sheets, rows):
+    """
+    registers a fake book of some sheets, a text and a number column each.
+    """
+    app = fakeexcel.FakeApplication(books=books)
+    book = app.Workbooks.add('book.xlsx')
+    for s in range(sheets):
+        data = [('id', 'name', 'value')] + [(float(r), 'name%d-%d' % (s, r), r * 0.5)
+                                             for r in range(rows)]
+        book.add_sheet('sheet%d' % s, data)
+    return 'book.xlsx'
+
+def same_files(left, right):
+    compared = filecmp.dircmp(left, right)
+    if compared.left_only or compared.right_only:
+        return False
+    match, mismatch, errors = filecmp.cmpfiles(left, right, compared.common_files, shallow=False)
+    return not mismatch and not errors
+
+def main():
+    """
+    converts a fake book of many sheets, sequentially and with --pipeline.
+    the fake Excel sleeps for marshalling cells, as the Excel process works apart,
+    so that writers encode while the reader waits for the next sheet.
+    busy: the share of the elapsed time Excel is kept working.
+    
+    bench-pipeline.py --sheets 20 --rows 20000
+    """
+    parser = argparse.ArgumentParser(description='pipelined sheet writing on a fake Excel')
+    parser.add_argument('--sheets', type=int, default=12, help='number of sheets')
+    parser.add_argument('--rows', type=int, default=20000, help='rows per sheet')
+    parser.add_argument('--cell', type=float, default=2.0, help='microseconds to marshal a cell')
+    parser.add_argument('--queue', type=int, default=2, help='sheets waiting for a writer at most')
+    args = parser.parse_args()
+    
+    x = converter.load()
+    books = {}
+    filename = make_book(books, args.sheets, args.rows)
+    waited = []
+    def wait(seconds):
+        waited.append(seconds)
+        time.sleep(seconds)
+    dispatch = functools.partial(fakeexcel.DispatchEx, cell_latency=args.cell / 1000000.0,
+                                 books=books, wait=wait)
+    root = tempfile.mkdtemp()
+    try:
+        report = []
+        for pipeline in (0, 1, 2):
+            dest = os.path.join(root, 'pipeline%d' % pipeline)
+            os.mkdir(dest)
+            options = x.default_args(filename=filename, dest=dest, invisible=True,
+                                     pipeline=pipeline, pipeline_queue=args.queue)
+            del waited[:]
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                with x.ExcelApp(visible=False, dispatch=dispatch) as app:
+                    x.convert_book(app, options)
+            elapsed = time.perf_counter() - start
+            same = same_files(os.path.join(root, 'pipeline0'), dest)
+            report.append((pipeline, elapsed, sum(waited) / elapsed, same))
+        print('%-10s %10s %8s %6s' % ('writers', 'seconds', 'busy', 'same'))
+        for pipeline, elapsed, busy, same in report:
+            print('%-10s %10.3f %7.1f%% %6s' % (pipeline or 'sequential', elapsed, 100.0 * busy,
+                                                'yes' if same else 'NO'))
+    finally:
+        shutil.rmtree(root)
+
+if __name__ == '__main__':
+    main()
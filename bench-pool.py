@@ -0,0 +1,56 @@
+#!python3
+
+import argparse
+import functools
+import shutil
+import tempfile
+import converter
+import fakeexcel
+
+def make_books(n, rows):
+    """
+    returns a registry of n small books, shared by fake applications.
+    """
+    books = {}
+    app = fakeexcel.FakeApplication(books=books)
+    for i in range(n):
+        book = app.Workbooks.add('book%04d.xlsx' % i)
+        data = [('id', 'name')] + [(float(r), 'name%d' % r) for r in range(rows)]
+        book.add_sheet('sheet', data)
+    return books
+
+def main():
+    """
+    converts many fake books with an Excel instance per book,
+    and then with a pool recycling instances.
+    a missing book in the middle shows recycling on a failure.
+    
+    bench-pool.py --books 200 --startup 50
+    """
+    parser = argparse.ArgumentParser(description='ExcelPool throughput on a fake Excel')
+    parser.add_argument('--books', type=int, default=100, help='number of books')
+    parser.add_argument('--rows', type=int, default=100, help='rows per book')
+    parser.add_argument('--startup', type=float, default=20.0, help='milliseconds to start Excel')
+    parser.add_argument('--recycle', type=int, default=50, help='books per instance of the pool')
+    args = parser.parse_args()
+    
+    x = converter.load()
+    books = make_books(args.books, args.rows)
+    filenames = sorted(books)
+    filenames.insert(len(filenames) // 2, 'missing.xlsx')
+    dispatch = functools.partial(fakeexcel.DispatchEx, startup=args.startup / 1000.0, books=books)
+    factory = lambda: x.ExcelApp(visible=False, dispatch=dispatch)
+    
+    dest = tempfile.mkdtemp()
+    try:
+        for recycle in (1, args.recycle):
+            options = x.default_args(dest=dest, invisible=True, recycle=recycle)
+            print('--- recycle every %d books' % recycle)
+            results = x.excel_to_json_batch(options, filenames, factory)
+            total = sum(r[1] for r in results)
+            print('=== recycle %d: %.1f books/sec' % (recycle, len(results) / total))
+    finally:
+        shutil.rmtree(dest)
+
+if __name__ == '__main__':
+    main()
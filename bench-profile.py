@@ -0,0 +1,51 @@
+#!python3
+
+import argparse
+import time
+import converter
+import fakeexcel
+import profiling
+
+def main():
+    """
+    converts sheets of a fake book reading Text cell by cell, a round trip per cell,
+    without and with profiling, and reports the time and the calls counted.
+    the fake counts its own round trips, to compare with those the proxies counted.
+    
+    bench-profile.py --sheets 10 --rows 2000
+    """
+    parser = argparse.ArgumentParser(description='profiling overhead on a fake Excel')
+    parser.add_argument('--sheets', type=int, default=4, help='sheets with data')
+    parser.add_argument('--rows', type=int, default=1000, help='data rows per sheet')
+    args = parser.parse_args()
+    
+    x = converter.load()
+    app = fakeexcel.FakeApplication()
+    book = app.Workbooks.add('bench.xlsx')
+    for s in range(args.sheets):
+        data = [('id', 'name')] + [(float(r), 'name%d' % r) for r in range(args.rows)]
+        book.add_sheet('sheet%d' % s, data)
+    options = x.default_args(text=True, textmode='cell')
+    
+    print('%-10s %10s %12s %12s %14s' % ('profile', 'seconds', 'fake calls', 'proxy calls',
+                                         'us/call'))
+    base = None
+    for enabled in (False, True):
+        profiling.current = profiling.Profile() if enabled else None
+        app.com.reset()
+        start = time.perf_counter()
+        sheets = profiling.wrap(book).Worksheets
+        params = x.make_params(options, sheets[0])
+        for sheet in sheets:
+            x.convert_sheet(params, options, sheet)
+        elapsed = time.perf_counter() - start
+        counted = sum(entry['count'] for entry in profiling.current.report()['members'].values()
+                      ) if enabled else 0
+        overhead = (elapsed - base) / app.com.total * 1e6 if enabled else 0.0
+        base = elapsed
+        print('%-10s %10.3f %12d %12d %14.2f' % ('on' if enabled else 'off', elapsed,
+                                                 app.com.total, counted, overhead))
+    profiling.current = None
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+#!python3
+
+import argparse
+import codecs
+import json
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+import jsonstream
+import records
+
+def make_data(rows):
+    """
+    returns a matrix like Range.Value, with a header row like Hello2.tsv.
+    """
+    data = [('年度', '分類', 'タイトル', 'URL', '件数', '面積')]
+    for r in range(rows):
+        data.append(('平成%d年' % (20 + r % 10), '分類%d' % (r % 20), 'タイトル%d' % r,
+                     'crop/item%d' % r, float(r % 1000), r * 0.25 + 0.1))
+    return tuple(data)
+
+def hello_excel_9(data, file_name):
+    """
+    a dict per row built cell by cell, then json.dump, as hello-excel-9.py does.
+    """
+    keys = data[0]
+    ncol = len(keys)
+    data_dict = []
+    for r in range(1, len(data)):
+        row = {}
+        for c in range(ncol):
+            row[keys[c]] = data[r][c]
+        data_dict.append(row)
+    with codecs.open(file_name, 'w', 'utf-8') as outfile:
+        json.dump(data_dict, outfile, ensure_ascii=False, indent=4)
+
+def dict_zip(data, file_name):
+    """
+    dict(zip()) per row, then json.dump.
+    """
+    keys = data[0]
+    data_dict = [dict(zip(keys, row)) for row in data[1:]]
+    with codecs.open(file_name, 'w', 'utf-8') as outfile:
+        json.dump(data_dict, outfile, ensure_ascii=False, indent=4)
+
+def streamed(pretty):
+    def run(data, file_name):
+        keys = records.unique_keys(data[0])
+        rows = (data[r] for r in range(1, len(data)))
+        with jsonstream.open_json(file_name) as outfile:
+            records.write_records(outfile, rows, pretty, keys)
+    return run
+
+def main():
+    """
+    writes a sheet as records with the hello-excel-9.py approach,
+    dict(zip()), and records.write_records, and reports time and peak memory.
+    pretty outputs are compared with that of hello-excel-9.py.
+    
+    bench-records.py --rows 500000 --memory
+    """
+    parser = argparse.ArgumentParser(description='records layout vs hello-excel-9')
+    parser.add_argument('--rows', type=int, default=500000, help='data rows')
+    parser.add_argument('--memory', action='store_true', help='trace peak memory in a second run')
+    args = parser.parse_args()
+    
+    data = make_data(args.rows)
+    dest = tempfile.mkdtemp()
+    try:
+        expected = None
+        print('%-16s %10s %10s %10s  %s' % ('approach', 'seconds', 'rows/sec', 'peak MB',
+                                            'same as hello-excel-9'))
+        for name, run in (('hello-excel-9', hello_excel_9), ('dict(zip())', dict_zip),
+                          ('records', streamed(True)), ('records compact', streamed(False))):
+            file_name = os.path.join(dest, name + '.json')
+            start = time.perf_counter()
+            run(data, file_name)
+            elapsed = time.perf_counter() - start
+            peak = '-'
+            if args.memory:
+                tracemalloc.start()
+                run(data, file_name)
+                peak = '%.1f' % (tracemalloc.get_traced_memory()[1] / 1e6)
+                tracemalloc.stop()
+            with open(file_name, 'rb') as infile:
+                content = infile.read()
+            if expected is None:
+                expected = content
+            same = 'yes' if content == expected else 'no'
+            if name.endswith('compact'):
+                same = '-'
+            print('%-16s %10.3f %10.0f %10s  %s' % (name, elapsed, args.rows / elapsed, peak,
+                                                   same))
+    finally:
+        shutil.rmtree(dest)
+
+if __name__ == '__main__':
+    main()
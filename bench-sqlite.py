@@ -0,0 +1,91 @@
+#!python3
+
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import jsonstream
+import records
+import sqlitedb
+
+def make_data(rows):
+    """
+    returns a matrix like Range.Value, with a header row like Hello2.tsv.
+    """
+    data = [('年度', '分類', 'タイトル', 'URL', '件数', '面積')]
+    for r in range(rows):
+        data.append(('平成%d年' % (20 + r % 10), '分類%d' % (r % 20), 'ダイズの低温特性%d' % r,
+                     'crop/item%d' % r, float(r % 1000), r * 0.25 + 0.1))
+    return tuple(data)
+
+def write_json(pretty):
+    def run(data, file_name):
+        jsonstream.write_json(file_name, data[1:], pretty)
+    return run
+
+def write_sqlite(indexed, fts):
+    def run(data, file_name):
+        names = sqlitedb.sql_names(records.unique_keys(data[0]))
+        connection = sqlitedb.connect(file_name)
+        try:
+            sqlitedb.write_table(connection, 'sheet1', names, iter(data[1:]))
+            sqlitedb.create_indexes(connection, 'sheet1', indexed)
+            if fts:
+                sqlitedb.create_fts(connection, 'sheet1',
+                                    sqlitedb.text_columns(connection, 'sheet1', names))
+        finally:
+            connection.close()
+    return run
+
+def query_json(file_name, value):
+    with open(file_name, encoding='utf-8') as infile:
+        return [row for row in json.load(infile) if row[1] == value]
+
+def query_sqlite(file_name, value):
+    connection = sqlite3.connect(file_name)
+    try:
+        return connection.execute('SELECT * FROM sheet1 WHERE "分類" = ?', (value,)).fetchall()
+    finally:
+        connection.close()
+
+def main():
+    """
+    writes a sheet as json and into SQLite, plain, indexed and with FTS5,
+    and reports time, rows per second and size,
+    then the time to find rows of a 分類 in the json and in the database.
+    
+    bench-sqlite.py --rows 500000
+    """
+    parser = argparse.ArgumentParser(description='SQLite output vs json')
+    parser.add_argument('--rows', type=int, default=500000, help='data rows')
+    args = parser.parse_args()
+    
+    data = make_data(args.rows)
+    dest = tempfile.mkdtemp()
+    try:
+        print('%-16s %10s %10s %10s %10s' % ('output', 'seconds', 'rows/sec', 'MB', 'query s'))
+        for name, run, query in (
+                ('json', write_json(True), query_json),
+                ('json compact', write_json(False), query_json),
+                ('sqlite', write_sqlite([], False), query_sqlite),
+                ('sqlite index', write_sqlite(['分類'], False), query_sqlite),
+                ('sqlite index+fts', write_sqlite(['分類'], True), query_sqlite)):
+            file_name = os.path.join(dest, name.replace(' ', '-'))
+            start = time.perf_counter()
+            run(data, file_name)
+            elapsed = time.perf_counter() - start
+            start = time.perf_counter()
+            found = query(file_name, '分類7')
+            searched = time.perf_counter() - start
+            assert len(found) == len(range(7, args.rows, 20))
+            print('%-16s %10.3f %10.0f %10.1f %10.4f' % (name, elapsed, args.rows / elapsed,
+                                                         os.path.getsize(file_name) / 1e6,
+                                                         searched))
+    finally:
+        shutil.rmtree(dest)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+#!python3
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+import tracemalloc
+import cellrange
+import converter
+import fakeexcel
+import synthbook
+import xlsxreader
+
+def bulk_value(x, sheet, options):
+    """
+    hello-excel-9: the whole CurrentRegion.Value in one call.
+    """
+    return sheet.Range('A1').CurrentRegion.Value
+
+def cell_value(x, sheet, options):
+    """
+    hello-excel-10: Cells(r, c).Value, a call per cell.
+    """
+    region = sheet.Range('A1').CurrentRegion
+    nrow = region.Rows.Count
+    ncol = region.Columns.Count
+    return [[sheet.Cells(r + 1, c + 1).Value for c in range(ncol)] for r in range(nrow)]
+
+def row_cells(x, sheet, options):
+    """
+    hello-excel-5/6: iterates UsedRange.Rows, then Cells of each row.
+    """
+    return [[cell.Value for cell in row.Cells] for row in sheet.UsedRange.Rows]
+
+def cell_text(x, sheet, options):
+    """
+    hello-excel-12: Cells(r, c).Text, a call per cell.
+    """
+    region = sheet.Range('A1').CurrentRegion
+    nrow = region.Rows.Count
+    ncol = region.Columns.Count
+    return [[sheet.Cells(r + 1, c + 1).Text for c in range(ncol)] for r in range(nrow)]
+
+def production(text):
+    """
+    get_value of excel-to-json-3.py, with the url column.
+    """
+    def run(x, sheet, options):
+        args = argparse.Namespace(**vars(options))
+        args.text = text
+        params = x.make_params(args, sheet)
+        whole_table, url_table = x.get_region(params, args, sheet)
+        return x.get_value(args, sheet, whole_table, url_table)
+    return run
+
+# strategies reading the header row along with the data; rows are counted without it.
+WITH_HEADER = ('bulk', 'cell', 'rows', 'text')
+
+# (name, function, reads the .xlsx file instead of the fake)
+STRATEGIES = (
+    ('bulk', bulk_value, False),
+    ('cell', cell_value, False),
+    ('rows', row_cells, False),
+    ('text', cell_text, False),
+    ('get_value', production(False), False),
+    ('get_value_text', production(True), False),
+    ('xlsx', production(False), True),
+)
+
+def text_mismatches(x, sheet):
+    """
+    returns the number of cells whose Text get_text renders differently from Text of the cell.
+    """
+    whole_table = sheet.Range('A1').CurrentRegion.Address
+    bulk = x.get_text(sheet, whole_table)
+    cells = x.get_text_by_cell(sheet, whole_table)
+    return sum(a != b for row_bulk, row_cells in zip(bulk, cells)
+               for a, b in zip(row_bulk, row_cells))
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL).decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def measure(x, function, open_sheet, options, memory):
+    """
+    returns (seconds, rows, calls, peak bytes or None) of a run from opening the sheet.
+    """
+    app, sheet = open_sheet()
+    start = time.perf_counter()
+    rows = len(function(x, sheet, options))
+    elapsed = time.perf_counter() - start
+    calls = app.com.total if app else 0
+    peak = None
+    if memory:
+        app, sheet = open_sheet()
+        tracemalloc.start()
+        function(x, sheet, options)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return (elapsed, rows, calls, peak)
+
+def compare(results, file_name):
+    """
+    prints the ratio of seconds to those of a results file of an earlier run.
+    """
+    with open(file_name, encoding='utf-8') as infile:
+        previous = json.load(infile)
+    before = dict((r['strategy'], r) for r in previous['results'])
+    print()
+    print('compared with %s (commit %s)' % (file_name, previous.get('commit')))
+    print('%-16s %10s %10s %8s' % ('strategy', 'before', 'now', 'ratio'))
+    for result in results:
+        old = before.get(result['strategy'])
+        if old is None:
+            continue
+        print('%-16s %10.3f %10.3f %8.2f' % (result['strategy'], old['seconds'],
+                                             result['seconds'],
+                                             result['seconds'] / old['seconds']))
+
+def main():
+    """
+    reads a synthetic sheet with the strategies of the hello-excel lessons,
+    get_value of excel-to-json-3.py, and the native .xlsx reader,
+    and reports throughput, round trips to Excel and peak memory.
+    the fake Excel costs latency per call and cell latency per cell of a bulk Value.
+    the .xlsx file is read from its package, parsing included.
+    results are written as json to compare runs, such as of two commits.
+    
+    bench-suite.py --rows 5000 --cols 10 --latency 20 --output before.json
+    bench-suite.py --rows 5000 --cols 10 --latency 20 --output after.json --compare before.json
+    """
+    names = [name for name, function, native in STRATEGIES]
+    parser = argparse.ArgumentParser(description='read strategies on a synthetic workbook')
+    parser.add_argument('--rows', type=int, default=2000, help='data rows')
+    parser.add_argument('--cols', type=int, default=8, help='columns')
+    parser.add_argument('--mix', default='4,3,1', help='weights of string,number,date columns')
+    parser.add_argument('--url-density', type=float, default=0.1, help='share of rows with a link')
+    parser.add_argument('--seed', type=int, default=1, help='seed of the generator')
+    parser.add_argument('--latency', type=float, default=20.0, help='microseconds per call')
+    parser.add_argument('--cell-latency', type=float, default=0.05,
+                        help='microseconds per cell of a bulk Value')
+    parser.add_argument('--strategies', default=','.join(names), help='strategies to run')
+    parser.add_argument('--memory', action='store_true', help='trace peak memory in a second run')
+    parser.add_argument('--output', help='results json file to write')
+    parser.add_argument('--compare', help='results json file of an earlier run')
+    args = parser.parse_args()
+    
+    mix = tuple(float(w) for w in args.mix.split(','))
+    table = synthbook.Table(args.rows, args.cols, mix, args.url_density, args.seed)
+    x = converter.load()
+    books = {}
+    synthbook.fake_book(fakeexcel.FakeApplication(books=books), 'bench.xlsx', [table])
+    folder = tempfile.mkdtemp()
+    try:
+        file_name = os.path.join(folder, 'bench.xlsx')
+        synthbook.write_xlsx(file_name, [table])
+        
+        def open_fake():
+            app = fakeexcel.FakeApplication(args.latency * 1e-6, args.cell_latency * 1e-6,
+                                            books=books)
+            sheet = app.Workbooks.Open('bench.xlsx').Worksheets[0]
+            app.com.reset()
+            return (app, sheet)
+        
+        def open_native():
+            return (None, xlsxreader.XlsxBook(file_name).Worksheets[0])
+        
+        options = x.default_args(url=cellrange.col_letters(args.cols))
+        results = []
+        print('%-16s %10s %12s %12s %10s %10s' % ('strategy', 'seconds', 'cells/sec', 'rows/sec',
+                                                   'calls', 'peak MB'))
+        for name, function, native in STRATEGIES:
+            if name not in args.strategies.split(','):
+                continue
+            elapsed, rows, calls, peak = measure(x, function,
+                                                 open_native if native else open_fake,
+                                                 options, args.memory)
+            if name in WITH_HEADER:
+                rows -= 1
+            result = {
+                'strategy': name,
+                'seconds': elapsed,
+                'rows': rows,
+                'rows_per_sec': rows / elapsed,
+                'cells_per_sec': table.cells / elapsed,
+                'calls': calls,
+                'peak_bytes': peak,
+            }
+            results.append(result)
+            print('%-16s %10.3f %12.0f %12.0f %10d %10s' % (
+                name, elapsed, result['cells_per_sec'], result['rows_per_sec'], calls,
+                '-' if peak is None else '%.1f' % (peak / 1e6)))
+        if 'get_value_text' in args.strategies.split(','):
+            print('text mismatches: %d' % text_mismatches(x, open_fake()[1]))
+    finally:
+        shutil.rmtree(folder)
+    
+    if args.output:
+        report = {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'time': datetime.datetime.now().isoformat(timespec='seconds'),
+            'options': vars(args),
+            'results': results,
+        }
+        with open(args.output, 'w', encoding='utf-8') as outfile:
+            json.dump(report, outfile, ensure_ascii=False, indent=4)
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+#!python3
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import converter
+import fakeexcel
+
+def make_books(folder, n, rows):
+    """
+    writes n small files standing for books, and registers fake books at their paths.
+    """
+    books = {}
+    app = fakeexcel.FakeApplication(books=books)
+    for i in range(n):
+        filename = os.path.join(folder, 'book%03d.xlsx' % i)
+        with open(filename, 'wb') as outfile:
+            outfile.write(b'book %d\n' % i)
+        book = app.Workbooks.add(filename)
+        data = [('id', 'name')] + [(float(r), 'name%d' % r) for r in range(rows)]
+        book.add_sheet('sheet', data)
+    return books
+
+class Reader(threading.Thread):
+    """
+    reads index.json and sheet files of every book over and over, as a web server would,
+    counting files not parsed as json, moments a book directory is missing,
+    and when an edit is first seen.
+    """
+    def __init__(self, dest, names):
+        threading.Thread.__init__(self, daemon=True)
+        self.dest = dest
+        self.names = names
+        self.reads = 0
+        self.torn = 0
+        self.missing = 0
+        self.expect = {}
+        self.seen = {}
+        self.running = True
+    
+    def read(self, name):
+        folder = os.path.join(self.dest, name)
+        with open(os.path.join(folder, 'index.json'), encoding='utf-8') as infile:
+            index = json.load(infile)
+        for entry in index:
+            with open(os.path.join(folder, entry['url']), encoding='utf-8') as infile:
+                rows = json.load(infile)
+            self.reads += 1
+            text = self.expect.get(name)
+            if text and name not in self.seen and rows and rows[0][1] == text:
+                self.seen[name] = time.perf_counter()
+    
+    def run(self):
+        while self.running:
+            for name in self.names:
+                try:
+                    self.read(name)
+                except FileNotFoundError:
+                    self.missing += 1
+                except ValueError:
+                    self.torn += 1
+
+def main():
+    """
+    watches a folder of fake books while an editor saves some of them in bursts,
+    and a reader reads the output all along.
+    reports conversions per burst, Excel instances started, reads of broken json
+    and the delay from the last write of a burst to the reader seeing the edit.
+    
+    bench-watch.py --books 20 --bursts 10
+    """
+    parser = argparse.ArgumentParser(description='watch mode on a fake Excel')
+    parser.add_argument('--books', type=int, default=10, help='number of books')
+    parser.add_argument('--rows', type=int, default=200, help='rows per book')
+    parser.add_argument('--bursts', type=int, default=5, help='bursts of saves')
+    parser.add_argument('--saves', type=int, default=5, help='saves per burst')
+    parser.add_argument('--gap', type=float, default=0.03, help='seconds between saves')
+    parser.add_argument('--interval', type=float, default=0.05, help='seconds between polls')
+    parser.add_argument('--settle', type=float, default=0.2, help='seconds to settle')
+    args = parser.parse_args()
+    
+    x = converter.load()
+    folder = tempfile.mkdtemp()
+    dest = tempfile.mkdtemp()
+    try:
+        books = make_books(folder, args.books, args.rows)
+        filenames = sorted(books)
+        names = [os.path.splitext(os.path.basename(f))[0] for f in filenames]
+        started = []
+        def factory():
+            started.append(1)
+            return x.ExcelApp(visible=False, dispatch=lambda progid: fakeexcel.DispatchEx(
+                progid, books=books))
+        options = x.default_args(filename=folder, dest=dest, invisible=True, recycle=1000,
+                                 interval=args.interval, settle=args.settle)
+        reader = Reader(dest, names)
+        edits = []
+        
+        def edit():
+            while not all(os.path.exists(os.path.join(dest, n, 'index.json')) for n in names):
+                time.sleep(0.01)
+            reader.start()
+            for k in range(args.bursts):
+                filename = filenames[k % len(filenames)]
+                name = names[k % len(names)]
+                for s in range(args.saves):
+                    text = 'edit%d-%d' % (k, s)
+                    books[filename].sheets[0].grid.set(2, 2, text)
+                    with open(filename, 'ab') as outfile:
+                        outfile.write(text.encode('ascii') + b'\n')
+                    time.sleep(args.gap)
+                reader.expect[name] = text
+                edits.append((name, time.perf_counter()))
+                while name not in reader.seen:
+                    time.sleep(0.005)
+                reader.seen.pop(name)
+                edits[-1] += (time.perf_counter(),)
+        
+        editor = threading.Thread(target=edit, daemon=True)
+        editor.start()
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = x.excel_to_json_watch(options, factory, stop=lambda: not editor.is_alive())
+        reader.running = False
+        reader.join()
+        delays = [seen - saved for name, saved, seen in edits]
+        print('books converted at start %8d' % args.books)
+        print('bursts of %d saves      %8d' % (args.saves, args.bursts))
+        print('conversions after start %8d' % (len(results) - args.books))
+        print('Excel started           %8d' % len(started))
+        print('sheet files read        %8d' % reader.reads)
+        print('broken json read        %8d' % reader.torn)
+        print('missing while swapped   %8d' % reader.missing)
+        print('delay to see an edit    %8.3f sec (settle %.3f, interval %.3f)' % (
+            sum(delays) / len(delays), args.settle, args.interval))
+    finally:
+        shutil.rmtree(folder)
+        shutil.rmtree(dest)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+#!python3
+
+import functools
+import re
+
+# the last cell of a worksheet, XFD1048576.
+MAX_ROW = 1048576
+MAX_COL = 16384
+
+# addresses parsed are memoized up to this number.
+CACHE_SIZE = 1 << 16
+
+def make_letters():
+    """
+    returns column letters indexed by column number, '' at 0, up to XFD.
+    """
+    alphabet = [chr(65 + i) for i in range(26)]
+    letters = [''] + alphabet
+    letters += [a + b for a in alphabet for b in alphabet]
+    letters += [a + b + c for a in alphabet for b in alphabet for c in alphabet]
+    return letters[:MAX_COL + 1]
+
+LETTERS = make_letters()
+NUMBERS = dict((letters, n) for n, letters in enumerate(LETTERS) if letters)
+
+p_cell = re.compile(r'(\$?)([A-Za-z]{1,3})(\$?)([0-9]+)$')
+
+def col_number(letters):
+    """
+    converts column letters, absolute or not, into a number. A -> 1, $A -> 1
+    """
+    try:
+        return NUMBERS[letters.replace('$', '').upper()]
+    except KeyError:
+        raise ValueError('bad column: %r' % letters) from None
+
+def col_letters(number):
+    """
+    converts a column number into letters. 1 -> A
+    """
+    return LETTERS[number]
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def split_cell(address):
+    """
+    splits a cell address into ('$' or '', letters, '$' or '', row digits).
+    """
+    m = p_cell.match(address)
+    if not m:
+        raise ValueError('invalid cell address: %r' % address)
+    return m.groups()
+
+def read_cell(address):
+    """
+    converts a cell address, absolute or not, into (row, col).
+    not memoized, for addresses seen once like cells of a sheet file.
+    """
+    m = p_cell.match(address)
+    if not m:
+        raise ValueError('invalid cell address: %r' % address)
+    try:
+        return (int(m.group(4)), NUMBERS[m.group(2).upper()])
+    except KeyError:
+        raise ValueError('bad column: %r' % address) from None
+
+parse_cell = functools.lru_cache(maxsize=CACHE_SIZE)(read_cell)
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def parse_range(address):
+    """
+    converts a range address into (row1, col1, row2, col2), top left first.
+    a cell address is a range of the cell.
+    """
+    begin, sep, end = address.partition(':')
+    row1, col1 = read_cell(begin)
+    if not sep:
+        return (row1, col1, row1, col1)
+    row2, col2 = read_cell(end)
+    return (min(row1, row2), min(col1, col2), max(row1, row2), max(col1, col2))
+
+def parse_areas(address):
+    """
+    converts comma separated areas into a list of bounds.
+    """
+    return [parse_range(area) for area in address.split(',')]
+
+def cell_address(row, col, absolute=False):
+    if absolute:
+        return '$%s$%d' % (LETTERS[col], row)
+    return '%s%d' % (LETTERS[col], row)
+
+def range_address(row1, col1, row2, col2, absolute=False):
+    """
+    formats bounds as 'A1:C3', or '$A$1:$C$3' like Range.Address.
+    a range of a cell is formatted as the cell.
+    """
+    begin = cell_address(row1, col1, absolute)
+    if (row1, col1) == (row2, col2):
+        return begin
+    return '%s:%s' % (begin, cell_address(row2, col2, absolute))
+
+def absolute_address(row1, col1, row2, col2):
+    return range_address(row1, col1, row2, col2, True)
+
+def areas_address(areas, absolute=False):
+    return ','.join(range_address(*bounds, absolute=absolute) for bounds in areas)
+
+def offset(bounds, rows, cols):
+    """
+    moves bounds by rows and cols, as Range.Offset does.
+    """
+    row1, col1, row2, col2 = bounds
+    if row1 + rows < 1 or col1 + cols < 1 or row2 + rows > MAX_ROW or col2 + cols > MAX_COL:
+        raise ValueError('offset out of the sheet: %r by (%d, %d)' % (bounds, rows, cols))
+    return (row1 + rows, col1 + cols, row2 + rows, col2 + cols)
+
+def with_rows(bounds, row1, row2):
+    """
+    returns the columns of bounds over other rows.
+    """
+    return (row1, bounds[1], row2, bounds[3])
+
+def split_rows(bounds, size):
+    """
+    yields bounds of blocks of size rows each, the last one may be shorter.
+    """
+    row1, col1, row2, col2 = bounds
+    for begin in range(row1, row2 + 1, size):
+        yield (begin, col1, min(begin + size - 1, row2), col2)
@@ -0,0 +1,131 @@
+#!python3
+
+import array
+import base64
+import json
+import sys
+import jsonstream
+
+# a string column is dictionary encoded when it has
+# no more distinct values than this ratio of rows.
+DICT_RATIO = 0.5
+DICT_LIMIT = 65536
+
+INT32_MIN = -(1 << 31)
+INT32_MAX = (1 << 31) - 1
+
+# array typecodes of typed arrays, little endian as JavaScript typed arrays on the web.
+TYPECODES = {'uint8': 'B', 'uint16': 'H', 'int32': 'i', 'float64': 'd'}
+
+def pack(values, kind):
+    """
+    returns base64 of values as a little endian typed array.
+    """
+    packed = array.array(TYPECODES[kind], values)
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return base64.b64encode(packed.tobytes()).decode('ascii')
+
+def unpack(data, kind):
+    packed = array.array(TYPECODES[kind])
+    packed.frombytes(base64.b64decode(data))
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return packed
+
+def code_type(count):
+    if count <= 256:
+        return 'uint8'
+    if count <= 65536:
+        return 'uint16'
+    return 'int32'
+
+def is_number(value):
+    kind = type(value)
+    return kind is float or kind is int
+
+def encode_column(name, values):
+    """
+    returns a column object for values, choosing the smallest form that holds them.
+    dict: strings or nulls repeated, as a value table and codes into it.
+    int32: integral numbers, no nulls.
+    float64: numbers, nulls as NaN.
+    list: anything else, as a json array.
+    """
+    column = {'name': name}
+    if all(is_number(v) for v in values):
+        if all(v == int(v) and INT32_MIN <= v <= INT32_MAX for v in values):
+            column.update(type='int32', data=pack([int(v) for v in values], 'int32'))
+        else:
+            column.update(type='float64', data=pack(values, 'float64'))
+        return column
+    if any(is_number(v) for v in values) and all(v is None or is_number(v) for v in values):
+        nan = float('nan')
+        column.update(type='float64', data=pack([nan if v is None else v for v in values],
+                                                'float64'))
+        return column
+    if any(type(v) is str for v in values) and all(v is None or type(v) is str for v in values):
+        table = {}
+        codes = [table.setdefault(v, len(table)) for v in values]
+        if len(table) <= max(1, len(values) * DICT_RATIO) and len(table) <= DICT_LIMIT:
+            kind = code_type(len(table))
+            column.update(type='dict', values=list(table), codes=kind, data=pack(codes, kind))
+            return column
+    column.update(type='list', data=list(values))
+    return column
+
+def encode_columns(rows, names=None):
+    """
+    returns a columnar object of rows, a matrix or an iterable of rows.
+    names: a name per column, such as headers; None gives 0, 1, ...
+    """
+    columns = None
+    count = 0
+    for row in rows:
+        if columns is None:
+            columns = [[] for v in row]
+        for column, value in zip(columns, row):
+            column.append(value)
+        count += 1
+    columns = columns or []
+    if names is None:
+        names = list(range(len(columns)))
+    return {
+        'layout': 'columns',
+        'rows': count,
+        'columns': [encode_column(name, values) for name, values in zip(names, columns)],
+    }
+
+def write_columns(outfile, rows, pretty=True, names=None):
+    """
+    writes rows as a columnar object. returns the number of rows.
+    the signature follows jsonstream.write_rows.
+    """
+    table = encode_columns(rows, names)
+    if pretty:
+        json.dump(table, outfile, ensure_ascii=False, indent=4)
+    else:
+        outfile.write(jsonstream.encode_compact(table))
+    return table['rows']
+
+def decode_column(column):
+    """
+    returns values of a column object as a list, NaN of float64 as None.
+    """
+    kind = column['type']
+    if kind == 'list':
+        return column['data']
+    if kind == 'dict':
+        values = column['values']
+        return [values[code] for code in unpack(column['data'], column['codes'])]
+    values = unpack(column['data'], kind)
+    if kind == 'float64':
+        return [None if v != v else v for v in values]
+    return [float(v) for v in values]
+
+def decode_rows(table):
+    """
+    returns rows of a columnar object, as the row layout holds them.
+    """
+    columns = [decode_column(column) for column in table['columns']]
+    return [list(row) for row in zip(*columns)] if columns else []
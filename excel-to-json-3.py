@@ -1,73 +1,223 @@
 #!python3
 
 import argparse
+import concurrent.futures
+import contextlib
+import functools
+import os
 import os.path
-import codecs
-import re
-import json
-import win32com.client
-import pythoncom
+import glob
+import itertools
+import cellrange
+import columnar
+import formulagraph
+import formularuns
+import jsonstream
+import linejson
+import manifest
+import multiprocessing
+import multiprocessing.util
+import time
+import numfmt
+import profiling
+import records
+import shutil
+import sqlitedb
+import threading
+import watcher
+import xlsxreader
+
+try:
+    import win32com.client
+    import pythoncom
+except ImportError:
+    # the xlsx backend works without pywin32.
+    win32com = pythoncom = None
+
+# XlCalculation
+XL_CALCULATION_MANUAL = -4135
+
+# Application settings turned off while reading with the fast profile.
+FAST_READ = (('ScreenUpdating', False), ('EnableEvents', False), ('DisplayAlerts', False))
 
 class ExcelApp(object):
     """
     Excel.Application as a context
+    dispatch replaces win32com.client.DispatchEx, e.g. fakeexcel.DispatchEx.
+    fast: turns off screen updating, events, alerts and recalculation while started,
+    and restores them on exit, even after an exception.
     """
-    def __init__(self, visible=True, coinitialize=False):
+    def __init__(self, visible=True, coinitialize=False, dispatch=None, fast=False):
         self.visible = visible
         self.coinitialize = coinitialize
+        self.dispatch = dispatch
+        self.fast = fast
         self.app = None
+        self.saved = []
+        self.scratch = None
         
+    @profiling.timed('start')
     def __enter__(self):
         if self.coinitialize:
             pythoncom.CoInitialize()
-        self.app = win32com.client.DispatchEx('Excel.Application')
+        dispatch = self.dispatch or win32com.client.DispatchEx
+        self.app = profiling.wrap(dispatch('Excel.Application'))
         self.app.Application.Visible = self.visible
         self.app.Application.AskToUpdateLinks = False
+        if self.fast:
+            try:
+                self.fast_read()
+            except Exception:
+                self.__exit__(None, None, None)
+                raise
         return self.app
         
+    def fast_read(self):
+        """
+        saves and turns off the settings of FAST_READ, and sets manual calculation.
+        Calculation can be set only with a book open; a scratch book is kept open,
+        so books opened later take manual calculation and are not recalculated on open.
+        """
+        app = self.app.Application
+        for name, value in FAST_READ:
+            self.saved.append((name, getattr(app, name)))
+            setattr(app, name, value)
+        self.scratch = app.Workbooks.Add()
+        self.saved.append(('Calculation', app.Calculation))
+        app.Calculation = XL_CALCULATION_MANUAL
+    
+    def restore(self):
+        """
+        restores settings saved by fast_read, the last one first,
+        so Calculation is set back while the scratch book is still open.
+        """
+        app = self.app.Application
+        while self.saved:
+            name, value = self.saved.pop()
+            try:
+                setattr(app, name, value)
+            except Exception as e:
+                print('Failed to restore %s: %s' % (name, e))
+        if self.scratch is not None:
+            self.scratch.Saved = True
+            self.scratch.Close()
+            self.scratch = None
+    
+    @profiling.timed('quit')
     def __exit__(self, type, value, traceback):
-        self.app.Quit()
-        del self.app
-        if self.coinitialize:
-            pythoncom.CoUninitialize()
+        try:
+            self.restore()
+        finally:
+            self.app.Quit()
+            del self.app
+            if self.coinitialize:
+                pythoncom.CoUninitialize()
 
 class ExcelBook(object):
     """
     Excel.Application.Workbook as a context
     """
-    def __init__(self, app, filename):
+    def __init__(self, app, filename, read_only=False):
         self.app = app
         self.filename = filename
+        self.read_only = read_only
         self.book = None
         
+    @profiling.timed('open')
     def __enter__(self):
         print('Opening %s ...' % self.filename)
-        self.book = self.app.Workbooks.Open(self.filename)
+        if self.read_only:
+            # Open(Filename, UpdateLinks, ReadOnly)
+            book = self.app.Workbooks.Open(self.filename, 0, True)
+        else:
+            book = self.app.Workbooks.Open(self.filename)
+        # wraps books of a backend not wrapped by ExcelApp.
+        self.book = profiling.wrap(book)
         return self.book
         
+    @profiling.timed('close')
     def __exit__(self, type, value, traceback):
         self.book.Saved = True
         self.book.Close()
         del self.book
         print('%s closed.' % self.filename)
 
+class ExcelPool(object):
+    """
+    long-lived Excel instances shared by many books.
+    an instance is recycled after max_books books, or when a book fails.
+    factory returns a new ExcelApp like context.
+    COM objects belong to the thread which created them;
+    use a pool from one thread only.
+    """
+    def __init__(self, factory, max_books=50):
+        self.factory = factory
+        self.max_books = max_books
+        self.idle = []
+        self.started = 0
+        self.recycled = 0
+    
+    def acquire(self):
+        """
+        returns [context, app, books done] of an idle or a new instance.
+        """
+        if self.idle:
+            return self.idle.pop()
+        context = self.factory()
+        app = context.__enter__()
+        self.started += 1
+        return [context, app, 0]
+    
+    def release(self, entry, failed=False):
+        entry[2] += 1
+        if failed or entry[2] >= self.max_books:
+            self.retire(entry)
+        else:
+            self.idle.append(entry)
+    
+    def retire(self, entry):
+        self.recycled += 1
+        try:
+            entry[0].__exit__(None, None, None)
+        except Exception as e:
+            print('Failed to quit an instance: %s' % e)
+    
+    def convert(self, function, *args):
+        """
+        calls function(app, *args) with a pooled app.
+        """
+        entry = self.acquire()
+        try:
+            result = function(entry[1], *args)
+        except Exception:
+            self.release(entry, failed=True)
+            raise
+        self.release(entry)
+        return result
+    
+    def close(self):
+        while self.idle:
+            self.retire(self.idle.pop())
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, type, value, traceback):
+        self.close()
+
 class AddressHelper:
     """
     manipulates cell adress string.
+    parsing is done by cellrange, which works on integer coordinates.
     """
-    p1 = re.compile(r'^([$\w]+)(?::([$\w]+))?$')
-    p2 = re.compile(r'\$')
-    p3 = re.compile(r'(\$?[a-zA-Z]+)(\$?[0-9]+)')
-    p4 = re.compile(r'\$?([a-zA-Z]+)\$?([0-9]+)')
-    p5 = re.compile(r'(?<!\$)((?<![a-zA-Z])[a-zA-Z]+|(?<![0-9])[0-9]+)')
-    
     @classmethod
     def join(cls, address1, address2):
         return ':'.join((address1, address2))
     
     @classmethod
     def split(cls, address):
-        return cls.p1.match(address).groups()
+        begin, sep, end = address.partition(':')
+        return (begin, end if sep else None)
     
     @classmethod
     def begin_at(cls, address):
@@ -80,93 +230,167 @@ class AddressHelper:
     
     @classmethod
     def no_absolute(cls, address):
-        return re.sub(cls.p2, '', address)
+        return address.replace('$', '')
     
     @classmethod
     def col_row(cls, address, absolute=None):
+        col_abs, col, row_abs, row = cellrange.split_cell(cls.begin_at(address))
         if absolute == None:
-            cr = cls.p3.match(address).groups()
+            cr = (col_abs + col, row_abs + row)
         elif absolute == False:
-            cr = cls.p4.match(address).groups()
+            cr = (col, row)
         else:
-            cr = cls.p3.match(re.sub(cls.p5, r'$\1', address)).groups()
+            cr = ('$' + col, '$' + row)
         return cr
     
     @classmethod
     def col(cls, address):
-        return cls.col_row(address, False)[0]
+        return cellrange.split_cell(cls.begin_at(address))[1]
     
     @classmethod
     def row(cls, address):
-        return int(cls.col_row(address, False)[1])
+        return int(cellrange.split_cell(cls.begin_at(address))[3])
 
-def make_params(args, sheet):
+class SheetGeometry(object):
+    """
+    origin value and bounds of the current region of a sheet, resolved once
+    and shared by get_header, get_region and convert_sheet.
+    bounds are integers, columns are numbered from 1.
+    calls counts round trips made here; 2 for a blank sheet, 4 otherwise.
+    """
+    def __init__(self, sheet, origin):
+        self.sheet = sheet
+        self.origin = origin
+        self.row_begin, self.col_begin = cellrange.parse_cell(origin)
+        self.calls = 0
+        self._cell = None
+        self._value = None
+        self._has_value = False
+        self._end = None
+    
+    @property
+    def cell(self):
+        if self._cell is None:
+            self._cell = self.sheet.Range(self.origin)
+            self.calls += 1
+        return self._cell
+    
+    @property
+    def value(self):
+        """
+        Value of the origin cell.
+        """
+        if not self._has_value:
+            self._value = self.cell.Value
+            self._has_value = True
+            self.calls += 1
+        return self._value
+    
+    @property
+    def end(self):
+        """
+        address of the last cell of the current region.
+        """
+        if self._end is None:
+            current_region = self.cell.CurrentRegion.Address
+            self.calls += 2
+            bounds = cellrange.parse_range(current_region)
+            self.row_end = bounds[2]
+            self.col_end = bounds[3]
+            self._end = cellrange.cell_address(self.row_end, self.col_end)
+        return self._end
+    
+    @property
+    def bounds(self):
+        """
+        (row begin, col begin, row end, col end) of the current region.
+        """
+        self.end
+        return (self.row_begin, self.col_begin, self.row_end, self.col_end)
+
+def make_params(args, sheet, geometry=None):
     """
     returns params defined by both of args and the 1st sheet.
     """
     params = {}
-    (col_begin, col_end, row_begin, has_header, headers) = get_header(args, sheet)
+    (col_begin, col_end, row_begin, has_header, headers) = get_header(args, sheet, geometry)
     params['col_begin'] = col_begin
     params['col_end'] = col_end
     params['row_begin'] = row_begin
     params['has_header'] = has_header
-    params['headers'] = headers if not args.url else headers + ('URL',)
+    params['headers'] = headers if not args.url else headers + url_headers(args)
     
     return params
 
-def get_header(args, sheet):
+def url_headers(args):
+    """
+    returns headers of url columns; URL, or URL_C, URL_E, ... for several.
+    """
+    cols = args.url.split(',')
+    if len(cols) == 1:
+        return ('URL',)
+    return tuple('URL_%s' % AddressHelper.no_absolute(col) for col in cols)
+
+@profiling.timed('header')
+def get_header(args, sheet, geometry=None):
     """
     determines the column range and gets header content.
     (columnBegin, columnEnd, rowBegin, hasHeader, Headers)
     """
     # continuous region from the origin
-    end = end_of_current_region(sheet, args.origin)
-    begin = args.origin
+    geometry = geometry or SheetGeometry(sheet, args.origin)
+    geometry.end
     
     # filter the columns
     if args.columns:
         col_begin = AddressHelper.begin_at(args.columns)
         col_end = AddressHelper.end_at(args.columns)
     else:
-        col_begin = AddressHelper.col(begin)
-        col_end = AddressHelper.col(end)
+        col_begin = cellrange.col_letters(geometry.col_begin)
+        col_end = cellrange.col_letters(geometry.col_end)
     
     # work around headers
     has_header = not args.noheader
-    row_begin = AddressHelper.row(begin)
+    row_begin = geometry.row_begin
     if has_header:
-        header_address = '%s%d:%s%d' % (col_begin, row_begin, col_end, row_begin)
-        headers = sheet.Range(header_address).Value[0]
+        header_address = cellrange.range_address(
+            row_begin, cellrange.col_number(col_begin), row_begin, cellrange.col_number(col_end))
+        headers = as_matrix(sheet.Range(header_address).Value)[0]
         row_begin += 1
     else:
         headers = None
     
     return (col_begin, col_end, row_begin, has_header, headers)
 
-def get_region(params, args, sheet):
+@profiling.timed('region')
+def get_region(params, args, sheet, geometry=None):
     """
     get table addresses to convert with processing command arguments.
     (whole table, url table)
+    url table joins a column range per url column with commas.
     """
     # continuous region from the origin
-    end = end_of_current_region(sheet, args.origin)
+    geometry = geometry or SheetGeometry(sheet, args.origin)
+    geometry.end
     
     # data rows
-    row_end = AddressHelper.row(end)
+    row_end = geometry.row_end
     row_begin = params['row_begin']
     if row_begin > row_end:
         # no data rows
         return (None, None)
     
     # data columns
-    col_begin = params['col_begin']
-    col_end = params['col_end']
+    col_begin = cellrange.col_number(params['col_begin'])
+    col_end = cellrange.col_number(params['col_end'])
     
-    whole_table = '%s%d:%s%d' % (col_begin, row_begin, col_end, row_end)
+    whole_table = cellrange.range_address(row_begin, col_begin, row_end, col_end)
     
     # url
     if args.url:
-        url_table = '%s%d:%s%d' % (args.url, row_begin, args.url, row_end)
+        url_cols = [cellrange.col_number(col) for col in args.url.split(',')]
+        url_table = cellrange.areas_address(
+            [(row_begin, col, row_end, col) for col in url_cols])
     else:
         url_table = None
     
@@ -177,101 +401,924 @@ def end_of_current_region(sheet, origin):
     """
     get an address of the last cell of current region.
     """
-    current_region = sheet.Range(origin).CurrentRegion.Address
-    return AddressHelper.end_at(current_region)
+    return SheetGeometry(sheet, origin).end
 
+def as_matrix(value):
+    """
+    Range.Value of a single cell is not a matrix.
+    """
+    return value if isinstance(value, tuple) else ((value,),)
+
+@profiling.timed('text')
+def get_text_by_cell(sheet, whole_table):
+    """
+    returns Text of each cell, one call per cell.
+    """
+    table = sheet.Range(whole_table)
+    nrow = table.Rows.Count
+    ncol = table.Columns.Count
+    data = []
+    for r in range(nrow):
+        row = []
+        for c in range(ncol):
+            row.append(table.Cells(r+1, c+1).Text)
+        data.append(row)
+    return data
+
+def shown_as(value, text, width):
+    """
+    tells if Text of a cell of the value is the text rendered for a column of width characters;
+    a number too wide for the column shows #### instead.
+    """
+    if value is None or isinstance(value, str):
+        return True
+    return len(text) <= width and not text.startswith('##')
+
+def column_renderer(format, width):
+    """
+    returns a function rendering values of a column as Text does, or None if unsupported.
+    General is rendered to the width of the column.
+    """
+    render = numfmt.compile(format)
+    if render is numfmt.general:
+        return functools.partial(numfmt.general, width=width)
+    return render
+
+@profiling.timed('text')
+def get_text(sheet, whole_table):
+    """
+    returns Text of each cell rendered from bulk Value, NumberFormat and ColumnWidth per column.
+    columns of mixed or unsupported formats, of values the format fails to render,
+    or of numbers showing #### in the column fall back to Text of each cell.
+    """
+    table = sheet.Range(whole_table)
+    values = as_matrix(table.Value)
+    columns = table.Columns
+    ncol = columns.Count
+    formats = [columns(c+1).NumberFormat for c in range(ncol)]
+    widths = [columns(c+1).ColumnWidth if numfmt.compile(formats[c]) else None
+              for c in range(ncol)]
+    data = [[None] * ncol for row in values]
+    for c, width in enumerate(widths):
+        if width:
+            render = column_renderer(formats[c], width)
+            try:
+                for row, value in zip(data, values):
+                    text = row[c] = render(value[c])
+                    if not shown_as(value[c], text, width):
+                        break
+                else:
+                    continue
+            except (ValueError, TypeError, OverflowError):
+                # a value the format cannot render, as Excel shows it.
+                pass
+        for r, row in enumerate(data):
+            row[c] = table.Cells(r+1, c+1).Text
+    return data
+
+@profiling.timed('urls')
+def get_urls(sheet, url_table, none):
+    """
+    returns addresses of hyperlinks per row of url table, a list per row.
+    enumerates Hyperlinks of each url column once, instead of once per row.
+    a link belongs to the top row of its anchor; an anchor of several rows
+    starting above the table, in the header or a previous block, is skipped.
+    """
+    areas = url_table.split(',')
+    bounds = cellrange.parse_range(areas[0])
+    row_begin, row_end = bounds[0], bounds[2]
+    urls = [[none] * len(areas) for i in range(row_end - row_begin + 1)]
+    for k, area in enumerate(areas):
+        for hyperlink in sheet.Range(area).Hyperlinks:
+            row = hyperlink.Range.Row
+            if row_begin <= row <= row_end:
+                urls[row - row_begin][k] = hyperlink.Address
+    return urls
+
+@profiling.timed('value')
 def get_value(args, sheet, whole_table, url_table):
     """
     returns a matrix value
     """
     if args.text:
-        nrow = sheet.Range(whole_table).Rows.Count
-        ncol = sheet.Range(whole_table).Columns.Count
-        data = []
-        for r in range(nrow):
-            row = []
-            for c in range(ncol):
-                row.append(sheet.Range(whole_table).Cells(r+1, c+1).Text)
-            if url_table:
-                hyperlinks = sheet.Range(url_table).Rows(r+1).Hyperlinks
-                url = hyperlinks(1).Address if hyperlinks.Count > 0 else ''
-                row.append(url)
-            data.append(row)
+        if args.textmode == 'cell':
+            data = get_text_by_cell(sheet, whole_table)
+        else:
+            data = get_text(sheet, whole_table)
+        if url_table:
+            urls = get_urls(sheet, url_table, '')
+            for row, url in zip(data, urls):
+                row.extend(url)
     else:
         if args.formula:
-            whole = sheet.Range(whole_table).FormulaR1C1
+            whole = as_matrix(sheet.Range(whole_table).FormulaR1C1)
             none = ""
         else:
-            whole = sheet.Range(whole_table).Value
+            whole = as_matrix(sheet.Range(whole_table).Value)
             none = None
             
         if url_table:
-            data = []
-            n = len(whole)
-            for i in range(n):
-                hyperlinks = sheet.Range(url_table).Rows(i+1).Hyperlinks
-                url = hyperlinks(1).Address if hyperlinks.Count > 0 else none
-                data.append(whole[i] + (url,))
+            urls = get_urls(sheet, url_table, none)
+            data = [row + tuple(url) for row, url in zip(whole, urls)]
         else:
             data = whole
             
     return data
 
-def make_json_files(params, args, sheets):
+def block_address(address, row_begin, row_end):
+    """
+    returns the address with rows replaced, for each comma separated area.
+    """
+    areas = [cellrange.with_rows(bounds, row_begin, row_end)
+             for bounds in cellrange.parse_areas(address)]
+    return cellrange.areas_address(areas)
+
+def iter_blocks(args, sheet, whole_table, url_table):
+    """
+    yields matrix values of row blocks of args.block rows each,
+    so that no more than a block is held at once.
+    """
+    bounds = cellrange.parse_range(whole_table)
+    for block in cellrange.split_rows(bounds, args.block):
+        begin, end = block[0], block[2]
+        block_table = cellrange.range_address(*block)
+        block_url_table = block_address(url_table, begin, end) if url_table else None
+        yield get_value(args, sheet, block_table, block_url_table)
+
+def iter_rows(args, sheet, whole_table, url_table):
+    for block in iter_blocks(args, sheet, whole_table, url_table):
+        for row in block:
+            yield row
+
+def column_letters(params, args):
+    """
+    returns column letters of output columns, url columns as URL, URL_C, ...
+    """
+    col_begin = cellrange.col_number(params['col_begin'])
+    col_end = cellrange.col_number(params['col_end'])
+    letters = [cellrange.col_letters(col) for col in range(col_begin, col_end + 1)]
+    return letters + list(url_headers(args)) if args.url else letters
+
+def column_names(params, args):
+    """
+    returns a name per output column; headers, or column letters without a header row.
+    """
+    if params['has_header']:
+        return list(params['headers'])
+    return column_letters(params, args)
+
+def record_keys(params, args):
+    return records.unique_keys(column_names(params, args), column_letters(params, args))
+
+def table_writer(args, params=None):
+    """
+    returns a writer of args.layout, of the signature of jsonstream.write_rows.
+    rows: an array of rows, columns: an array per column, see columnar,
+    records: an object per row keyed by headers, see records.
+    runs: rectangles of equal cells and a table of the values, see formularuns.
+    with args.ndjson, a linejson.Writer writing a row or a record per line.
+    """
+    if args.ndjson:
+        if args.layout == 'records' and params:
+            encode_row = records.record_encoder(record_keys(params, args), pretty=False)
+        else:
+            encode_row = jsonstream.encode_compact
+        return linejson.Writer(encode_row, args.offset_every)
+    if args.layout == 'columns':
+        names = column_names(params, args) if params else None
+        return functools.partial(columnar.write_columns, names=names)
+    if args.layout == 'runs':
+        names = column_names(params, args) if params else None
+        return functools.partial(formularuns.write_runs, names=names)
+    if args.layout == 'records':
+        keys = record_keys(params, args) if params else None
+        return functools.partial(records.write_records, keys=keys)
+    return jsonstream.write_rows
+
+def sheet_file_name(args, counter, part=None):
+    """
+    returns sheet1.json, sheet1.ndjson, or sheet1-part0001.json of a part.
+    """
+    extension = 'ndjson' if args.ndjson else 'json'
+    if part is None:
+        return r'sheet%d.%s' % (counter, extension)
+    return r'sheet%d-part%04d.%s' % (counter, part, extension)
+
+def write_json(args, file_name, data, params=None):
+    """
+    writes a matrix value, or rows from an iterator, as json in args.layout.
+    indented as json.dump(indent=4) makes, or compact with args.compact.
+    with args.ndjson, writes the offsets sidecar too.
+    returns the number of rows.
+    """
+    write = table_writer(args, params)
+    count = jsonstream.write_json(file_name, data, pretty=not args.compact, write=write)
+    if args.ndjson:
+        write.save(linejson.offsets_name(file_name))
+    return count
+
+def write_json_digest(args, file_name, data, params=None):
+    """
+    writes as write_json does. returns (number of rows, digest).
+    """
+    write = table_writer(args, params)
+    count, digest = jsonstream.write_json_digest(file_name, data, pretty=not args.compact,
+                                                 write=write)
+    if args.ndjson:
+        write.save(linejson.offsets_name(file_name))
+    return (count, digest)
+
+def place_file(known, temp, file_name, digest):
+    """
+    moves a file written at temp into file_name.
+    with known, a Manifest, a file of the same content as the last run is left untouched.
+    returns True if replaced.
+    """
+    if known is None:
+        os.replace(temp, file_name)
+        return True
+    replaced = known.replace(temp, file_name, digest)
+    if not replaced:
+        print('unchanged: %s' % file_name)
+    return replaced
+
+def place_sheet(args, known, temp, file_name, digest):
+    """
+    moves a sheet file and its sidecar written at temp into file_name.
+    with known, a Manifest, files of the same content as the last run are left untouched.
+    """
+    replaced = place_file(known, temp, file_name, digest)
+    if args.ndjson:
+        sidecar = linejson.offsets_name(file_name)
+        if replaced or not os.path.exists(sidecar):
+            os.replace(linejson.offsets_name(temp), sidecar)
+        else:
+            os.remove(linejson.offsets_name(temp))
+
+def remove_temp(temp):
+    """
+    removes a temporary file and its offsets sidecar, if any.
+    """
+    for file_name in (temp, linejson.offsets_name(temp)):
+        try:
+            os.remove(file_name)
+        except OSError:
+            pass
+
+def remove_temps(dest):
+    """
+    removes temporary files of sheets left in dest by a failed book.
+    """
+    for file_name in glob.glob(os.path.join(dest, '.sheet*')):
+        remove_temp(file_name)
+
+@profiling.timed('write')
+def write_temps(args, temp_base, data, params=None):
+    """
+    writes a sheet into temporary files named after temp_base;
+    one file, or a part per args.rows_per_file rows split while reading rows.
+    on failure, removes the files written so far.
+    returns [(temporary file name, rows, digest)].
+    """
+    size = args.rows_per_file
+    temps = []
+    try:
+        if not size:
+            temp = temp_base + '.tmp'
+            temps.append(temp)
+            count, digest = write_json_digest(args, temp, data, params)
+            return [(temp, count, digest)]
+        written = []
+        rows = iter(data)
+        for head in rows:
+            part = itertools.chain([head], itertools.islice(rows, size - 1))
+            temp = '%s-part%04d.tmp' % (temp_base, len(written) + 1)
+            temps.append(temp)
+            count, digest = write_json_digest(args, temp, part, params)
+            written.append((temp, count, digest))
+        return written
+    except BaseException:
+        for temp in temps:
+            remove_temp(temp)
+        raise
+
+def place_files(args, known, counter, title, written, deps=None):
+    """
+    moves files of a sheet written by write_temps into place.
+    returns the entry of index.json.
+    ndjson entries have the number of rows and the offsets sidecar.
+    entries of parts have the number of rows, and the file name, the first row (0-based),
+    the number of rows and the size in bytes of each part.
+    deps: (temporary file name, digest) of the adjacency file written by write_deps, if any.
+    """
+    if deps:
+        temp, digest = deps
+        deps = formulagraph.deps_name(sheet_file_name(args, counter))
+        place_file(known, temp, os.path.join(args.dest, deps), digest)
+    if not args.rows_per_file:
+        temp, count, digest = written[0]
+        file_name = sheet_file_name(args, counter)
+        place_sheet(args, known, temp, os.path.join(args.dest, file_name), digest)
+        entry = {'title': title, 'url': file_name}
+        if args.ndjson:
+            entry['rows'] = count
+            entry['offsets'] = linejson.offsets_name(file_name)
+        if deps:
+            entry['deps'] = deps
+        return entry
+    parts = []
+    first = 0
+    for k, (temp, count, digest) in enumerate(written):
+        file_name = sheet_file_name(args, counter, k + 1)
+        full_file_name = os.path.join(args.dest, file_name)
+        place_sheet(args, known, temp, full_file_name, digest)
+        part = {'url': file_name, 'first': first, 'rows': count,
+                'bytes': os.path.getsize(full_file_name)}
+        if args.ndjson:
+            part['offsets'] = linejson.offsets_name(file_name)
+        parts.append(part)
+        first += count
+    entry = {'title': title, 'url': parts[0]['url'], 'rows': first, 'parts': parts}
+    if deps:
+        entry['deps'] = deps
+    return entry
+
+@profiling.timed('deps')
+def write_deps(params, args, temp_base, title, data):
+    """
+    writes which cells each formula of a sheet refers to into a temporary file
+    named after temp_base, from a matrix of FormulaR1C1. see formulagraph.
+    place_files moves it into sheet1.deps.json.
+    returns (temporary file name, digest).
+    """
+    col_begin = cellrange.col_number(params['col_begin'])
+    width = cellrange.col_number(params['col_end']) - col_begin + 1
+    graph = formulagraph.Graph()
+    graph.add_sheet(title, (row[:width] for row in data), params['row_begin'], col_begin)
+    temp = temp_base + '.deps.tmp'
+    formulagraph.write_adjacency(graph, title, temp)
+    return (temp, manifest.file_digest(temp))
+
+class SheetPipeline(object):
+    """
+    writes sheets by write_temps on worker threads, while the caller reads the next sheet.
+    no more than queue sheets are held read but not written; put() waits for a slot.
+    the caller reads through COM on its own thread; writers get matrix values only.
+    """
+    def __init__(self, args, params, workers, queue):
+        self.args = args
+        self.params = params
+        self.executor = concurrent.futures.ThreadPoolExecutor(workers)
+        self.slots = threading.BoundedSemaphore(queue)
+        self.error = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        # wait for writers even on a failure, not to leave them writing into dest.
+        self.executor.shutdown(wait=True)
+        return False
+    
+    def put(self, temp_base, data):
+        """
+        hands a matrix value to a writer. raises the error of a writer failed already.
+        returns a future of files written.
+        """
+        self.slots.acquire()
+        if self.error is not None:
+            self.slots.release()
+            raise self.error
+        future = self.executor.submit(write_temps, self.args, temp_base, data, self.params)
+        future.add_done_callback(self.written)
+        return future
+    
+    def written(self, future):
+        if future.exception() is not None and self.error is None:
+            self.error = future.exception()
+        self.slots.release()
+
+def sheet_pipeline(params, args):
+    """
+    returns a SheetPipeline with args.pipeline writers, or a null context of None.
+    """
+    if not args.pipeline:
+        return contextlib.nullcontext()
+    return SheetPipeline(args, params, args.pipeline, args.pipeline_queue)
+
+def make_json_files(params, args, sheets, first=None, known=None):
     """
     converts Worksheets into json files.
+    first: SheetGeometry of the 1st sheet, already resolved by make_params.
+    known: Manifest of the last run, to keep unchanged sheet files.
+    with args.pipeline, sheets are written while the next sheet is read,
+    and moved into place in the book order at the end.
     returns index of files generated.
     """
     index = []
     counter = 0
+    pending = []
     
-    for sheet in sheets:
-        if sheet.Range(args.origin).Value == None:
-            print('Skipping blank worksheet at %s' % sheet.Name)
-            continue
-            
-        whole_table, url_table = get_region(params, args, sheet)
-        if not whole_table:
-            print('Skipping empty line worksheet at %s' % sheet.Name)
-            continue
-        
-        data = get_value(args, sheet, whole_table, url_table)
+    try:
+        with sheet_pipeline(params, args) as pipeline:
+            for position, sheet in enumerate(sheets):
+                if position == 0 and first:
+                    geometry = first
+                else:
+                    geometry = SheetGeometry(sheet, args.origin)
+                data = convert_sheet(params, args, sheet, geometry)
+                if data is None:
+                    continue
+                
+                counter += 1
+                file_name = sheet_file_name(args, counter)
+                full_file_name = os.path.join(args.dest, file_name)
+                sheet_name = sheet.name
+                print('%d: %s: %s' % (counter, full_file_name, sheet_name))
+                
+                temp_base = os.path.join(args.dest, '.sheet%d' % position)
+                deps = write_deps(params, args, temp_base, sheet_name, data) if args.deps else None
+                if pipeline:
+                    pending.append((counter, sheet_name, pipeline.put(temp_base, data), deps))
+                    continue
+                written = write_temps(args, temp_base, data, params)
+                index += [place_files(args, known, counter, sheet_name, written, deps)]
         
-        counter += 1
-        file_name = r'sheet%d.json' % counter
-        full_file_name = os.path.join(args.dest, file_name)
-        sheet_name = sheet.name
-        index += [{'title': sheet_name, 'url': file_name}]
-        print('%d: %s: %s' % (counter, full_file_name, sheet_name))
+        for counter, sheet_name, future, deps in pending:
+            index += [place_files(args, known, counter, sheet_name, future.result(), deps)]
+    except BaseException:
+        # sheets written but not placed yet, by the pipeline or before a failed sheet.
+        remove_temps(args.dest)
+        raise
+    write_index(params, args, index)
+    return index
+
+def index_columns(args, names, letters):
+    """
+    returns column names of args.index, given as headers or column letters.
+    """
+    if not args.index:
+        return []
+    found = []
+    for column in args.index.split(','):
+        column = column.strip()
+        if column in names:
+            found.append(column)
+        elif column.upper() in letters:
+            found.append(names[letters.index(column.upper())])
+        else:
+            raise ValueError('no column to index: %s' % column)
+    return found
+
+def make_sqlite(params, args, sheets, first=None):
+    """
+    converts Worksheets into tables of dest/book.sqlite, sheet1, sheet2, ...
+    columns are named after headers, as records are keyed.
+    indexes columns of args.index, and builds sheet1_fts over text columns with args.fts.
+    returns index of tables generated.
+    """
+    file_name = os.path.join(args.dest, 'book.sqlite')
+    if os.path.exists(file_name):
+        os.remove(file_name)
+    names = sqlitedb.sql_names(record_keys(params, args))
+    indexed = index_columns(args, names, column_letters(params, args))
+    connection = sqlitedb.connect(file_name)
+    fts_wanted = args.fts and sqlitedb.has_trigram(connection)
+    if args.fts and not fts_wanted:
+        print('Skipping full-text search; sqlite %s has no trigram tokenizer' %
+              sqlitedb.sqlite3.sqlite_version)
+    index = []
+    counter = 0
+    
+    try:
+        for position, sheet in enumerate(sheets):
+            if position == 0 and first:
+                geometry = first
+            else:
+                geometry = SheetGeometry(sheet, args.origin)
+            data = convert_sheet(params, args, sheet, geometry)
+            if data is None:
+                continue
             
-        with codecs.open(full_file_name, 'w', 'utf-8') as outfile:
-            json.dump(data, outfile, ensure_ascii=False, indent=4)
+            counter += 1
+            table = 'sheet%d' % counter
+            start = time.perf_counter()
+            with profiling.phase('write'):
+                count = sqlitedb.write_table(connection, table, names, data)
+                sqlitedb.create_indexes(connection, table, indexed)
+                fts = None
+                if fts_wanted:
+                    texts = sqlitedb.text_columns(connection, table, names)
+                    fts = sqlitedb.create_fts(connection, table, texts) if texts else None
+            elapsed = time.perf_counter() - start
+            print('%d: %s: %s: %s (%d rows, %.0f rows/s)' % (
+                counter, file_name, table, sheet.name, count, count / max(elapsed, 1e-9)))
             
+            entry = {'title': sheet.name, 'table': table, 'rows': count}
+            if fts:
+                entry['fts'] = fts
+            connection.execute('INSERT INTO sheets VALUES (?, ?, ?, ?, ?, ?)', (
+                counter, sheet.name, table, count, jsonstream.encode_compact(names), fts))
+            index += [entry]
+    finally:
+        connection.close()
+    
+    write_index(params, args, index)
+    return index
+
+@profiling.timed('sheet')
+def convert_sheet(params, args, sheet, geometry=None):
+    """
+    returns a matrix value of a sheet, or None to skip the sheet.
+    with args.block, returns an iterator of rows read block by block.
+    """
+    geometry = geometry or SheetGeometry(sheet, args.origin)
+    if geometry.value == None:
+        print('Skipping blank worksheet at %s' % sheet.Name)
+        return None
+    
+    whole_table, url_table = get_region(params, args, sheet, geometry)
+    if not whole_table:
+        print('Skipping empty line worksheet at %s' % sheet.Name)
+        return None
+    
+    if args.block:
+        return iter_rows(args, sheet, whole_table, url_table)
+    return get_value(args, sheet, whole_table, url_table)
+
+@profiling.timed('index')
+def write_index(params, args, index):
+    """
+    writes columns.json and index.json.
+    """
     if params['has_header']:
         column_file_name = os.path.join(args.dest, 'columns.json')
-        with codecs.open(column_file_name, 'w', 'utf-8') as outfile:
-            json.dump(params['headers'], outfile, ensure_ascii=False, indent=4)
+        jsonstream.dump(params['headers'], column_file_name)
     
     index_file_name = os.path.join(args.dest, 'index.json')
-    with codecs.open(index_file_name, 'w', 'utf-8') as outfile:
-        json.dump(index, outfile, ensure_ascii=False, indent=4)
+    jsonstream.dump(index, index_file_name)
     
+def make_app(args, coinitialize=False):
+    """
+    returns an application context of the backend.
+    excel: Excel through COM, xlsx: reads the package without Excel.
+    """
+    if args.backend == 'xlsx':
+        return xlsxreader.XlsxApp()
+    return ExcelApp(visible=not args.invisible, coinitialize=coinitialize, fast=args.fast)
+
+def book_manifest(args):
+    """
+    returns the Manifest of args.dest with args.incremental, or None.
+    """
+    if not args.incremental:
+        return None
+    return manifest.Manifest(args.dest, args.filename, manifest.options_of(args))
+
+def skip_book(args, known):
+    """
+    returns index of the last run if the book is unchanged, or None to convert it.
+    """
+    if known is None:
+        return None
+    index = known.unchanged()
+    if index is not None:
+        print('Skipping unchanged %s' % args.filename)
+    return index
+
+def convert_book(app, args, known=None):
+    """
+    converts a book into json files with an application already started.
+    returns index.
+    """
+    with ExcelBook(app, args.filename, read_only=args.fast) as book:
+        sheets = book.Worksheets
+        first = SheetGeometry(sheets[0], args.origin)
+        params = make_params(args, first.sheet, first)
+        if args.sqlite:
+            index = make_sqlite(params, args, sheets, first)
+        else:
+            index = make_json_files(params, args, sheets, first, known)
+            
+        if args.verbose:
+            print(params)
+            print(index)
+    if known:
+        known.save(index)
     return index
 
 def excel_to_json(args):
     """
     converts Excel book into json files per worksheet.
-    expects args; filename, dest, columns, url, noheader, verbose
+    expects args; filename, dest, columns, url, noheader, verbose, backend
+    with args.incremental, an unchanged book is skipped without starting Excel.
     """
-    with ExcelApp(visible=not args.invisible) as app:
-        with ExcelBook(app, args.filename) as book:
-            sheets = book.Worksheets
-            params = make_params(args, sheets[0])
-            index = make_json_files(params, args, sheets)
-            
-            if args.verbose:
-                print(params)
-                print(index)
+    known = book_manifest(args)
+    if skip_book(args, known) is not None:
+        return
+    with make_app(args) as app:
+        convert_book(app, args, known)
+
+def find_books(pattern):
+    """
+    returns book file names of a directory or a glob pattern, sorted.
+    """
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, '*.xls*')
+    return sorted(f for f in glob.glob(pattern)
+                  if not os.path.basename(f).startswith('~$'))
+
+def book_args(args, filename):
+    """
+    returns a copy of args for a book; output goes to dest/<book name>.
+    """
+    name = os.path.splitext(os.path.basename(filename))[0]
+    each = argparse.Namespace(**vars(args))
+    each.filename = filename
+    each.dest = os.path.join(args.dest, name)
+    return each
+
+def convert_pooled(pool, args):
+    """
+    converts a book with a pooled app.
+    returns (filename, seconds, index or None on failure).
+    """
+    if not os.path.isdir(args.dest):
+        os.makedirs(args.dest)
+    start = time.perf_counter()
+    try:
+        known = book_manifest(args)
+        index = skip_book(args, known)
+        if index is None:
+            index = pool.convert(convert_book, args, known)
+    except Exception as e:
+        print('Failed %s: %s' % (args.filename, e))
+        index = None
+    seconds = time.perf_counter() - start
+    print('%.3f sec: %s' % (seconds, args.filename))
+    return (args.filename, seconds, index)
+
+def excel_to_json_batch(args, filenames, factory=None):
+    """
+    converts many books through a pool of long-lived Excel instances.
+    returns a list of (filename, seconds, index or None on failure).
+    the total printed is the wall time of the batch, starting Excel included.
+    """
+    start = time.perf_counter()
+    if args.jobs > 1:
+        results, started = batch_jobs(args, filenames, factory)
+    else:
+        factory = factory or (lambda: make_app(args))
+        with ExcelPool(factory, args.recycle) as pool:
+            results = [convert_pooled(pool, book_args(args, f)) for f in filenames]
+            started = pool.started
+    total = time.perf_counter() - start
+    failed = sum(1 for r in results if r[2] is None)
+    print('%d books (%d failed) in %.3f sec, %d Excel started' %
+          (len(results), failed, total, started))
+    return results
+
+def swap_output(staging, dest):
+    """
+    replaces the directory dest with staging, written completely.
+    a directory with files cannot be replaced by one rename;
+    dest is renamed away first, so readers may miss dest for a moment,
+    but never see the files of a conversion in progress.
+    """
+    parent, name = os.path.split(dest)
+    old = os.path.join(parent, '.%s.old' % name)
+    if os.path.isdir(old):
+        shutil.rmtree(old)
+    if os.path.isdir(dest):
+        os.replace(dest, old)
+    os.replace(staging, dest)
+    shutil.rmtree(old, ignore_errors=True)
+
+def convert_watched(pool, args, filename):
+    """
+    converts a book into dest/.<book name>.new, and swaps it with dest/<book name>.
+    on failure, the last output is left as it is.
+    returns (filename, seconds, index or None on failure).
+    """
+    each = book_args(args, filename)
+    dest = each.dest
+    parent, name = os.path.split(dest)
+    each.dest = os.path.join(parent, '.%s.new' % name)
+    if os.path.isdir(each.dest):
+        shutil.rmtree(each.dest)
+    if args.incremental and os.path.isdir(dest):
+        # the manifest and unchanged sheets carry over.
+        shutil.copytree(dest, each.dest)
+    result = convert_pooled(pool, each)
+    if result[2] is None:
+        shutil.rmtree(each.dest, ignore_errors=True)
+    else:
+        swap_output(each.dest, dest)
+    return result
+
+def excel_to_json_watch(args, factory=None, stop=None):
+    """
+    converts books of a directory or a pattern as they change, until interrupted.
+    Excel instances are kept through an ExcelPool between books.
+    stop: returns True to end, checked between polls.
+    returns a list of (filename, seconds, index or None on failure).
+    """
+    pattern = args.filename
+    folder = pattern if os.path.isdir(pattern) else os.path.dirname(pattern)
+    books = watcher.Watcher(lambda: find_books(pattern), args.settle)
+    factory = factory or (lambda: make_app(args))
+    results = []
+    print('Watching %s' % pattern)
+    with ExcelPool(factory, args.recycle) as pool:
+        try:
+            while not (stop and stop()):
+                for filename in books.poll():
+                    results.append(convert_watched(pool, args, filename))
+                    books.converted(filename)
+                watcher.wait(folder, args.interval)
+        except KeyboardInterrupt:
+            print('Stopped watching %s' % pattern)
+    return results
+
+# ExcelPool of a worker process
+worker_pool = None
+
+def worker_init(args, factory):
+    """
+    starts a pool in a worker process, with its own COM apartment.
+    the pool is closed when the worker exits, so no Excel is left running.
+    """
+    global worker_pool
+    factory = factory or (lambda: make_app(args, coinitialize=True))
+    worker_pool = ExcelPool(factory, args.recycle)
+    multiprocessing.util.Finalize(worker_pool, worker_pool.close, exitpriority=10)
+
+def worker_book(args):
+    return convert_pooled(worker_pool, args)
+
+def worker_count(args):
+    """
+    returns the number of worksheets.
+    """
+    def count(app, args):
+        with ExcelBook(app, args.filename, read_only=True) as book:
+            return book.Worksheets.Count
+    return worker_pool.convert(count, args)
+
+def worker_sheets(args, positions):
+    return worker_pool.convert(convert_sheets, args, positions)
+
+def convert_sheets(app, args, positions):
+    """
+    converts sheets at 0-based positions into temporary files.
+    returns (params, [(position, sheet name or None when skipped, files written)]).
+    """
+    done = []
+    with ExcelBook(app, args.filename, read_only=True) as book:
+        sheets = book.Worksheets
+        first = SheetGeometry(sheets[0], args.origin)
+        params = make_params(args, first.sheet, first)
+        for position in positions:
+            if position == 0:
+                sheet, geometry = first.sheet, first
+            else:
+                sheet = sheets[position]
+                geometry = SheetGeometry(sheet, args.origin)
+            data = convert_sheet(params, args, sheet, geometry)
+            if data is None:
+                done.append((position, None, None))
+                continue
+            temp_base = os.path.join(args.dest, '.sheet%d' % position)
+            written = write_temps(args, temp_base, data, params)
+            done.append((position, sheet.name, written))
+    return (params, done)
+
+def place_sheets(params, args, done, known=None):
+    """
+    moves sheets written apart, as by convert_sheets, into place and writes index.json.
+    done: [(position, sheet name or None when skipped, files written)] in any order;
+    sheets are numbered in the book order.
+    returns index.
+    """
+    index = []
+    counter = 0
+    for position, sheet_name, written in sorted(done, key=lambda d: d[0]):
+        if sheet_name is None:
+            continue
+        counter += 1
+        full_file_name = os.path.join(args.dest, sheet_file_name(args, counter))
+        print('%d: %s: %s' % (counter, full_file_name, sheet_name))
+        index += [place_files(args, known, counter, sheet_name, written)]
+    write_index(params, args, index)
+    return index
+
+def start_jobs(args, factory):
+    return multiprocessing.Pool(args.jobs, worker_init, (args, factory))
+
+def stop_jobs(pool):
+    # close and join, not terminate, to run the finalizers quitting Excel.
+    pool.close()
+    pool.join()
+
+def batch_jobs(args, filenames, factory=None):
+    """
+    converts books in worker processes.
+    results keep the order of filenames.
+    """
+    pool = start_jobs(args, factory)
+    try:
+        results = pool.map(worker_book, [book_args(args, f) for f in filenames], 1)
+    finally:
+        stop_jobs(pool)
+    return (results, args.jobs)
+
+def excel_to_json_jobs(args, factory=None):
+    """
+    converts sheets of a book in worker processes, each opening the book read-only.
+    sheets are numbered in the book order regardless of completion order.
+    """
+    known = book_manifest(args)
+    index = skip_book(args, known)
+    if index is not None:
+        return index
+    
+    pool = start_jobs(args, factory)
+    try:
+        try:
+            count = pool.apply(worker_count, (args,))
+            chunks = [list(range(k, count, args.jobs)) for k in range(args.jobs)]
+            results = pool.starmap(worker_sheets, [(args, c) for c in chunks if c])
+        finally:
+            stop_jobs(pool)
+        
+        params = results[0][0]
+        index = place_sheets(params, args, [d for r in results for d in r[1]], known)
+    except BaseException:
+        # sheets written by the workers which did not fail.
+        remove_temps(args.dest)
+        raise
+    if known:
+        known.save(index)
+    
+    if args.verbose:
+        print(params)
+        print(index)
+    return index
+
+def make_parser():
+    """
+    returns the parser of the command line; see main() for the options.
+    """
+    parser = argparse.ArgumentParser(description='エクセル表をjsonファイルに変換する')
+    parser.add_argument('filename', help='エクセルファイル名(読み取り)')
+    parser.add_argument('dest', help='出力先ディレクトリ')
+    parser.add_argument('-o', '--origin', default="A1", help='基準セル')
+    parser.add_argument('-c', '--columns', help='有効カラム（列アドレス）')
+    parser.add_argument('-u', '--url', help='Hyperlink情報のあるカラム（列アドレス、カンマ区切り）')
+    parser.add_argument('-n', '--noheader', action='store_true', help='先頭行からデータとする')
+    parser.add_argument('-t', '--text', action='store_true', help='Valueの代わりにTextを読む')
+    parser.add_argument('--textmode', choices=('bulk', 'cell'), default='bulk', help='Textの読み方')
+    parser.add_argument('-f', '--formula', action='store_true', help='Valueの代わりにFormulaR1C1を読む')
+    parser.add_argument('--deps', action='store_true', help='数式の参照するセルをシートごとに書き出す')
+    parser.add_argument('-i', '--invisible', action='store_true', help='エクセルを非表示にする')
+    parser.add_argument('--fast', action='store_true', help='再計算やイベントを止めて読み取り専用で読む')
+    parser.add_argument('-b', '--backend', choices=('excel', 'xlsx'), default='excel', help='読み取り方式')
+    parser.add_argument('--batch', action='store_true', help='複数のブックを変換する')
+    parser.add_argument('--recycle', type=int, default=50, help='エクセルを起動し直すまでのブック数')
+    parser.add_argument('--watch', action='store_true', help='ディレクトリを見張り、変わったブックを変換する')
+    parser.add_argument('--interval', type=float, default=2.0, help='ブックを調べる間隔（秒）')
+    parser.add_argument('--settle', type=float, default=5.0, help='変わらなくなってから変換するまでの秒数')
+    parser.add_argument('--compact', action='store_true', help='空白なしのjsonを書き出す')
+    parser.add_argument('--block', type=int, default=0, help='一度に読む行数')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='並列に変換するプロセス数')
+    parser.add_argument('--pipeline', type=int, default=0, help='シートを書き出すスレッド数')
+    parser.add_argument('--pipeline-queue', type=int, default=2, help='書き出しを待つシート数の上限')
+    parser.add_argument('--incremental', action='store_true', help='変わっていないブックとシートを変換しない')
+    parser.add_argument('--layout', choices=('rows', 'columns', 'records', 'runs'), default='rows',
+                        help='シートのjsonの形')
+    parser.add_argument('--ndjson', action='store_true', help='1行ずつ書き出し、索引を添える')
+    parser.add_argument('--offset-every', type=int, default=1, help='索引に位置を記録する行の間隔')
+    parser.add_argument('--rows-per-file', type=int, default=0, help='ファイルを分ける行数')
+    parser.add_argument('--sqlite', action='store_true', help='jsonの代わりにSQLiteに書き出す')
+    parser.add_argument('--index', help='索引を作るカラム（ヘッダー名か列アドレス、カンマ区切り）')
+    parser.add_argument('--fts', action='store_true', help='全文検索用テーブルを作る')
+    parser.add_argument('--profile', action='store_true', help='処理ごとの時間と呼び出し回数を出力する')
+    parser.add_argument('--profile-json', help='処理ごとの時間と呼び出し回数を書き出すファイル')
+    parser.add_argument('-v', '--verbose', action='store_true', help='冗長な情報を出力する')
+    return parser
+
+def default_args(**overrides):
+    """
+    returns args as the command line gives them with no options, with overrides;
+    for callers other than main(), such as the benchmarks.
+    default_args(dest=dest, incremental=True)
+    """
+    args = make_parser().parse_args(['', ''])
+    unknown = set(overrides) - set(vars(args))
+    if unknown:
+        raise TypeError('unknown options: %s' % ', '.join(sorted(unknown)))
+    vars(args).update(overrides)
+    return args
 
 def main():
     r"""
@@ -282,16 +1329,49 @@ def main():
     excel-to-json-3.py Hello2.xls E:\scratch --columns B:C
     excel-to-json-3.py Hello2.xls E:\scratch --origin B3 --columns B:C
     excel-to-json-3.py Hello3.xls E:\scratch --url C
+    excel-to-json-3.py Hello3.xls E:\scratch --url C,E
+    excel-to-json-3.py Hello2.xlsx /tmp/scratch --backend xlsx
+    excel-to-json-3.py "E:\scratch\books\*.xls" E:\scratch --batch
+    excel-to-json-3.py "E:\scratch\books\*.xls" E:\scratch --batch --jobs 4
+    excel-to-json-3.py Large.xls E:\scratch --jobs 4
+    excel-to-json-3.py E:\share\books E:\scratch --watch --invisible
+    excel-to-json-3.py Hello2.xls E:\scratch --sqlite --index B,C --fts
     
     第1引数: 変換元エクセルブック（フルパスまたは出力先パス）
     第2引数: 出力先ディレクトリ（フルパス）
     --origin: 基準セル（表範囲の左上アドレス、省略時はA1）
     --columns: 有効カラム（絶対列アドレス）
-    --url: Hyperlink情報を持つ列（絶対列アドレス）
+    --url: Hyperlink情報を持つ列（絶対列アドレス、カンマ区切りで複数可）
     --noheader: 1行目からデータとして扱う
     --text: Valueの代わりにTextを読む
+    --textmode: Textの読み方（bulk: 値と列の書式、列幅から一括で作る、cell: セルごとに読む）
+    bulkでは、標準書式を列幅に合わせて丸める。列幅に収まらず####となる数値の列はセルごとに読む。
     --formula: Valueの代わりにFormulaR1C1を読む
+    --deps: --formulaで、数式ごとに参照するセルと範囲を、シートごとにsheet1.deps.json等に書き出す
     --invisible: エクセルを非表示にする
+    --fast: 読み取り専用で開き、再計算、画面更新、イベント、警告を止めて読む
+    --backend: 読み取り方式（excel: エクセル経由、xlsx: ファイルを直接読む）
+    --batch: 第1引数をディレクトリまたはワイルドカードとして、複数のブックを変換する
+    --recycle: バッチ変換で、エクセルを起動し直すまでのブック数
+    --watch: 第1引数のディレクトリまたはワイルドカードを見張り、変わったブックを変換し続ける
+    --interval: --watchで、ブックを調べる間隔（秒）
+    --settle: --watchで、変わったブックが変わらなくなってから変換するまでの時間（秒）
+    --compact: シートのjsonを空白なしで書き出す（省略時はインデント付き）
+    --block: 指定行数ずつ読み、書き出す（省略時は表全体を一度に読む）
+    --jobs: 並列に変換するプロセス数（それぞれがエクセルを起動する）
+    --pipeline: シートを読みながら、読み終えたシートをjsonに書き出すスレッド数（省略時は逐次）
+    --pipeline-queue: --pipelineで、読み終えて書き出しを待つシート数の上限（省略時は2）
+    --incremental: 前回から変わっていないブックとシートを変換しない
+    --layout: シートのjsonの形（rows: 行の配列、columns: 列ごとの配列、records: 行ごとのオブジェクト、
+              runs: 同じ値の続く範囲と値の表）
+    --ndjson: 1行に1行ずつ書き出し、行の位置の索引ファイルを添える
+    --offset-every: 索引に位置を記録する行の間隔（省略時は全行）
+    --rows-per-file: シートを指定行数ずつのファイルに分けて書き出す
+    --sqlite: jsonの代わりに、シートを出力先のbook.sqliteのテーブルに書き出す
+    --index: --sqliteで、索引を作る列（ヘッダー名または列アドレス、カンマ区切り）
+    --fts: --sqliteで、文字列の列の全文検索用テーブルを作る
+    --profile: 処理ごとの時間と、エクセルのプロパティとメソッドの呼び出し回数と時間を出力する
+    --profile-json: --profileの結果を、指定したファイルにjsonで書き出す
     --verbose: 冗長な情報を出力する
     
     生成するjsonは、ArrayのArray。行優先マトリックス。
@@ -304,8 +1384,85 @@ def main():
     ファイルとシート名の関連情報を、index.jsonに書き出す。
     ヘッダー情報があれば、columns.jsonに書き出す。
     url指定した列にHyperlink情報があれば、url情報としてカラム末尾に追加する。
+    url指定が複数なら、指定順にカラム末尾に追加し、ヘッダーはURL_C等とする。
+    バッチ変換では、ブックごとに出力先ディレクトリの下にブック名のディレクトリを作る。
+    エクセルは起動したまま次のブックに使い、--recycleごとか失敗したときに起動し直す。
+    --jobsを指定すると、バッチ変換ではブックを、そうでなければシートを、
+    プロセスに振り分ける。シートを振り分けるときは、各プロセスがブックを読み取り専用で開く。
+    シート番号とindex.jsonの順序は、逐次変換と同じになる。
+    --pipelineを指定すると、エクセルからシートを読むスレッドが、読み終えたシートの値を
+    書き出し用のスレッドに渡し、書き出しを待たずに次のシートを読む。
+    エクセルを待つ間にjsonを書き出すので、エクセルの使われない時間が減る。
+    書き出しを待つシートが--pipeline-queueに達すると、読むのを待つので、
+    メモリに持つシートは、読んでいるものを含めて--pipeline-queue + 1までになる。
+    ファイルは最後に、シートの順に置くので、シート番号とindex.jsonは逐次変換と同じになる。
+    --blockとは使えない（シートを丸ごと渡すため）。
+    --incrementalを指定すると、index.jsonの隣にmanifest.jsonを書き出し、
+    ブックのサイズ、更新日時、ハッシュと、シートごとのjsonのハッシュを記録する。
+    次回、ブックも指定オプションも変わっていなければ、エクセルを起動せずに済ませる。
+    サイズと更新日時が同じなら、ブックを読まずに変わっていないとみなす。
+    ブックが変わっていても、内容の同じシートのjsonファイルは書き換えない。
+    --layout columnsでは、シートごとに列の配列を持つオブジェクトを書き出す。
+    列名はcolumns.jsonと同じ（ヘッダーがなければ列記号）。
+    繰り返しの多い文字列の列は値の表と番号で、数値の列は型付き配列のbase64で表す。
+    形式の詳細と読み方はcolumnar.pyを参照。
+    --layout recordsでは、ヘッダーをキーとするオブジェクトの配列を書き出す。
+    空のヘッダーは列記号に、重複したヘッダーは2つめからURL_2等に置き換える。
+    --layout runsでは、同じ値が縦に続く範囲を、隣の列の同じ範囲とつないで長方形にし、
+    値の表(values)の番号とともに、行、列、高さ、幅、番号の組(runs)で表す。
+    それ以外のセルは、行順に値の番号(cells)だけを並べる。
+    --formulaで、数式を下や右にコピーした列や合計行は、R1C1では同じ文字列になるので、
+    数式ごとに1つの長方形になり、行の配列より大幅に小さく、速く書き出せる。
+    runsとcellsはcolumnsと同じく型付き配列のbase64で、形式と読み方はformularuns.pyを参照。
+    --ndjsonでは、sheet1.ndjson等に1行ずつ（rowsかrecordsの形で）書き出し、
+    sheet1.idxに--offset-every行ごとのバイト位置を書き出す。
+    index.jsonには、シートごとに行数(rows)と索引ファイル名(offsets)を加える。
+    linejson.Readerで、索引を使って任意の行や行範囲をすぐに読める。
+    --rows-per-fileでは、行を読みながら、sheet3-part0001.json等に分けて書き出す。
+    index.jsonのシートには、総行数(rows)とパートの一覧(parts)を加え、パートごとに
+    ファイル名(url)、先頭行の番号(first、0から)、行数(rows)、バイト数(bytes)を記録する。
+    --sqliteでは、シートごとにsheet1等のテーブルを作り、1つのトランザクションで
+    まとめて挿入する。列名はcolumns.jsonのヘッダー（重複はURL_2等、空は列記号）。
+    シート名、テーブル名、行数、列名はsheetsテーブルとindex.jsonに記録する。
+    --ftsでは、sheet1_fts等のFTS5テーブルをtrigramトークナイザーで作るので、
+    日本語も3文字以上の語で検索できる（SQLite 3.34以降が必要）。
+    例: SELECT * FROM sheet1 WHERE rowid IN
+        (SELECT rowid FROM sheet1_fts WHERE sheet1_fts MATCH '東京都')
+    
+    --depsでは、R1C1の数式を字句に分けて、相対参照を数式のセルから絶対位置に直し、
+    数式のセルごとに参照するセルと範囲（範囲は展開せずに1つ）をA1形式で書き出す。
+    例: {"sheet": "Sheet1", "cells": {"C2": ["Sheet1!B2", "'Sheet 2'!A1:A10"]}}
+    index.jsonのシートには、ファイル名(deps)を加える。名前や構造化参照は対象外。
+    シートのファイルと同じく一時ファイルに書いてから置き換え、--incrementalでは変わらなければ書き換えない。
+    --textとは使えない（--textが優先され、数式を読まないため）。
+    formulagraph.load(出力先)で全シートのグラフを読み、order()で計算順（参照先が先）に、
+    affected(変わったセル)で計算し直す数式のセルを得る。循環参照はCycleErrorになる。
+    下にコピーした数式はR1C1では同じ文字列なので、字句解析は数式ごとに1回で済む。
+    
+    --watchでは、--batchと同じく、ブックごとに出力先ディレクトリの下に書き出す。
+    起動時にすべてのブックを変換し、以後は、サイズか更新日時が変わったブックを、
+    --settle秒変わらなくなってから（書き込みの途中や連続した保存を待って）、変わった順に変換する。
+    エクセルは起動したまま次のブックに使う。Ctrl+Cで終わる。
+    出力は.<ブック名>.newに書き出し、書き終えてからブック名のディレクトリと入れ替えるので、
+    書きかけのindex.jsonやsheet1.jsonが読まれることはない。変換に失敗したら前の出力を残す。
+    --incrementalを指定すると、前の出力を写してから変換し、変わっていないシートを書き換えない。
+    
+    --fastでは、ブックをリンクを更新せずに読み取り専用で開く。
+    エクセルの計算方法を手動にし、画面更新、イベント、警告表示を止める。
+    計算方法はブックが開いていないと変えられないので、空のブックを開いたままにする。
+    これで、後から開くブックも開いたときに再計算されない。
+    セルの値は、ブックが最後に保存されたときに計算されたものになる。
+    エクセルを終了する前に、失敗したときも、設定を元に戻す。
+    
+    --profileでは、エクセルのオブジェクトを包んで、プロパティの読み書きとメソッドの
+    呼び出しを、Range.Value、Range.Value=、Workbooks.Open()のように型と名前ごとに数え、時間を測る。
+    処理（start、open、header、region、value、urls、text、write、index、close、quit等）ごとの
+    時間は、中の処理の時間を除いて測る。--profileなしでは、何も包まず、測らない。
+    --jobsでシートを振り分けるときは、他のプロセスの処理は含まない。
     
     エクセル本体が必要（インストール済みであること）。
+    ただし、--backend xlsx では、エクセルなしで.xlsxファイルを直接読む。
+    この場合、--textと--formulaは使えない。日付はシリアル値のまま出力する。
     
     このプログラムはエクセルを起動し、
     指定されたブックを開き、
@@ -313,24 +1470,68 @@ def main():
     エクセルを閉じる。
     
     """
-    parser = argparse.ArgumentParser(description='エクセル表をjsonファイルに変換する')
-    parser.add_argument('filename', help='エクセルファイル名(読み取り)')
-    parser.add_argument('dest', help='出力先ディレクトリ')
-    parser.add_argument('-o', '--origin', default="A1", help='基準セル')
-    parser.add_argument('-c', '--columns', help='有効カラム（列アドレス）')
-    parser.add_argument('-u', '--url', help='Hyperlink情報のあるカラム（列アドレス）')
-    parser.add_argument('-n', '--noheader', action='store_true', help='先頭行からデータとする')
-    parser.add_argument('-t', '--text', action='store_true', help='Valueの代わりにTextを読む')
-    parser.add_argument('-f', '--formula', action='store_true', help='Valueの代わりにFormulaR1C1を読む')
-    parser.add_argument('-i', '--invisible', action='store_true', help='エクセルを非表示にする')
-    parser.add_argument('-v', '--verbose', action='store_true', help='冗長な情報を出力する')
+    parser = make_parser()
     args = parser.parse_args()
     
+    try:
+        if args.columns:
+            args.columns = ':'.join(col.strip() for col in args.columns.split(':'))
+            for col in args.columns.split(':'):
+                cellrange.col_number(col)
+        if args.url:
+            args.url = ','.join(col.strip() for col in args.url.split(','))
+            for col in args.url.split(','):
+                cellrange.col_number(col)
+    except ValueError as e:
+        parser.error('--columns and --url take column letters: %s' % e)
+    if args.backend == 'xlsx' and (args.text or args.formula):
+        parser.error('--text and --formula need --backend excel')
+    if args.ndjson and args.layout in ('columns', 'runs'):
+        parser.error('--ndjson writes rows or records, not columns or runs')
+    if args.offset_every < 1:
+        parser.error('--offset-every must be 1 or more')
+    if args.rows_per_file < 0:
+        parser.error('--rows-per-file must be 0 or more')
+    if args.block < 0:
+        parser.error('--block must be 0 or more')
+    if args.pipeline < 0 or args.pipeline_queue < 1:
+        parser.error('--pipeline must be 0 or more, --pipeline-queue 1 or more')
+    if args.pipeline and (args.block or args.sqlite or (args.jobs > 1 and not args.batch)):
+        parser.error('--pipeline hands whole sheets to writers; '
+                     'not with --block, --sqlite or --jobs without --batch')
+    if args.deps and (not args.formula or args.text or args.block or args.sqlite or
+                      (args.jobs > 1 and not args.batch)):
+        parser.error('--deps needs --formula; '
+                     'not with --text, --block, --sqlite or --jobs without --batch')
+    if (args.index or args.fts) and not args.sqlite:
+        parser.error('--index and --fts need --sqlite')
+    if args.watch and (args.batch or args.jobs > 1):
+        parser.error('--watch converts books one by one; not with --batch or --jobs')
+    if args.sqlite and (args.ndjson or args.rows_per_file or args.incremental or
+                        args.layout != 'rows' or (args.jobs > 1 and not args.batch)):
+        parser.error('--sqlite writes one database per book; '
+                     'not with --ndjson, --rows-per-file, --incremental, --layout or --jobs without --batch')
+    
     args.filename = os.path.join(args.dest, args.filename)
     
     if args.verbose:
         print(args)
-    excel_to_json(args)
+    if args.profile or args.profile_json:
+        profiling.current = profiling.Profile()
+    try:
+        if args.watch:
+            excel_to_json_watch(args)
+        elif args.batch:
+            excel_to_json_batch(args, find_books(args.filename))
+        elif args.jobs > 1:
+            excel_to_json_jobs(args)
+        else:
+            excel_to_json(args)
+    finally:
+        if args.profile:
+            print('\n'.join(profiling.current.summary()))
+        if args.profile_json:
+            profiling.current.save(args.profile_json)
 
 if __name__ == '__main__':
     main()
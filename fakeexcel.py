@@ -0,0 +1,689 @@
+#!python3
+
+import collections
+import datetime
+import decimal
+import os.path
+import time
+import numfmt
+import xlsxreader
+from xlsxreader import Grid, parse_range, absolute_address
+
+# XlCalculation
+XL_CALCULATION_AUTOMATIC = -4105
+XL_CALCULATION_MANUAL = -4135
+
+def spin(seconds):
+    """
+    waits busily; sleep() is too coarse for microsecond latencies.
+    """
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+class Com(object):
+    """
+    counts round trips by member name and injects latency.
+    latency: seconds per call, or {member: seconds} with 'default'.
+    cell_latency: seconds per cell marshalled by a bulk Value read.
+    wait: waits the latency; spin, or time.sleep to let other threads run,
+    as a call to an out-of-process server does.
+    """
+    def __init__(self, latency=0.0, cell_latency=0.0, wait=spin):
+        if not isinstance(latency, dict):
+            latency = {'default': latency}
+        self.latency = latency
+        self.cell_latency = cell_latency
+        self.wait = wait
+        self.calls = collections.Counter()
+    
+    def call(self, member, cells=0):
+        self.calls[member] += 1
+        cost = self.latency.get(member, self.latency.get('default', 0.0))
+        cost += cells * self.cell_latency
+        if cost > 0:
+            self.wait(cost)
+    
+    @property
+    def total(self):
+        return sum(self.calls.values())
+    
+    def reset(self):
+        self.calls.clear()
+
+# width of a column in characters, in the standard font ＭＳ Ｐゴシック 11.
+STANDARD_WIDTH = 8.38
+
+EPOCH = datetime.datetime(1899, 12, 30)
+
+# (Value, NumberFormat, Text) as Excel displays them in a column of the standard width.
+# Text of the fake is looked up here, not rendered by numfmt, which it checks.
+TEXTS = (
+    (1234.5, 'General', '1234.5'),
+    (1 / 3, 'General', '0.333333'),
+    (-1 / 3, 'General', '-0.33333'),
+    (1234.5, '0', '1235'),
+    (1234.5, '#,##0', '1,235'),
+    (1234.5, '#,##0.00', '1,234.50'),
+    (-1234.5, '#,##0;[Red]-#,##0', '-1,235'),
+    (-5.0, '0;(0)', '(5)'),
+    (0.0, '0.00', '0.00'),
+    (0.125, '0.0%', '12.5%'),
+    (1234.5, '0.00E+00', '1.23E+03'),
+    (42095.0, 'yyyy/m/d', '2015/4/1'),
+    (42095.5, 'h:mm', '12:00'),
+    (decimal.Decimal('1234.5'), '"¥"#,##0', '¥1,235'),
+    (decimal.Decimal('-1234.5'), '"¥"#,##0', '-¥1,235'),
+)
+
+CAPTURED = dict(((value, format), text) for value, format, text in TEXTS)
+
+def general_text(value, width=STANDARD_WIDTH):
+    """
+    renders a value as the General format does in a column of width characters;
+    decimals are dropped until the number fits, then it turns into an exponent.
+    """
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if not isinstance(value, float):
+        return str(value)
+    chars = min(int(width), 11)
+    # Excel keeps 15 significant digits and rounds halves away from zero.
+    exact = decimal.Decimal('%.15g' % value)
+    for places in range(10, -1, -1) if abs(value) < 1e11 else ():
+        text = format(exact.quantize(decimal.Decimal(1).scaleb(-places),
+                                     rounding=decimal.ROUND_HALF_UP), 'f')
+        if '.' in text:
+            text = text.rstrip('0').rstrip('.')
+        if len(text) <= chars and (float(text) != 0 or value == 0):
+            return text
+    # d.ddE+nn, one character less for a minus sign.
+    places = max(chars - 6 - (1 if value < 0 else 0), 0)
+    mantissa, exponent = ('%.*E' % (places, value)).split('E')
+    if '.' in mantissa:
+        mantissa = mantissa.rstrip('0').rstrip('.')
+    text = '%sE%s' % (mantissa, exponent)
+    return text if len(text) <= chars else '#' * chars
+
+def date_text(value):
+    """
+    renders a serial number or a datetime as yyyy/m/d.
+    """
+    if not isinstance(value, datetime.datetime):
+        value = EPOCH + datetime.timedelta(days=value)
+    return '%d/%d/%d' % (value.year, value.month, value.day)
+
+class FakeComError(Exception):
+    """
+    stands for pywintypes.com_error.
+    """
+
+class FakeFont(object):
+    def __init__(self, name):
+        self.Name = name
+
+class FakeHyperlink(object):
+    """
+    Hyperlink anchored at a cell.
+    """
+    def __init__(self, sheet, row, col, address, sub_address=''):
+        self.sheet = sheet
+        self.row = row
+        self.col = col
+        self.address = address
+        self.sub_address = sub_address
+    
+    @property
+    def Address(self):
+        self.sheet.com.call('Hyperlink.Address')
+        return self.address
+    
+    @property
+    def SubAddress(self):
+        self.sheet.com.call('Hyperlink.SubAddress')
+        return self.sub_address
+    
+    @property
+    def Range(self):
+        self.sheet.com.call('Hyperlink.Range')
+        return FakeRange(self.sheet, self.row, self.col, self.row, self.col)
+
+class FakeHyperlinks(object):
+    """
+    Hyperlinks collection of a sheet or a range.
+    """
+    def __init__(self, sheet, bounds=None):
+        self.sheet = sheet
+        self.bounds = bounds
+    
+    def links(self):
+        found = self.sheet.hyperlinks
+        if self.bounds:
+            row1, col1, row2, col2 = self.bounds
+            found = [h for h in found
+                     if row1 <= h.row <= row2 and col1 <= h.col <= col2]
+        return found
+    
+    @property
+    def Count(self):
+        self.sheet.com.call('Hyperlinks.Count')
+        return len(self.links())
+    
+    def __call__(self, index):
+        self.sheet.com.call('Hyperlinks.Item')
+        return self.links()[index - 1]
+    
+    def __iter__(self):
+        self.sheet.com.call('Hyperlinks._NewEnum')
+        for link in self.links():
+            self.sheet.com.call('Hyperlinks.Next')
+            yield link
+    
+    def Add(self, Anchor, Address, SubAddress=''):
+        self.sheet.com.call('Hyperlinks.Add')
+        link = FakeHyperlink(self.sheet, Anchor.row1, Anchor.col1, Address, SubAddress)
+        self.sheet.hyperlinks.append(link)
+        return link
+
+class FakeLines(object):
+    """
+    Rows or Columns of a range.
+    calling without an index returns the values, as the default member does.
+    """
+    def __init__(self, range, by_row):
+        self.range = range
+        self.by_row = by_row
+    
+    @property
+    def Count(self):
+        r = self.range
+        r.sheet.com.call('Range.Count')
+        return (r.row2 - r.row1 + 1) if self.by_row else (r.col2 - r.col1 + 1)
+    
+    def line(self, index):
+        r = self.range
+        if self.by_row:
+            row = r.row1 + index - 1
+            return FakeRange(r.sheet, row, r.col1, row, r.col2)
+        col = r.col1 + index - 1
+        return FakeRange(r.sheet, r.row1, col, r.row2, col)
+    
+    def __call__(self, index=None):
+        if index is None:
+            return self.range.Value
+        self.range.sheet.com.call('Range.Item')
+        return self.line(index)
+    
+    def __iter__(self):
+        r = self.range
+        r.sheet.com.call('Range._NewEnum')
+        n = (r.row2 - r.row1 + 1) if self.by_row else (r.col2 - r.col1 + 1)
+        for i in range(n):
+            r.sheet.com.call('Range.Next')
+            yield self.line(i + 1)
+
+class FakeRange(object):
+    """
+    Range over the grid of a FakeSheet.
+    """
+    def __init__(self, sheet, row1, col1, row2, col2):
+        self.sheet = sheet
+        self.row1 = row1
+        self.col1 = col1
+        self.row2 = row2
+        self.col2 = col2
+    
+    def single(self):
+        return (self.row1, self.col1) == (self.row2, self.col2)
+    
+    def cells(self):
+        return (self.row2 - self.row1 + 1) * (self.col2 - self.col1 + 1)
+    
+    @property
+    def Value(self):
+        self.sheet.com.call('Range.Value', self.cells())
+        grid = self.sheet.grid
+        if self.single():
+            return grid.get(self.row1, self.col1)
+        return grid.block(self.row1, self.col1, self.row2, self.col2)
+    
+    @Value.setter
+    def Value(self, value):
+        self.sheet.com.call('Range.Value=', self.cells())
+        grid = self.sheet.grid
+        if self.single():
+            grid.set(self.row1, self.col1, value)
+            return
+        for r, row in enumerate(value):
+            for c, v in enumerate(row):
+                grid.set(self.row1 + r, self.col1 + c, v)
+    
+    @property
+    def Text(self):
+        self.sheet.com.call('Range.Text')
+        if not self.single():
+            # a multi-cell range has no single display text.
+            return None
+        return self.sheet.text(self.row1, self.col1)
+    
+    @property
+    def ColumnWidth(self):
+        self.sheet.com.call('Range.ColumnWidth')
+        widths = set(self.sheet.column_width(c) for c in range(self.col1, self.col2 + 1))
+        return widths.pop() if len(widths) == 1 else None
+    
+    @ColumnWidth.setter
+    def ColumnWidth(self, value):
+        self.sheet.com.call('Range.ColumnWidth=')
+        for c in range(self.col1, self.col2 + 1):
+            self.sheet.widths[c] = value
+    
+    @property
+    def NumberFormat(self):
+        self.sheet.com.call('Range.NumberFormat')
+        formats = set()
+        covered = 0
+        for (r, c), format in self.sheet.formats.items():
+            if self.row1 <= r <= self.row2 and self.col1 <= c <= self.col2:
+                formats.add(format)
+                covered += 1
+        if covered < self.cells():
+            formats.add('General')
+        return formats.pop() if len(formats) == 1 else None
+    
+    @NumberFormat.setter
+    def NumberFormat(self, value):
+        self.sheet.com.call('Range.NumberFormat=')
+        for r in range(self.row1, self.row2 + 1):
+            for c in range(self.col1, self.col2 + 1):
+                self.sheet.formats[(r, c)] = value
+    
+    @property
+    def FormulaR1C1(self):
+        self.sheet.com.call('Range.FormulaR1C1', self.cells())
+        formula = self.sheet.formula
+        if self.single():
+            return formula(self.row1, self.col1)
+        return tuple(tuple(formula(r, c) for c in range(self.col1, self.col2 + 1))
+                     for r in range(self.row1, self.row2 + 1))
+    
+    @FormulaR1C1.setter
+    def FormulaR1C1(self, value):
+        self.sheet.com.call('Range.FormulaR1C1=')
+        for r in range(self.row1, self.row2 + 1):
+            for c in range(self.col1, self.col2 + 1):
+                self.sheet.formulas[(r, c)] = value
+    
+    @property
+    def Address(self):
+        self.sheet.com.call('Range.Address')
+        return absolute_address(self.row1, self.col1, self.row2, self.col2)
+    
+    @property
+    def CurrentRegion(self):
+        self.sheet.com.call('Range.CurrentRegion')
+        bounds = self.sheet.grid.current_region(self.row1, self.col1)
+        return FakeRange(self.sheet, *bounds)
+    
+    @property
+    def Row(self):
+        self.sheet.com.call('Range.Row')
+        return self.row1
+    
+    @property
+    def Column(self):
+        self.sheet.com.call('Range.Column')
+        return self.col1
+    
+    @property
+    def Count(self):
+        self.sheet.com.call('Range.Count')
+        return self.cells()
+    
+    @property
+    def Rows(self):
+        self.sheet.com.call('Range.Rows')
+        return FakeLines(self, True)
+    
+    @property
+    def Columns(self):
+        self.sheet.com.call('Range.Columns')
+        return FakeLines(self, False)
+    
+    @property
+    def Cells(self):
+        self.sheet.com.call('Range.Cells')
+        return FakeCells(self)
+    
+    @property
+    def Hyperlinks(self):
+        self.sheet.com.call('Range.Hyperlinks')
+        return FakeHyperlinks(self.sheet, (self.row1, self.col1, self.row2, self.col2))
+    
+    @property
+    def Font(self):
+        self.sheet.com.call('Range.Font')
+        return FakeFont(self.sheet.font)
+    
+    def Offset(self, row=1, col=1):
+        # pywin32 passes the arguments 1-based; Offset(1, 1) is the range itself.
+        self.sheet.com.call('Range.Offset')
+        dr = row - 1
+        dc = col - 1
+        return FakeRange(self.sheet, self.row1 + dr, self.col1 + dc,
+                         self.row2 + dr, self.col2 + dc)
+    
+    def Range(self, address):
+        # relative to the top left cell, as Range.Range is.
+        self.sheet.com.call('Range.Range')
+        row1, col1, row2, col2 = parse_range(address)
+        return FakeRange(self.sheet, self.row1 + row1 - 1, self.col1 + col1 - 1,
+                         self.row1 + row2 - 1, self.col1 + col2 - 1)
+
+class FakeCells(object):
+    """
+    Cells of a range; callable with (row, col) and iterable by cell.
+    """
+    def __init__(self, range):
+        self.range = range
+    
+    def __call__(self, row=None, col=None):
+        r = self.range
+        if row is None:
+            return r.Value
+        r.sheet.com.call('Range.Item')
+        row = r.row1 + row - 1
+        col = r.col1 + col - 1
+        return FakeRange(r.sheet, row, col, row, col)
+    
+    def __iter__(self):
+        r = self.range
+        r.sheet.com.call('Range._NewEnum')
+        for row in range(r.row1, r.row2 + 1):
+            for col in range(r.col1, r.col2 + 1):
+                r.sheet.com.call('Range.Next')
+                yield FakeRange(r.sheet, row, col, row, col)
+
+class FakeSheet(object):
+    """
+    Worksheet backed by an in-memory grid.
+    """
+    def __init__(self, com, name, grid=None):
+        self.com = com
+        self.Name = name
+        self.grid = grid if grid is not None else Grid()
+        self.formats = {}
+        self.widths = {}
+        self.formulas = {}
+        self.hyperlinks = []
+        self.font = 'ＭＳ Ｐゴシック'
+    
+    @property
+    def name(self):
+        return self.Name
+    
+    def number_format(self, row, col):
+        return self.formats.get((row, col), 'General')
+    
+    def column_width(self, col):
+        return self.widths.get(col, STANDARD_WIDTH)
+    
+    def text(self, row, col):
+        """
+        Text of a cell: captured in TEXTS at the standard width,
+        General and yyyy/m/d rendered here, #### for a number too wide for the column.
+        """
+        value = self.grid.get(row, col)
+        if value is None or isinstance(value, (str, bool)):
+            return general_text(value)
+        format = self.number_format(row, col)
+        width = self.column_width(col)
+        if format in ('General', 'G/標準'):
+            return general_text(value, width)
+        text = CAPTURED.get((value, format)) if width == STANDARD_WIDTH else None
+        if text is None:
+            if format != 'yyyy/m/d':
+                raise FakeComError('no Text captured for %r in %r' % (value, format))
+            text = date_text(value)
+        return text if len(text) <= width else '#' * int(width)
+    
+    def formula(self, row, col):
+        found = self.formulas.get((row, col))
+        if found is not None:
+            return found
+        value = self.grid.get(row, col)
+        return '' if value is None else numfmt.general(value)
+    
+    def Range(self, address):
+        self.com.call('Worksheet.Range')
+        return FakeRange(self, *parse_range(address))
+    
+    @property
+    def Cells(self):
+        self.com.call('Worksheet.Cells')
+        return FakeCells(FakeRange(self, 1, 1, 1048576, 16384))
+    
+    def Rows(self, index):
+        self.com.call('Worksheet.Rows')
+        return FakeRange(self, index, 1, index, 16384)
+    
+    @property
+    def UsedRange(self):
+        self.com.call('Worksheet.UsedRange')
+        grid = self.grid
+        return FakeRange(self, 1, 1, max(grid.max_row, 1), max(grid.max_col, 1))
+    
+    @property
+    def Hyperlinks(self):
+        self.com.call('Worksheet.Hyperlinks')
+        return FakeHyperlinks(self)
+
+class FakeSheets(object):
+    """
+    Worksheets collection; indexed 0-based, called 1-based.
+    """
+    def __init__(self, com, sheets):
+        self.com = com
+        self.sheets = sheets
+    
+    @property
+    def Count(self):
+        self.com.call('Worksheets.Count')
+        return len(self.sheets)
+    
+    def __getitem__(self, index):
+        self.com.call('Worksheets.Item')
+        return self.sheets[index]
+    
+    def __call__(self, index):
+        self.com.call('Worksheets.Item')
+        if isinstance(index, str):
+            return next(s for s in self.sheets if s.Name == index)
+        return self.sheets[index - 1]
+    
+    def __len__(self):
+        return len(self.sheets)
+    
+    def __iter__(self):
+        self.com.call('Worksheets._NewEnum')
+        for sheet in self.sheets:
+            self.com.call('Worksheets.Next')
+            yield sheet
+
+class FakeBook(object):
+    """
+    Workbook holding FakeSheets.
+    on_open: seconds of a Workbook_Open handler, run when events are enabled.
+    links: seconds to update links to other books, unless opened with UpdateLinks 0.
+    """
+    def __init__(self, com, name, sheets=(), on_open=0.0, links=0.0):
+        self.com = com
+        self.Name = name
+        self.sheets = list(sheets)
+        self.on_open = on_open
+        self.links = links
+        self.Saved = True
+        self.closed = False
+        self.workbooks = None
+    
+    def bind(self, com):
+        """
+        counts calls on the book with the application which opened it.
+        """
+        self.com = com
+        for sheet in self.sheets:
+            sheet.com = com
+    
+    def add_sheet(self, name, rows=()):
+        """
+        appends a sheet filled with rows from A1 and returns it.
+        """
+        sheet = FakeSheet(self.com, name)
+        for r, row in enumerate(rows):
+            for c, value in enumerate(row):
+                if value is not None:
+                    sheet.grid.set(r + 1, c + 1, value)
+        self.sheets.append(sheet)
+        return sheet
+    
+    @property
+    def Worksheets(self):
+        self.com.call('Workbook.Worksheets')
+        return FakeSheets(self.com, self.sheets)
+    
+    def formula_count(self):
+        return sum(len(sheet.formulas) for sheet in self.sheets)
+    
+    def Save(self):
+        self.com.call('Workbook.Save')
+        self.Saved = True
+    
+    def Close(self, *args, **kwargs):
+        self.com.call('Workbook.Close')
+        self.closed = True
+        if self.workbooks and self in self.workbooks.opened:
+            self.workbooks.opened.remove(self)
+
+class FakeWorkbooks(object):
+    """
+    Workbooks collection.
+    opens books registered by name, or reads .xlsx files with xlsxreader.
+    books may be shared by applications, as files are.
+    opening costs as Excel does: links are updated unless UpdateLinks is 0,
+    formulas recalculated in automatic calculation, and Workbook_Open run with events.
+    """
+    def __init__(self, app, books=None):
+        self.app = app
+        self.books = books if books is not None else {}
+        self.opened = []
+    
+    @property
+    def Count(self):
+        self.app.com.call('Workbooks.Count')
+        return len(self.opened)
+    
+    def Add(self):
+        self.app.com.call('Workbooks.Add')
+        book = FakeBook(self.app.com, 'Book%d' % (len(self.opened) + 1))
+        book.add_sheet('Sheet1')
+        return self.opening(book)
+    
+    def opening(self, book):
+        book.closed = False
+        book.workbooks = self
+        self.opened.append(book)
+        return book
+    
+    def Open(self, filename, UpdateLinks=3, ReadOnly=False, *args, **kwargs):
+        app = self.app
+        com = app.com
+        com.call('Workbooks.Open')
+        if filename in self.books:
+            book = self.books[filename]
+            book.bind(com)
+            if book.links and UpdateLinks != 0:
+                com.wait(book.links)
+            if app.calculation == XL_CALCULATION_AUTOMATIC:
+                app.recalculate([book])
+            if book.on_open and app.EnableEvents:
+                com.wait(book.on_open)
+            return self.opening(book)
+        source = xlsxreader.XlsxBook(filename)
+        book = FakeBook(com, source.Name)
+        for s in source.Worksheets:
+            sheet = FakeSheet(com, s.Name, s.grid)
+            for (row, col), address in sorted(s.grid.hyperlinks.items()):
+                sheet.hyperlinks.append(FakeHyperlink(sheet, row, col, address))
+            book.sheets.append(sheet)
+        source.Close()
+        return self.opening(book)
+    
+    def add(self, filename):
+        """
+        registers an empty book which Open returns for the filename.
+        """
+        book = FakeBook(self.app.com, os.path.basename(filename))
+        self.books[filename] = book
+        return book
+
+class FakeApplication(object):
+    """
+    stands for Excel.Application in the process.
+    startup: seconds to start, as launching Excel takes.
+    recalc_latency: seconds per formula cell of a recalculation.
+    Calculation, as Excel, can be set only with a book open.
+    """
+    def __init__(self, latency=0.0, cell_latency=0.0, startup=0.0, books=None,
+                 recalc_latency=0.0, wait=spin):
+        if startup > 0:
+            wait(startup)
+        self.com = Com(latency, cell_latency, wait)
+        self.recalc_latency = recalc_latency
+        self.Visible = True
+        self.AskToUpdateLinks = True
+        self.ScreenUpdating = True
+        self.EnableEvents = True
+        self.DisplayAlerts = True
+        self.calculation = XL_CALCULATION_AUTOMATIC
+        self.recalculated = 0
+        self.Workbooks = FakeWorkbooks(self, books)
+        self.quitted = False
+    
+    @property
+    def Application(self):
+        return self
+    
+    @property
+    def Calculation(self):
+        self.com.call('Application.Calculation')
+        return self.calculation
+    
+    @Calculation.setter
+    def Calculation(self, value):
+        self.com.call('Application.Calculation=')
+        if not self.Workbooks.opened:
+            raise FakeComError('Unable to set the Calculation property of the Application class')
+        self.calculation = value
+        if value == XL_CALCULATION_AUTOMATIC:
+            self.recalculate(self.Workbooks.opened)
+    
+    def recalculate(self, books):
+        self.com.call('Application.Calculate')
+        cells = sum(book.formula_count() for book in books)
+        self.recalculated += cells
+        if cells and self.recalc_latency > 0:
+            self.com.wait(cells * self.recalc_latency)
+    
+    def Quit(self):
+        self.com.call('Application.Quit')
+        self.quitted = True
+
+def DispatchEx(progid, latency=0.0, cell_latency=0.0, startup=0.0, books=None,
+               recalc_latency=0.0, wait=spin):
+    """
+    drop-in for win32com.client.DispatchEx('Excel.Application').
+    bind the keyword arguments with functools.partial.
+    """
+    return FakeApplication(latency, cell_latency, startup, books, recalc_latency, wait)
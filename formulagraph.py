@@ -0,0 +1,383 @@
+#!python3
+
+import bisect
+import functools
+import json
+import os.path
+import re
+import cellrange
+import jsonstream
+
+# formulas parsed are memoized up to this number; a fill-down is one formula in R1C1.
+CACHE_SIZE = 1 << 16
+
+p_part = r'(?:\[-?[0-9]+\]|[0-9]+)'
+p_ref = r'R{0}?C{0}?|R{0}?|C{0}?'.format(p_part)
+
+p_token = re.compile(r'''
+    (?P<string>"(?:[^"]|"")*")
+  | (?P<error>\#(?:NULL!|DIV/0!|VALUE!|REF!|NAME\?|NUM!|N/A|SPILL!|CALC!|GETTING_DATA))
+  | (?P<sheet>(?:'(?:[^']|'')+'|(?:\[[^\]]+\])?[^\s'"!(),:;=+\-*/^&<>{{}}\[\]#%]+)!)
+  | (?P<ref>(?:{0})(?::(?:{0}))?)(?![\w.(\[])
+  | (?P<function>[^\W\d][\w.]*\()
+  | (?P<name>[^\W\d][\w.]*)
+  | (?P<number>[0-9]+(?:\.[0-9]*)?(?:[Ee][+-]?[0-9]+)?)
+  | (?P<op>\S)
+  | \s+
+'''.format(p_ref), re.VERBOSE)
+
+p_ref_part = re.compile(r'(R)?(?:\[(-?[0-9]+)\]|([0-9]+))?(?:(C)(?:\[(-?[0-9]+)\]|([0-9]+))?)?$')
+
+p_plain_sheet = re.compile(r'[^\W\d][\w.]*$')
+p_bounds = re.compile(r'([A-Z]{1,3})([0-9]+)(?::([A-Z]{1,3})([0-9]+))?$')
+
+class CycleError(ValueError):
+    """
+    raised when formulas refer to each other in a circle.
+    cells: the cells of the circle, (sheet, row, col) each.
+    """
+    def __init__(self, cells):
+        ValueError.__init__(self, 'circular reference: %s' % ' -> '.join(
+            node_address(cell + cell[1:]) for cell in cells))
+        self.cells = cells
+
+def tokenize(formula):
+    """
+    yields (kind, text) of an R1C1 formula, without blanks.
+    kind: string, error, sheet (with '!'), ref (R1C1 cell, row, column or a range of them),
+    function (with '('), name, number or op.
+    """
+    for m in p_token.finditer(formula):
+        if m.lastgroup:
+            yield (m.lastgroup, m.group())
+
+def parse_part(text):
+    """
+    parses R[-1]C2 into ((row, relative), (col, relative)), an absent part as None.
+    a bare R or C is the same row or column, relative by 0.
+    """
+    r, row_offset, row, c, col_offset, col = p_ref_part.match(text).groups()
+    rows = None if not r else ((int(row), False) if row else (int(row_offset or 0), True))
+    cols = None if not c else ((int(col), False) if col else (int(col_offset or 0), True))
+    return (rows, cols)
+
+def parse_ref(sheet, text):
+    """
+    parses a reference into (sheet, row1, col1, row2, col2), each part (number, relative).
+    whole rows and columns are spread over the columns and rows of a worksheet.
+    """
+    begin, sep, end = text.partition(':')
+    rows1, cols1 = parse_part(begin)
+    rows2, cols2 = parse_part(end) if sep else (rows1, cols1)
+    if rows1 is None or rows2 is None:
+        rows1, rows2 = (1, False), (cellrange.MAX_ROW, False)
+    if cols1 is None or cols2 is None:
+        cols1, cols2 = (1, False), (cellrange.MAX_COL, False)
+    return (sheet, rows1, cols1, rows2, cols2)
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def sheet_name(text):
+    """
+    returns the sheet of a prefix, 'Sheet 1'! -> Sheet 1.
+    """
+    text = text[:-1]
+    if text.startswith("'"):
+        return text[1:-1].replace("''", "'")
+    return text
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def references(formula):
+    """
+    returns references of an R1C1 formula, as parse_ref returns them, sheet None for its own.
+    """
+    refs = []
+    sheet = None
+    for kind, text in tokenize(formula):
+        if kind == 'sheet':
+            sheet = sheet_name(text)
+            continue
+        if kind == 'ref':
+            refs.append(parse_ref(sheet, text))
+        sheet = None
+    return tuple(refs)
+
+def resolve(ref, sheet, row, col):
+    """
+    returns a node (sheet, row1, col1, row2, col2) of a reference in a formula at (row, col).
+    """
+    ref_sheet, (row1, rel1), (col1, cel1), (row2, rel2), (col2, cel2) = ref
+    row1 = row + row1 if rel1 else row1
+    col1 = col + col1 if cel1 else col1
+    row2 = row + row2 if rel2 else row2
+    col2 = col + col2 if cel2 else col2
+    if row1 > row2:
+        row1, row2 = row2, row1
+    if col1 > col2:
+        col1, col2 = col2, col1
+    return (ref_sheet or sheet, row1, col1, row2, col2)
+
+@functools.lru_cache(maxsize=None)
+def sheet_prefix(sheet):
+    """
+    returns Sheet1!, or 'Sheet 1'! quoted as a formula does.
+    """
+    if p_plain_sheet.match(sheet) and not cellrange.p_cell.match(sheet):
+        return sheet + '!'
+    return "'%s'!" % sheet.replace("'", "''")
+
+def node_address(node):
+    """
+    returns an A1 address of a node, with the sheet; 'Sheet 1'!A1:A10.
+    """
+    sheet, row1, col1, row2, col2 = node
+    letters = cellrange.LETTERS
+    if row1 == row2 and col1 == col2:
+        return '%s%s%d' % (sheet_prefix(sheet), letters[col1], row1)
+    return '%s%s%d:%s%d' % (sheet_prefix(sheet), letters[col1], row1, letters[col2], row2)
+
+def parse_node(address):
+    """
+    parses an address of node_address into a node.
+    """
+    sheet, sep, bounds = address.rpartition('!')
+    letters1, row1, letters2, row2 = p_bounds.match(bounds).groups()
+    numbers = cellrange.NUMBERS
+    if letters2 is None:
+        return (sheet_name(sheet + sep), int(row1), numbers[letters1], int(row1), numbers[letters1])
+    return (sheet_name(sheet + sep), int(row1), numbers[letters1], int(row2), numbers[letters2])
+
+class Graph(object):
+    """
+    formula cells and what they refer to, over the sheets of a book.
+    a reference to a range is a node of the range, not a node per cell,
+    and a formula keeps its parsed references shared by a fill-down; memory is linear.
+    cells are (sheet, row, col), nodes (sheet, row1, col1, row2, col2).
+    """
+    def __init__(self):
+        self.sheets = {}
+        self.columns = None
+    
+    def add_sheet(self, sheet, data, row_begin=1, col_begin=1):
+        """
+        adds formulas of a matrix of FormulaR1C1, as get_value returns in formula mode,
+        whose top left cell is at (row_begin, col_begin); values without '=' are left out.
+        returns the number of formulas.
+        """
+        cells = self.sheets.setdefault(sheet, {})
+        count = 0
+        for row, line in enumerate(data, row_begin):
+            for col, value in enumerate(line, col_begin):
+                if type(value) is str and value.startswith('='):
+                    cells[(row, col)] = references(value)
+                    count += 1
+        self.columns = None
+        return count
+    
+    def add_cell(self, cell, nodes):
+        """
+        adds a formula cell referring to nodes, as read from an adjacency file.
+        """
+        refs = tuple((sheet, (row1, False), (col1, False), (row2, False), (col2, False))
+                     for sheet, row1, col1, row2, col2 in nodes)
+        self.sheets.setdefault(cell[0], {})[cell[1:]] = refs
+        self.columns = None
+    
+    def __len__(self):
+        return sum(len(cells) for cells in self.sheets.values())
+    
+    def __contains__(self, cell):
+        cells = self.sheets.get(cell[0])
+        return cells is not None and cell[1:] in cells
+    
+    def cells(self):
+        """
+        yields formula cells, sheet by sheet, column by column.
+        """
+        for sheet, cells in self.sheets.items():
+            for row, col in sorted(cells, key=lambda cell: (cell[1], cell[0])):
+                yield (sheet, row, col)
+    
+    def precedents(self, cell):
+        """
+        returns nodes a formula cell refers to.
+        """
+        sheet, row, col = cell
+        return [resolve(ref, sheet, row, col) for ref in self.sheets[sheet][(row, col)]]
+    
+    def index_columns(self):
+        """
+        returns {sheet: (sorted columns, {column: sorted rows})} of formula cells.
+        """
+        if self.columns is None:
+            self.columns = {}
+            for sheet, cells in self.sheets.items():
+                rows = {}
+                for row, col in cells:
+                    rows.setdefault(col, []).append(row)
+                for col_rows in rows.values():
+                    col_rows.sort()
+                self.columns[sheet] = (sorted(rows), rows)
+        return self.columns
+    
+    def order(self):
+        """
+        returns formula cells in an order to calculate them; every cell after its precedents.
+        raises CycleError on a circular reference.
+        a range is walked with the cells already ordered skipped, by a union-find
+        over each column, so that running totals, SUM(R1C:R[-1]C), stay linear.
+        """
+        columns = self.index_columns()
+        skips = {}
+        
+        def find(key, i):
+            skip = skips[key]
+            root = i
+            while skip[root] != root:
+                root = skip[root]
+            while skip[i] != root:
+                skip[i], i = root, skip[i]
+            return root
+        
+        def finish(cell):
+            sheet, row, col = cell
+            rows = columns[sheet][1][col]
+            i = bisect.bisect_left(rows, row)
+            key = (sheet, col)
+            if key not in skips:
+                skips[key] = list(range(len(rows) + 1))
+            skips[key][i] = i + 1
+        
+        def formula_cells(node):
+            sheet, row1, col1, row2, col2 = node
+            if sheet not in columns:
+                return
+            cols, rows = columns[sheet]
+            for col in cols[bisect.bisect_left(cols, col1):bisect.bisect_right(cols, col2)]:
+                col_rows = rows[col]
+                key = (sheet, col)
+                if key not in skips:
+                    skips[key] = list(range(len(col_rows) + 1))
+                i = find(key, bisect.bisect_left(col_rows, row1))
+                while i < len(col_rows) and col_rows[i] <= row2:
+                    yield (sheet, col_rows[i], col)
+                    i = find(key, i + 1)
+        
+        sheets = self.sheets
+        
+        def walk(cell):
+            sheet, row, col = cell
+            for ref in sheets[sheet][(row, col)]:
+                node = resolve(ref, sheet, row, col)
+                if node[1] == node[3] and node[2] == node[4]:
+                    cells = sheets.get(node[0])
+                    if cells is not None and (node[1], node[2]) in cells:
+                        yield node[:3]
+                else:
+                    yield from formula_cells(node)
+        
+        order = []
+        state = {}
+        for start in self.cells():
+            if start in state:
+                continue
+            state[start] = False
+            stack = [(start, walk(start))]
+            while stack:
+                cell, precedents = stack[-1]
+                for found in precedents:
+                    done = state.get(found)
+                    if done is None:
+                        state[found] = False
+                        stack.append((found, walk(found)))
+                        break
+                    if not done:
+                        path = [entry[0] for entry in stack]
+                        raise CycleError(path[path.index(found):] + [found])
+                else:
+                    stack.pop()
+                    state[cell] = True
+                    finish(cell)
+                    order.append(cell)
+        return order
+    
+    def affected(self, changed):
+        """
+        returns formula cells to calculate again when cells changed, in order.
+        changed: cells (sheet, row, col) of changed values or formulas.
+        """
+        dirty = set()
+        dirty_rows = {}
+        
+        def mark(cell):
+            dirty.add(cell)
+            rows = dirty_rows.setdefault(cell[0], {}).setdefault(cell[2], [])
+            bisect.insort(rows, cell[1])
+        
+        def is_dirty(node):
+            sheet, row1, col1, row2, col2 = node
+            if node[1:3] == node[3:5]:
+                return (sheet, row1, col1) in dirty
+            cols = dirty_rows.get(sheet, {})
+            for col in range(col1, col2 + 1) if col2 - col1 < len(cols) else list(cols):
+                rows = cols.get(col)
+                if rows and col1 <= col <= col2:
+                    i = bisect.bisect_left(rows, row1)
+                    if i < len(rows) and rows[i] <= row2:
+                        return True
+            return False
+        
+        for cell in changed:
+            mark(tuple(cell))
+        found = []
+        for cell in self.order():
+            if cell in dirty:
+                found.append(cell)
+            elif any(is_dirty(node) for node in self.precedents(cell)):
+                mark(cell)
+                found.append(cell)
+        return found
+
+def deps_name(file_name):
+    """
+    returns the adjacency file of a sheet file, sheet1.json -> sheet1.deps.json.
+    """
+    return os.path.splitext(file_name)[0] + '.deps.json'
+
+def write_adjacency(graph, sheet, file_name):
+    """
+    writes formula cells of a sheet, in the order added, and the nodes each refers to,
+    as A1 addresses,
+    {"sheet": "Sheet1", "cells": {"C2": ["Sheet1!B2", "'Sheet 2'!A1:A10"], ...}}.
+    returns the number of cells.
+    """
+    letters = cellrange.LETTERS
+    cells = {}
+    for (row, col), refs in graph.sheets.get(sheet, {}).items():
+        cells['%s%d' % (letters[col], row)] = [node_address(resolve(ref, sheet, row, col))
+                                               for ref in refs]
+    with jsonstream.open_json(file_name) as outfile:
+        outfile.write(jsonstream.encode_compact({'sheet': sheet, 'cells': cells}))
+    return len(cells)
+
+def read_adjacency(graph, file_name):
+    """
+    adds formula cells of an adjacency file into graph.
+    """
+    with open(file_name, encoding='utf-8') as infile:
+        adjacency = json.load(infile)
+    sheet = adjacency['sheet']
+    for address, nodes in adjacency['cells'].items():
+        graph.add_cell((sheet,) + cellrange.read_cell(address),
+                       [parse_node(node) for node in nodes])
+
+def load(dest):
+    """
+    returns a Graph of the adjacency files listed in index.json of dest.
+    """
+    with open(os.path.join(dest, 'index.json'), encoding='utf-8') as infile:
+        index = json.load(infile)
+    graph = Graph()
+    for entry in index:
+        if 'deps' in entry:
+            read_adjacency(graph, os.path.join(dest, entry['deps']))
+    return graph
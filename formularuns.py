@@ -0,0 +1,127 @@
+#!python3
+
+import itertools
+import json
+import operator
+import columnar
+import jsonstream
+
+# numbers of different types may be equal, 1.0 == True; they are told apart by type.
+NUMBERS = frozenset((bool, int, float))
+
+def typed(value):
+    return (type(value), value)
+
+def run_starts(values):
+    """
+    returns rows where a run of equal values starts in a column.
+    """
+    changes = itertools.compress(itertools.count(1), map(operator.ne, values[1:], values))
+    return [0] + list(changes)
+
+def find_runs(columns):
+    """
+    returns a list per column, of values when no two cells next to each other are equal,
+    or of rectangles [row, col, height, width, key] of equal cells starting at the column.
+    the rectangles and the lists of values cover each cell once.
+    a run down a column is joined with the same run of the next column,
+    so that a formula filled down and right makes a rectangle, a total row a row of width.
+    """
+    found = []
+    runs = {}
+    for col, values in enumerate(columns):
+        starts = run_starts(values)
+        if len(starts) == len(values):
+            found.append(values)
+            runs = {}
+            continue
+        rects = []
+        following = {}
+        for row, end in zip(starts, starts[1:] + [len(values)]):
+            run = (row, end - row, values[row])
+            rect = runs.get(run)
+            if rect is None:
+                rect = [row, col, end - row, 1, values[row]]
+                rects.append(rect)
+            else:
+                rect[3] += 1
+            following[run] = rect
+        found.append(rects)
+        runs = following
+    return found
+
+def encode_runs(rows, names=None):
+    """
+    returns a runs object of rows, a matrix or an iterable of rows.
+    names: a name per column, such as headers; None gives 0, 1, ...
+    values: each distinct value once, R1C1 formulas of a fill-down being the same string.
+    runs: int32 quintuples row, col, height, width and code into values,
+    of rectangles of more than a cell. cells: codes of the other cells, column by column.
+    """
+    matrix = list(rows)
+    columns = list(zip(*matrix))
+    types = set()
+    for values in columns:
+        types.update(map(type, values))
+    if len(types & NUMBERS) > 1:
+        columns = [tuple(map(typed, values)) for values in columns]
+    
+    table = {}
+    code = lambda key: table.setdefault(key, len(table))
+    runs = []
+    cells = []
+    for found in find_runs(columns):
+        if type(found) is tuple:
+            cells.extend(map(code, found))
+            continue
+        for row, col, height, width, key in found:
+            if height == 1 and width == 1:
+                cells.append(code(key))
+            else:
+                runs.extend((row, col, height, width, code(key)))
+    values = [key[1] for key in table] if len(types & NUMBERS) > 1 else list(table)
+    kind = columnar.code_type(len(values))
+    if names is None:
+        names = list(range(len(columns)))
+    return {
+        'layout': 'runs',
+        'rows': len(matrix),
+        'names': list(names),
+        'values': values,
+        'runs': columnar.pack(runs, 'int32'),
+        'codes': kind,
+        'cells': columnar.pack(cells, kind),
+    }
+
+def write_runs(outfile, rows, pretty=True, names=None):
+    """
+    writes rows as a runs object. returns the number of rows.
+    the signature follows jsonstream.write_rows.
+    """
+    table = encode_runs(rows, names)
+    if pretty:
+        json.dump(table, outfile, ensure_ascii=False, indent=4)
+    else:
+        outfile.write(jsonstream.encode_compact(table))
+    return table['rows']
+
+def decode_rows(table):
+    """
+    returns rows of a runs object, as the row layout holds them.
+    """
+    values = table['values']
+    cols = len(table['names'])
+    hole = object()
+    matrix = [[hole] * cols for r in range(table['rows'])]
+    runs = columnar.unpack(table['runs'], 'int32')
+    for k in range(0, len(runs), 5):
+        row, col, height, width, code = runs[k:k + 5]
+        fill = [values[code]] * width
+        for line in matrix[row:row + height]:
+            line[col:col + width] = fill
+    cells = iter(columnar.unpack(table['cells'], table['codes']))
+    for col in range(cols):
+        for line in matrix:
+            if line[col] is hole:
+                line[col] = values[next(cells)]
+    return matrix
@@ -0,0 +1,123 @@
+#!python3
+
+import hashlib
+import io
+import json
+from json.encoder import encode_basestring
+
+# rows are buffered and written together.
+ROWS_PER_WRITE = 1000
+
+encode = json.JSONEncoder(ensure_ascii=False, check_circular=False).encode
+encode_compact = json.JSONEncoder(ensure_ascii=False, check_circular=False,
+                                  separators=(',', ':')).encode
+float_repr = float.__repr__
+INFINITY = float('inf')
+
+def encode_value(value):
+    """
+    encodes a cell value as json.dumps(value, ensure_ascii=False) does.
+    """
+    kind = type(value)
+    if kind is str:
+        return encode_basestring(value)
+    if kind is float and value == value and -INFINITY < value < INFINITY:
+        return float_repr(value)
+    if value is None:
+        return 'null'
+    return encode(value)
+
+def pretty_row(row):
+    """
+    encodes a row as an element of json.dump(rows, indent=4).
+    """
+    if not row:
+        return '[]'
+    if any(isinstance(v, (list, tuple, dict)) for v in row):
+        return json.dumps(row, ensure_ascii=False, indent=4).replace('\n', '\n    ')
+    return '[\n        ' + ',\n        '.join([encode_value(v) for v in row]) + '\n    ]'
+
+def open_json(file_name):
+    """
+    opens a buffered UTF-8 stream which writes newlines as they are.
+    """
+    return io.open(file_name, 'w', encoding='utf-8', newline='')
+
+class DigestFile(object):
+    """
+    a binary file taking text as UTF-8, hashing the bytes as they are written.
+    """
+    def __init__(self, file_name):
+        self.file = io.open(file_name, 'wb')
+        self.digest = hashlib.sha1()
+    
+    def write(self, text):
+        data = text.encode('utf-8')
+        self.digest.update(data)
+        self.file.write(data)
+    
+    def hexdigest(self):
+        return self.digest.hexdigest()
+    
+    def close(self):
+        self.file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+def write_rows(outfile, rows, pretty=True):
+    """
+    writes rows from an iterable as a json array, holding a few rows at once.
+    pretty: byte-identical to json.dump(rows, indent=4, ensure_ascii=False).
+    compact: no white spaces at all.
+    """
+    return write_array(outfile, rows, pretty_row if pretty else encode_compact, pretty)
+
+def write_array(outfile, rows, encode_row, pretty=True):
+    """
+    writes rows encoded by encode_row as elements of a json array.
+    returns the number of rows.
+    """
+    if pretty:
+        begin, separator, end = '[\n    ', ',\n    ', '\n]'
+    else:
+        begin, separator, end = '[', ',', ']'
+    count = 0
+    chunk = []
+    for row in rows:
+        chunk.append(encode_row(row))
+        if len(chunk) == ROWS_PER_WRITE:
+            outfile.write((separator if count else begin) + separator.join(chunk))
+            count += len(chunk)
+            chunk = []
+    if chunk:
+        outfile.write((separator if count else begin) + separator.join(chunk))
+        count += len(chunk)
+    outfile.write(end if count else '[]')
+    return count
+
+def write_json(file_name, rows, pretty=True, write=write_rows):
+    """
+    writes rows into a file. returns the number of rows.
+    write: write_rows or another writer of the same signature.
+    """
+    with open_json(file_name) as outfile:
+        return write(outfile, rows, pretty)
+
+def write_json_digest(file_name, rows, pretty=True, write=write_rows):
+    """
+    writes rows as write_json does. returns (number of rows, sha1 of the file).
+    """
+    with DigestFile(file_name) as outfile:
+        count = write(outfile, rows, pretty)
+    return (count, outfile.hexdigest())
+
+def dump(obj, file_name):
+    """
+    writes a small object, such as index.json, with indent.
+    """
+    with open_json(file_name) as outfile:
+        json.dump(obj, outfile, ensure_ascii=False, indent=4)
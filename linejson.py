@@ -0,0 +1,133 @@
+#!python3
+
+import array
+import json
+import os.path
+import struct
+import sys
+import jsonstream
+
+# offsets sidecar: this header, then uint64 byte offsets of rows 0, K, 2K, ...
+# and the end of the file, all little endian.
+MAGIC = b'NDX1'
+HEADER = struct.Struct('<4sIQ')
+
+def offsets_name(file_name):
+    """
+    returns the sidecar name of an ndjson file; sheet1.ndjson -> sheet1.idx
+    """
+    return os.path.splitext(file_name)[0] + '.idx'
+
+def byte_length(line):
+    return len(line) if line.isascii() else len(line.encode('utf-8'))
+
+class Writer(object):
+    """
+    writes rows a line each, noting byte offsets of every k-th row.
+    called as jsonstream.write_rows is; pretty is ignored, a line is always compact.
+    save() writes the offsets after the rows.
+    """
+    def __init__(self, encode_row=jsonstream.encode_compact, every=1):
+        self.encode_row = encode_row
+        self.every = every
+        self.offsets = array.array('Q')
+        self.rows = 0
+    
+    def __call__(self, outfile, rows, pretty=True):
+        encode_row = self.encode_row
+        every = self.every
+        offsets = self.offsets = array.array('Q')
+        position = 0
+        count = 0
+        chunk = []
+        for row in rows:
+            line = encode_row(row) + '\n'
+            if count % every == 0:
+                offsets.append(position)
+            position += byte_length(line)
+            count += 1
+            chunk.append(line)
+            if len(chunk) == jsonstream.ROWS_PER_WRITE:
+                outfile.write(''.join(chunk))
+                chunk = []
+        if chunk:
+            outfile.write(''.join(chunk))
+        offsets.append(position)
+        self.rows = count
+        return count
+    
+    def save(self, file_name):
+        offsets = array.array('Q', self.offsets)
+        if sys.byteorder == 'big':
+            offsets.byteswap()
+        with open(file_name, 'wb') as outfile:
+            outfile.write(HEADER.pack(MAGIC, self.every, self.rows))
+            outfile.write(offsets.tobytes())
+
+def load_offsets(file_name):
+    """
+    returns (every, rows, offsets) of a sidecar.
+    """
+    with open(file_name, 'rb') as infile:
+        magic, every, rows = HEADER.unpack(infile.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError('not an offsets file: %s' % file_name)
+        offsets = array.array('Q')
+        offsets.frombytes(infile.read())
+    if sys.byteorder == 'big':
+        offsets.byteswap()
+    return (every, rows, offsets)
+
+class Reader(object):
+    """
+    reads rows of an ndjson file by row number, seeking with the offsets sidecar.
+    a slice reads from the offset at or before its first row,
+    so no more than every - 1 rows are read and thrown away.
+    
+    with Reader('sheet1.ndjson') as reader:
+        reader[10]
+        reader[100:200]
+    """
+    def __init__(self, file_name, offsets_file=None):
+        self.every, self.rows, self.offsets = load_offsets(offsets_file or offsets_name(file_name))
+        self.file = open(file_name, 'rb')
+    
+    def __len__(self):
+        return self.rows
+    
+    def read(self, start, stop):
+        """
+        returns rows from start up to, not including, stop.
+        """
+        start = max(0, start)
+        stop = min(stop, self.rows)
+        if start >= stop:
+            return []
+        every = self.every
+        first = start // every
+        last = -(-stop // every)
+        self.file.seek(self.offsets[first])
+        data = self.file.read(self.offsets[last] - self.offsets[first])
+        lines = data.split(b'\n')
+        skip = start - first * every
+        return [json.loads(line) for line in lines[skip:skip + stop - start]]
+    
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.rows)
+            rows = self.read(start, stop)
+            return rows[::step] if step != 1 else rows
+        if key < 0:
+            key += self.rows
+        if not 0 <= key < self.rows:
+            raise IndexError('row %d out of %d rows' % (key, self.rows))
+        return self.read(key, key + 1)[0]
+    
+    def close(self):
+        self.file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, type, value, traceback):
+        self.close()
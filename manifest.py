@@ -0,0 +1,130 @@
+#!python3
+
+import hashlib
+import json
+import os
+import os.path
+import jsonstream
+
+# manifest.json is written next to index.json.
+MANIFEST = 'manifest.json'
+
+# bump when the converter writes different json for the same book and options,
+# or this file changes its form.
+VERSION = 2
+
+# options which change the json written.
+OPTIONS = ('origin', 'columns', 'url', 'noheader', 'text', 'textmode', 'formula',
+           'backend', 'compact', 'layout', 'ndjson', 'offset_every', 'rows_per_file', 'fast',
+           'deps')
+
+def file_digest(file_name, chunk=1 << 20):
+    """
+    returns sha1 of a file, read in chunks.
+    """
+    digest = hashlib.sha1()
+    with open(file_name, 'rb') as infile:
+        for data in iter(lambda: infile.read(chunk), b''):
+            digest.update(data)
+    return digest.hexdigest()
+
+def book_stat(file_name):
+    stat = os.stat(file_name)
+    return {'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+
+def options_of(args):
+    return dict((name, getattr(args, name, None)) for name in OPTIONS)
+
+def files_of(entry):
+    """
+    returns file names of an index entry; sheet files, parts, offsets sidecars and deps.
+    """
+    for item in entry.get('parts', [entry]):
+        yield item['url']
+        if 'offsets' in item:
+            yield item['offsets']
+    if 'deps' in entry:
+        yield entry['deps']
+
+def load(dest):
+    """
+    returns the manifest in dest, or None if missing or unreadable.
+    """
+    try:
+        with open(os.path.join(dest, MANIFEST), encoding='utf-8') as infile:
+            return json.load(infile)
+    except (OSError, ValueError):
+        return None
+
+class Manifest(object):
+    """
+    what the last run converted into dest: the book, the options and digests of sheet files.
+    unchanged() tells if the book can be skipped, before starting any Excel.
+    replace() moves a sheet file into place only if its content changed.
+    """
+    def __init__(self, dest, filename, options):
+        self.dest = dest
+        self.filename = filename
+        self.options = options
+        self.previous = load(dest) or {}
+        self.digests = self.previous.get('digests', {})
+        self.book = None
+        self.sheets = {}
+    
+    def stat_book(self):
+        """
+        returns size, mtime and sha1 of the book.
+        the book is hashed only if its size or mtime differs from the previous run.
+        """
+        book = book_stat(self.filename)
+        old = self.previous.get('book', {})
+        if (old.get('size'), old.get('mtime')) == (book['size'], book['mtime']):
+            book['sha1'] = old.get('sha1')
+        else:
+            book['sha1'] = file_digest(self.filename)
+        return book
+    
+    def unchanged(self):
+        """
+        returns index of the previous run if nothing is to convert, or None.
+        """
+        self.book = self.stat_book()
+        previous = self.previous
+        if (previous.get('version') != VERSION or previous.get('options') != self.options or
+                previous.get('book', {}).get('sha1') != self.book['sha1']):
+            return None
+        index = previous['sheets']
+        names = ['index.json'] + [name for entry in index for name in files_of(entry)]
+        if not all(os.path.exists(os.path.join(self.dest, name)) for name in names):
+            return None
+        if previous['book'].get('mtime') != self.book['mtime']:
+            # touched but the same content; remember the new mtime.
+            self.sheets = self.digests
+            self.save(index)
+        return index
+    
+    def replace(self, temp, file_name, digest):
+        """
+        moves a sheet file written to temp into file_name, unless file_name has the same digest.
+        returns True if replaced.
+        """
+        url = os.path.basename(file_name)
+        self.sheets[url] = digest
+        if self.digests.get(url) == digest and os.path.exists(file_name):
+            os.remove(temp)
+            return False
+        os.replace(temp, file_name)
+        return True
+    
+    def save(self, index):
+        manifest = {
+            'version': VERSION,
+            'filename': self.filename,
+            'book': self.book or self.stat_book(),
+            'options': self.options,
+            'sheets': index,
+            'digests': self.sheets,
+        }
+        file_name = os.path.join(self.dest, MANIFEST)
+        jsonstream.dump(manifest, file_name + '.tmp')
+        os.replace(file_name + '.tmp', file_name)
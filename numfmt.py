@@ -0,0 +1,643 @@
+#!python3
+
+import datetime
+import decimal
+import math
+import re
+
+# texts of the error values, keyed by the integers Range.Value returns.
+ERROR_TEXTS = {
+    -2146826288: '#NULL!',
+    -2146826281: '#DIV/0!',
+    -2146826273: '#VALUE!',
+    -2146826265: '#REF!',
+    -2146826259: '#NAME?',
+    -2146826252: '#NUM!',
+    -2146826246: '#N/A',
+}
+
+MONTHS = ('January', 'February', 'March', 'April', 'May', 'June', 'July',
+          'August', 'September', 'October', 'November', 'December')
+DAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+DAYS_JA = ('月', '火', '水', '木', '金', '土', '日')
+
+# (full name, abbreviation, letter, first day)
+ERAS = (
+    ('令和', '令', 'R', datetime.date(2019, 5, 1)),
+    ('平成', '平', 'H', datetime.date(1989, 1, 8)),
+    ('昭和', '昭', 'S', datetime.date(1926, 12, 25)),
+    ('大正', '大', 'T', datetime.date(1912, 7, 30)),
+    ('明治', '明', 'M', datetime.date(1868, 9, 8)),
+)
+
+EPOCH = datetime.datetime(1899, 12, 30)
+QUANTS = [decimal.Decimal(1).scaleb(-places) for places in range(31)]
+COLORS = ('black', 'blue', 'cyan', 'green', 'magenta', 'red', 'white', 'yellow')
+
+p_condition = re.compile(r'^(<=|>=|<>|<|>|=)\s*(-?[0-9.]+(?:[eE][-+]?[0-9]+)?)$')
+p_elapsed = re.compile(r'^(h+|m+|s+)$', re.I)
+
+class Unsupported(Exception):
+    """
+    raised while compiling a format that cannot be rendered locally.
+    """
+
+def general(value, width=None):
+    """
+    renders a value as the General format does in a column of width characters,
+    or of 11 characters, as General shows at most, without width.
+    decimals are dropped until a number fits, then it turns into an exponent,
+    and #### shows when even that does not fit.
+    """
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, int) and value in ERROR_TEXTS:
+        return ERROR_TEXTS[value]
+    if isinstance(value, datetime.datetime):
+        value = serial(value)
+    if isinstance(value, decimal.Decimal):
+        # Value of a currency formatted cell.
+        value = float(value)
+    if not isinstance(value, (int, float)):
+        return str(value)
+    chars = 11 if width is None else min(int(width), 11)
+    sign = 1 if value < 0 else 0
+    if value == int(value) and len('%d' % value) <= chars:
+        return '%d' % value
+    if 1e-9 <= abs(value) < 1e11:
+        digits = max(chars - 1 - len('%d' % abs(value)) - sign, 0)
+        text = format(round_half_up(value, digits), 'f')
+        if '.' in text:
+            text = text.rstrip('0').rstrip('.')
+        if len(text) <= chars and (float(text) != 0 or value == 0):
+            return text
+    # d.ddddE+nn
+    mantissa, exponent = ('%.*E' % (max(chars - 6 - sign, 0), value)).split('E')
+    if '.' in mantissa:
+        mantissa = mantissa.rstrip('0').rstrip('.')
+    text = '%sE%s' % (mantissa, exponent)
+    return text if len(text) <= chars else '#' * chars
+
+def text(value):
+    """
+    renders a value as the Text (@) format does.
+    """
+    return value if isinstance(value, str) else general(value)
+
+def serial(value):
+    """
+    converts a datetime into a serial number of the 1900 date system.
+    """
+    if isinstance(value, datetime.datetime):
+        days = (value.replace(tzinfo=None) - EPOCH).total_seconds() / 86400.0
+        # serial 60 is 1900-02-29 which does not exist.
+        return days if days >= 61 else days - 1
+    if isinstance(value, datetime.date):
+        return serial(datetime.datetime(value.year, value.month, value.day))
+    return value
+
+def from_serial(value):
+    if value < 61:
+        value += 1
+    return EPOCH + datetime.timedelta(days=value)
+
+def split_sections(format):
+    """
+    splits a format code at semicolons outside quotes and brackets.
+    """
+    sections = []
+    current = []
+    i = 0
+    n = len(format)
+    while i < n:
+        ch = format[i]
+        if ch == '"':
+            j = format.find('"', i + 1)
+            j = n - 1 if j < 0 else j
+            current.append(format[i:j + 1])
+            i = j + 1
+            continue
+        if ch in '\\_*' and i + 1 < n:
+            current.append(format[i:i + 2])
+            i += 2
+            continue
+        if ch == '[':
+            j = format.find(']', i)
+            j = n - 1 if j < 0 else j
+            current.append(format[i:j + 1])
+            i = j + 1
+            continue
+        if ch == ';':
+            sections.append(''.join(current))
+            current = []
+        else:
+            current.append(ch)
+        i += 1
+    sections.append(''.join(current))
+    return sections
+
+def tokenize(section):
+    """
+    returns a list of (kind, text) of a format section.
+    """
+    tokens = []
+    i = 0
+    n = len(section)
+    lower = section.lower()
+    while i < n:
+        ch = section[i]
+        low = lower[i]
+        if ch == '"':
+            j = section.find('"', i + 1)
+            j = n if j < 0 else j
+            tokens.append(('lit', section[i + 1:j]))
+            i = j + 1
+        elif ch == '\\':
+            tokens.append(('lit', section[i + 1:i + 2]))
+            i += 2
+        elif ch == '_':
+            tokens.append(('lit', ' '))
+            i += 2
+        elif ch == '*':
+            # fill characters depend on the column width.
+            i += 2
+        elif ch == '[':
+            j = section.find(']', i)
+            j = n if j < 0 else j
+            tokens.append(bracket(section[i + 1:j]))
+            i = j + 1
+        elif lower.startswith('general', i):
+            tokens.append(('general', ''))
+            i += 7
+        elif section.startswith('G/標準', i):
+            tokens.append(('general', ''))
+            i += 4
+        elif lower.startswith('am/pm', i):
+            tokens.append(('ampm', 'AM/PM'))
+            i += 5
+        elif lower.startswith('a/p', i):
+            tokens.append(('ampm', section[i:i + 3]))
+            i += 3
+        elif section.startswith('午前/午後', i):
+            tokens.append(('ampm', '午前/午後'))
+            i += 5
+        elif ch in '0#?':
+            tokens.append(('digit', ch))
+            i += 1
+        elif ch == '.':
+            tokens.append(('point', '.'))
+            i += 1
+        elif ch == ',':
+            tokens.append(('comma', ','))
+            i += 1
+        elif ch == '%':
+            tokens.append(('percent', '%'))
+            i += 1
+        elif ch == '@':
+            tokens.append(('at', '@'))
+            i += 1
+        elif low == 'e' and i + 1 < n and section[i + 1] in '+-':
+            tokens.append(('exp', section[i + 1]))
+            i += 2
+        elif low in 'ymdhsge' or (low == 'a' and lower.startswith('aaa', i)):
+            j = i
+            while j < n and lower[j] == low:
+                j += 1
+            tokens.append(('date', low * (j - i)))
+            i = j
+        else:
+            tokens.append(('lit', ch))
+            i += 1
+    return tokens
+
+def bracket(content):
+    """
+    classifies a [...] part of a format section.
+    """
+    low = content.lower()
+    m = p_condition.match(content)
+    if m:
+        return ('cond', (m.group(1), float(m.group(2))))
+    if low in COLORS or re.match(r'^color\s*[0-9]+$', low):
+        return ('skip', content)
+    if p_elapsed.match(content):
+        return ('elapsed', low)
+    if content.startswith('$'):
+        symbol, _, locale = content[1:].partition('-')
+        if locale.upper().startswith(('F800', 'F400')):
+            # system long date and time depend on the Windows settings.
+            raise Unsupported(content)
+        return ('lit', symbol)
+    raise Unsupported(content)
+
+def compare(op, left, right):
+    if op == '<':
+        return left < right
+    if op == '<=':
+        return left <= right
+    if op == '>':
+        return left > right
+    if op == '>=':
+        return left >= right
+    if op == '=':
+        return left == right
+    return left != right
+
+def round_half_up(value, places):
+    """
+    rounds on the 15 significant digits Excel keeps, halves away from zero.
+    """
+    d = decimal.Decimal('%.15g' % value)
+    try:
+        return d.quantize(QUANTS[places], rounding=decimal.ROUND_HALF_UP)
+    except decimal.InvalidOperation:
+        # more digits than the context precision.
+        return d
+
+class NumberSection(object):
+    """
+    renders numbers with digit placeholders, percent, grouping and exponent.
+    """
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.condition = None
+        self.percent = 0
+        self.scale = 0
+        self.grouping = False
+        self.exp = None
+        kinds = [k for k, t in tokens]
+        if 'point' in kinds:
+            point = kinds.index('point')
+        else:
+            point = None
+        if 'exp' in kinds:
+            self.exp = kinds.index('exp')
+        end_int = point if point is not None else (self.exp if self.exp is not None else len(tokens))
+        digits = [i for i, k in enumerate(kinds) if k == 'digit']
+        self.int_digits = [i for i in digits if i < end_int]
+        end_frac = self.exp if self.exp is not None else len(tokens)
+        self.frac_digits = [i for i in digits if point is not None and point < i < end_frac]
+        self.exp_digits = [i for i in digits if self.exp is not None and i > self.exp]
+        self.point = point
+        # commas between integer placeholders group thousands,
+        # commas right after the last placeholder scale by 1000.
+        last_int = self.int_digits[-1] if self.int_digits else -1
+        last_digit = max(self.int_digits + self.frac_digits) if digits else -1
+        for i, kind in enumerate(kinds):
+            if kind == 'percent':
+                self.percent += 1
+            elif kind != 'comma':
+                continue
+            elif self.int_digits and self.int_digits[0] < i < last_int:
+                self.grouping = True
+                tokens[i] = ('skip', ',')
+            elif i > last_digit >= 0 and all(k == 'comma' for k in kinds[last_digit + 1:i]):
+                self.scale += 1
+                tokens[i] = ('skip', ',')
+            else:
+                tokens[i] = ('lit', ',')
+        inner = [k for k, t in tokens[self.int_digits[0]:last_int]] if self.int_digits else []
+        if self.grouping and 'lit' in inner:
+            raise Unsupported('grouping with literals')
+        if any(k == 'lit' and t == '/' for k, t in tokens) and digits:
+            raise Unsupported('fraction')
+        self.fast = self.simple()
+    
+    def simple(self):
+        """
+        returns (prefix, spec, suffix) when format() of a Decimal renders
+        the section, as with #,##0.00 or "$"0.0%.
+        """
+        tokens = self.tokens
+        if self.exp is not None or not self.int_digits:
+            return None
+        placeholders = ''.join(tokens[i][1] for i in self.int_digits)
+        if not placeholders.endswith('0') or placeholders.count('0') != 1 or '?' in placeholders:
+            return None
+        if any(tokens[i][1] != '0' for i in self.frac_digits):
+            return None
+        first = self.int_digits[0]
+        last = (self.frac_digits or self.int_digits)[-1]
+        middle = tokens[first:last + 1]
+        if any(k not in ('digit', 'point', 'skip') for k, t in middle):
+            return None
+        def text(part):
+            if any(k not in ('lit', 'percent', 'skip') for k, t in part):
+                return None
+            return ''.join(t for k, t in part if k != 'skip')
+        prefix = text(tokens[:first])
+        suffix = text(tokens[last + 1:])
+        if prefix is None or suffix is None:
+            return None
+        spec = '%s.%df' % (',' if self.grouping else '', len(self.frac_digits))
+        return (prefix, spec, suffix)
+    
+    def render(self, value, sign):
+        tokens = self.tokens
+        if self.fast:
+            prefix, spec, suffix = self.fast
+            v = abs(value) * 100 ** self.percent / 1000.0 ** self.scale
+            result = prefix + format(round_half_up(v, len(self.frac_digits)), spec) + suffix
+            return ('-' + result) if sign and value < 0 else result
+        v = abs(value) * 100 ** self.percent / 1000.0 ** self.scale
+        places = len(self.frac_digits)
+        exponent = 0
+        if self.exp is not None and v != 0:
+            # ##0.0E+0 steps the exponent by the placeholder count.
+            n = max(len(self.int_digits), 1)
+            step = n if n > 1 and tokens[self.int_digits[0]][1] == '#' else 1
+            if step > 1:
+                exponent = int(math.floor(math.log10(v) / step)) * step
+            else:
+                exponent = int(math.floor(math.log10(v))) - (n - 1)
+            d = round_half_up(v / 10.0 ** exponent, places)
+            if d >= 10 ** (step if step > 1 else n):
+                exponent += step
+            v = v / 10.0 ** exponent
+        d = round_half_up(v, places)
+        ipart, _, fpart = format(d, 'f').partition('.')
+        fpart = fpart.ljust(len(self.frac_digits), '0')
+        if ipart == '0':
+            ipart = ''
+        out = {}
+        # integer part from the right; extra digits go to the leftmost placeholder.
+        rest = ipart
+        for i in reversed(self.int_digits):
+            if rest:
+                out[i] = rest[-1]
+                rest = rest[:-1]
+            else:
+                out[i] = {'0': '0', '#': '', '?': ' '}[tokens[i][1]]
+        if self.int_digits:
+            out[self.int_digits[0]] = rest + out[self.int_digits[0]]
+        if self.grouping and self.int_digits:
+            joined = ''.join(out[i] for i in self.int_digits)
+            body = joined.lstrip(' ')
+            pad = joined[:len(joined) - len(body)]
+            grouped = '{:,}'.format(int(body)) if body else ''
+            if body and len(body) > len(str(int(body))):
+                # keep leading zeros of 0000 style formats.
+                grouped = body[:len(body) - len(str(int(body)))] + grouped
+            for i in self.int_digits:
+                out[i] = ''
+            out[self.int_digits[0]] = pad + grouped
+        # fraction from the left; trailing zeros vanish on # and pad on ?.
+        chars = list(fpart)
+        for k in reversed(range(len(chars))):
+            placeholder = tokens[self.frac_digits[k]][1]
+            if chars[k] != '0' or placeholder == '0':
+                break
+            chars[k] = '' if placeholder == '#' else ' '
+        for k, i in enumerate(self.frac_digits):
+            out[i] = chars[k]
+        if self.exp is not None:
+            digits = '%d' % abs(exponent)
+            zeros = sum(1 for i in self.exp_digits if tokens[i][1] == '0')
+            digits = digits.rjust(zeros, '0')
+            for i in self.exp_digits:
+                out[i] = ''
+            if self.exp_digits:
+                out[self.exp_digits[0]] = digits
+            mark = '-' if exponent < 0 else ('+' if tokens[self.exp][1] == '+' else '')
+            out[self.exp] = 'E' + mark
+        parts = []
+        for i, (kind, t) in enumerate(tokens):
+            if i in out:
+                parts.append(out[i])
+            elif kind == 'lit':
+                parts.append(t)
+            elif kind == 'point':
+                parts.append('.')
+            elif kind == 'percent':
+                parts.append('%')
+            elif kind == 'general':
+                parts.append(general(abs(value)))
+        result = ''.join(parts)
+        return ('-' + result) if sign and value < 0 else result
+
+class DateSection(object):
+    """
+    renders serial numbers with date and time tokens, including Japanese eras.
+    """
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.condition = None
+        self.ampm = any(k == 'ampm' for k, t in tokens)
+        self.places = 0
+        times = [i for i, (k, t) in enumerate(tokens) if k in ('date', 'elapsed')]
+        for n, i in enumerate(times):
+            kind, t = tokens[i]
+            if kind == 'date' and t in ('m', 'mm'):
+                before = tokens[times[n - 1]][1] if n > 0 else ''
+                after = tokens[times[n + 1]][1] if n + 1 < len(times) else ''
+                if before[:1] == 'h' or after[:1] == 's':
+                    tokens[i] = ('minute', t)
+        # .0 after seconds is a fraction of a second.
+        for i, (kind, t) in enumerate(tokens):
+            if kind == 'point' and i > 0 and tokens[i - 1][1] in ('s', 'ss'):
+                j = i + 1
+                while j < len(tokens) and tokens[j] == ('digit', '0'):
+                    j += 1
+                self.places = j - i - 1
+                tokens[i] = ('fraction', self.places)
+                for k in range(i + 1, j):
+                    tokens[k] = ('skip', '0')
+    
+    def render(self, value, sign):
+        if isinstance(value, (datetime.datetime, datetime.date)):
+            value = serial(value)
+        if value < 0:
+            return '#' * 8
+        unit = 86400 * 10 ** self.places
+        ticks = int(round_half_up(value * unit, 0))
+        days, ticks = divmod(ticks, unit)
+        seconds, fraction = divmod(ticks, 10 ** self.places)
+        when = from_serial(days) + datetime.timedelta(seconds=seconds)
+        parts = []
+        for kind, t in self.tokens:
+            if kind == 'lit':
+                parts.append(t)
+            elif kind == 'date':
+                parts.append(self.date_part(t, when))
+            elif kind == 'minute':
+                parts.append('%0*d' % (len(t), when.minute))
+            elif kind == 'elapsed':
+                total = days * 86400 + seconds
+                size = {'h': 3600, 'm': 60, 's': 1}[t[0]]
+                parts.append('%0*d' % (len(t), total // size))
+            elif kind == 'fraction':
+                if self.places:
+                    parts.append('.%0*d' % (self.places, fraction))
+            elif kind == 'ampm':
+                pm = when.hour >= 12
+                if t == '午前/午後':
+                    parts.append('午後' if pm else '午前')
+                elif t.upper() == 'AM/PM':
+                    parts.append('PM' if pm else 'AM')
+                else:
+                    mark = t[2] if pm else t[0]
+                    parts.append(mark)
+            elif kind in ('point', 'comma', 'percent', 'digit'):
+                parts.append(t)
+        return ''.join(parts)
+    
+    def date_part(self, t, when):
+        letter = t[0]
+        n = len(t)
+        if letter == 'y':
+            return '%04d' % when.year if n > 2 else '%02d' % (when.year % 100)
+        if letter == 'm':
+            if n == 1:
+                return '%d' % when.month
+            if n == 2:
+                return '%02d' % when.month
+            name = MONTHS[when.month - 1]
+            return name[:3] if n == 3 else (name if n == 4 else name[0])
+        if letter == 'd':
+            if n <= 2:
+                return '%0*d' % (n, when.day)
+            name = DAYS[when.weekday()]
+            return name[:3] if n == 3 else name
+        if letter == 'a':
+            name = DAYS_JA[when.weekday()]
+            return name if n == 3 else name + '曜日'
+        if letter == 'h':
+            hour = when.hour
+            if self.ampm:
+                hour = hour % 12 or 12
+            return '%0*d' % (min(n, 2), hour)
+        if letter == 's':
+            return '%0*d' % (min(n, 2), when.second)
+        era = next(e for e in ERAS if e[3] <= when.date())
+        if letter == 'g':
+            return (era[2], era[1], era[0])[min(n, 3) - 1]
+        if letter == 'e':
+            year = when.year - era[3].year + 1
+            return '%0*d' % (min(n, 2), year)
+        return t
+
+class TextSection(object):
+    """
+    renders strings into @ of the section.
+    """
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.condition = None
+    
+    def render(self, value, sign):
+        parts = []
+        for kind, t in self.tokens:
+            if kind == 'at':
+                parts.append(text(value))
+            elif kind in ('lit', 'point', 'comma', 'percent', 'digit'):
+                parts.append(t)
+        return ''.join(parts)
+
+def make_section(section):
+    tokens = tokenize(section)
+    condition = None
+    kept = []
+    for kind, t in tokens:
+        if kind == 'cond':
+            condition = t
+        elif kind != 'skip':
+            kept.append((kind, t))
+    kinds = set(k for k, t in kept)
+    if kinds & set(('date', 'elapsed')):
+        compiled = DateSection(kept)
+    elif 'at' in kinds:
+        compiled = TextSection(kept)
+    else:
+        compiled = NumberSection(kept)
+    compiled.condition = condition
+    return compiled
+
+class Formatter(object):
+    """
+    a compiled number format code; call it with a value.
+    """
+    def __init__(self, format):
+        self.format = format
+        sections = [make_section(s) for s in split_sections(format)]
+        self.text_section = None
+        if len(sections) >= 4 or (len(sections) > 1 and isinstance(sections[-1], TextSection)):
+            self.text_section = sections.pop()
+        self.sections = sections
+        self.conditional = any(s.condition for s in sections)
+        if self.conditional and len(sections) > 1 and sections[1].condition is None \
+                and len(sections) == 2:
+            # [cond]a;b means b for everything else.
+            sections[1].condition = ('else', None)
+    
+    def __call__(self, value):
+        if value is None:
+            return ''
+        if isinstance(value, bool):
+            return 'TRUE' if value else 'FALSE'
+        if isinstance(value, int) and value in ERROR_TEXTS:
+            return ERROR_TEXTS[value]
+        if isinstance(value, str):
+            if self.text_section:
+                return self.text_section.render(value, False)
+            only = self.sections[0] if len(self.sections) == 1 else None
+            if isinstance(only, TextSection):
+                return only.render(value, False)
+            return value
+        if isinstance(value, (datetime.datetime, datetime.date)):
+            value = serial(value)
+        if isinstance(value, decimal.Decimal):
+            # Value of a currency formatted cell.
+            value = float(value)
+        section, sign = self.choose(value)
+        if isinstance(section, TextSection):
+            return general(value)
+        return section.render(value, sign)
+    
+    def choose(self, value):
+        sections = self.sections
+        if self.conditional:
+            for s in sections:
+                c = s.condition
+                if c is None or c[0] == 'else' or compare(c[0], value, c[1]):
+                    negative_section = c is not None and c[0] in ('<', '<=') and c[1] <= 0
+                    return (s, not negative_section)
+            return (sections[-1], True)
+        if value < 0 and len(sections) >= 2:
+            return (sections[1], False)
+        if value == 0 and len(sections) >= 3:
+            return (sections[2], False)
+        return (sections[0], True)
+
+_compiled = {}
+
+def compile(format):
+    """
+    returns a function rendering a value as Range.Text does,
+    or None when the format is not supported.
+    each format code is compiled once and cached.
+    """
+    if format is None:
+        return None
+    try:
+        return _compiled[format]
+    except KeyError:
+        pass
+    if format in ('General', 'G/標準'):
+        formatter = general
+    elif format == '@':
+        formatter = text
+    else:
+        try:
+            formatter = Formatter(format)
+        except Unsupported:
+            formatter = None
+    _compiled[format] = formatter
+    return formatter
+
+def render(value, format):
+    """
+    renders a value with a format code, falling back to General.
+    """
+    return (compile(format) or general)(value)
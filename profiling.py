@@ -0,0 +1,262 @@
+#!python3
+
+import contextlib
+import datetime
+import functools
+import json
+import threading
+import time
+import types
+
+# the Profile being recorded, or None; phase() and wrap() do nothing without it.
+current = None
+
+# types of values passed through as they are; anything else is an object of the object model,
+# even a subclass of list such as a collection of a stand-in.
+PLAIN = frozenset((str, bytes, int, float, bool, type(None), tuple, list, dict))
+
+METHODS = (types.MethodType, types.FunctionType, types.BuiltinFunctionType,
+           functools.partial)
+
+# class name prefixes of stand-in object models, FakeRange -> Range.
+PREFIXES = ('Fake', 'Xlsx')
+
+def kind(target):
+    """
+    returns the type name of an object, such as Range or Worksheet.
+    win32com dynamic objects are all CDispatch, and named by _username_.
+    """
+    name = getattr(target, '_username_', None)
+    if isinstance(name, str):
+        return name
+    name = type(target).__name__
+    for prefix in PREFIXES:
+        if name.startswith(prefix) and len(name) > len(prefix):
+            return name[len(prefix):]
+    return name
+
+class Profile(object):
+    """
+    counts and times members of the object model, by type and member name,
+    and converter phases; a phase times itself, not the phases inside it.
+    'Range.Value': property get, 'Range.Value=': set, 'Workbooks.Open()': call.
+    phases run by other threads, such as writers of --pipeline, are timed on their own;
+    the phases may add up to more than the wall time.
+    """
+    def __init__(self):
+        self.members = {}
+        self.phases = {}
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.start = time.perf_counter()
+    
+    @property
+    def stack(self):
+        """
+        phases being run by the current thread, the innermost last.
+        """
+        stack = getattr(self.local, 'stack', None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+    
+    def count(self, member, seconds):
+        with self.lock:
+            entry = self.members.get(member)
+            if entry is None:
+                entry = self.members[member] = [0, 0.0]
+            entry[0] += 1
+            entry[1] += seconds
+    
+    @contextlib.contextmanager
+    def phase(self, name):
+        stack = self.stack
+        now = time.perf_counter()
+        if stack:
+            self.pause(stack, now)
+        with self.lock:
+            entry = self.phases.get(name)
+            if entry is None:
+                entry = self.phases[name] = [0, 0.0]
+            entry[0] += 1
+        stack.append([name, now])
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            self.pause(stack, now)
+            stack.pop()
+            if stack:
+                stack[-1][1] = now
+    
+    def pause(self, stack, now):
+        name, since = stack[-1]
+        with self.lock:
+            self.phases[name][1] += now - since
+    
+    def report(self):
+        """
+        returns the profile as a dict, sorted by seconds.
+        """
+        wall = time.perf_counter() - self.start
+        def table(entries):
+            return dict((name, {'count': count, 'seconds': seconds})
+                        for name, (count, seconds) in
+                        sorted(entries.items(), key=lambda item: -item[1][1]))
+        return {
+            'wall': wall,
+            'phases': table(self.phases),
+            'members': table(self.members),
+        }
+    
+    def summary(self):
+        """
+        returns the report as lines of text.
+        """
+        report = self.report()
+        wall = report['wall']
+        lines = ['%-32s %8s %10s %7s' % ('phase', 'count', 'seconds', '%')]
+        for name, entry in report['phases'].items():
+            lines.append('%-32s %8d %10.3f %6.1f%%' % (name, entry['count'], entry['seconds'],
+                                                      100.0 * entry['seconds'] / wall))
+        lines.append('%-32s %8s %10.3f' % ('wall', '', wall))
+        lines.append('')
+        lines.append('%-32s %8s %10s %10s' % ('member', 'count', 'seconds', 'ms/call'))
+        for name, entry in report['members'].items():
+            lines.append('%-32s %8d %10.3f %10.3f' % (name, entry['count'], entry['seconds'],
+                                                      1000.0 * entry['seconds'] / entry['count']))
+        return lines
+    
+    def save(self, file_name):
+        with open(file_name, 'w', encoding='utf-8') as outfile:
+            json.dump(self.report(), outfile, ensure_ascii=False, indent=4)
+
+def wrap(value, profile=None):
+    """
+    returns value wrapped by a Proxy recording into profile or current,
+    or value as it is when not profiling, plain or already wrapped.
+    """
+    profile = profile or current
+    if profile is None or type(value) in PLAIN or isinstance(value, (datetime.datetime, Proxy)):
+        return value
+    return Proxy(value, profile)
+
+def phase(name):
+    """
+    returns a context timing phase name, or a null context when not profiling.
+    """
+    if current is None:
+        return contextlib.nullcontext()
+    return current.phase(name)
+
+def timed(name):
+    """
+    decorates a function timed as phase name when profiling.
+    """
+    def decorate(function):
+        @functools.wraps(function)
+        def run(*args, **kwargs):
+            if current is None:
+                return function(*args, **kwargs)
+            with current.phase(name):
+                return function(*args, **kwargs)
+        return run
+    return decorate
+
+class Method(object):
+    """
+    a method of a wrapped object; a call is counted as 'Type.Name()'.
+    """
+    __slots__ = ('method', 'member', 'profile')
+    
+    def __init__(self, method, member, profile):
+        self.method = method
+        self.member = member
+        self.profile = profile
+    
+    def __call__(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return wrap(self.method(*unwrap_all(args), **unwrap_keywords(kwargs)), self.profile)
+        finally:
+            self.profile.count(self.member, time.perf_counter() - start)
+
+def unwrap(value):
+    return object.__getattribute__(value, '_target') if isinstance(value, Proxy) else value
+
+def unwrap_all(args):
+    return [unwrap(arg) for arg in args]
+
+def unwrap_keywords(kwargs):
+    return dict((name, unwrap(value)) for name, value in kwargs.items())
+
+class Proxy(object):
+    """
+    wraps an object of an object model, COM or a stand-in,
+    counting and timing property gets, sets and method calls.
+    objects got from it are wrapped in turn; plain values are not.
+    """
+    __slots__ = ('_target', '_profile', '_kind')
+    
+    def __init__(self, target, profile):
+        object.__setattr__(self, '_target', target)
+        object.__setattr__(self, '_profile', profile)
+        object.__setattr__(self, '_kind', kind(target))
+    
+    def __getattr__(self, name):
+        member = '%s.%s' % (self._kind, name)
+        start = time.perf_counter()
+        try:
+            value = getattr(self._target, name)
+        finally:
+            seconds = time.perf_counter() - start
+        if isinstance(value, METHODS):
+            return Method(value, member + '()', self._profile)
+        self._profile.count(member, seconds)
+        return wrap(value, self._profile)
+    
+    def __setattr__(self, name, value):
+        start = time.perf_counter()
+        try:
+            setattr(self._target, name, unwrap(value))
+        finally:
+            self._profile.count('%s.%s=' % (self._kind, name), time.perf_counter() - start)
+    
+    def __call__(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return wrap(self._target(*unwrap_all(args), **unwrap_keywords(kwargs)), self._profile)
+        finally:
+            self._profile.count('%s()' % self._kind, time.perf_counter() - start)
+    
+    def __getitem__(self, key):
+        start = time.perf_counter()
+        try:
+            return wrap(self._target[key], self._profile)
+        finally:
+            self._profile.count('%s[]' % self._kind, time.perf_counter() - start)
+    
+    def __iter__(self):
+        member = '%s.__iter__' % self._kind
+        iterator = iter(self._target)
+        while True:
+            start = time.perf_counter()
+            try:
+                value = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self._profile.count(member, time.perf_counter() - start)
+            yield wrap(value, self._profile)
+    
+    def __len__(self):
+        return len(self._target)
+    
+    def __eq__(self, other):
+        return self._target == unwrap(other)
+    
+    def __hash__(self):
+        return hash(self._target)
+    
+    def __repr__(self):
+        return '<Proxy of %r>' % (self._target,)
@@ -0,0 +1,73 @@
+#!python3
+
+import itertools
+import jsonstream
+from json.encoder import encode_basestring
+
+def key_text(name):
+    """
+    returns a header as a key string; 2015.0 -> '2015', None -> ''.
+    """
+    if name is None:
+        return ''
+    if type(name) is float and name == int(name):
+        return str(int(name))
+    return name if type(name) is str else str(name)
+
+def unique_keys(names, fallback=None):
+    """
+    returns keys for names, unique and not blank, the same for the same names.
+    a blank name takes its fallback, such as the column letter, or 'column<n>'.
+    a repeated name gets a suffix, URL then URL_2, URL_3, ...
+    """
+    texts = [key_text(name).strip() for name in names]
+    for i, text in enumerate(texts):
+        if not text:
+            texts[i] = fallback[i] if fallback else 'column%d' % (i + 1)
+    taken = set(texts)
+    seen = set()
+    keys = []
+    for text in texts:
+        key = text
+        n = 1
+        while key in seen or (key != text and key in taken):
+            n += 1
+            key = '%s_%d' % (text, n)
+        seen.add(key)
+        keys.append(key)
+    return keys
+
+def record_encoder(keys, pretty=True):
+    """
+    returns a function encoding a row as a json object of keys.
+    keys are encoded once here; a row only joins them with its values.
+    """
+    if not keys:
+        return lambda row: '{}'
+    if pretty:
+        begin, separator, end = '{\n        ', ',\n        ', '\n    }'
+        prefixes = [encode_basestring(key) + ': ' for key in keys]
+    else:
+        begin, separator, end = '{', ',', '}'
+        prefixes = [encode_basestring(key) + ':' for key in keys]
+    encode_value = jsonstream.encode_value
+    
+    def encode_row(row):
+        return begin + separator.join([prefix + encode_value(value)
+                                       for prefix, value in zip(prefixes, row)]) + end
+    return encode_row
+
+def write_records(outfile, rows, pretty=True, keys=None):
+    """
+    writes rows as an array of objects, streaming as jsonstream.write_rows does.
+    pretty: byte-identical to json.dump of a list of dicts with indent=4.
+    keys: from unique_keys; None gives '0', '1', ... by the first row.
+    """
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        return jsonstream.write_array(outfile, (), None, pretty)
+    if keys is None:
+        keys = [str(i) for i in range(len(first))]
+    encode_row = record_encoder(keys, pretty)
+    return jsonstream.write_array(outfile, itertools.chain([first], rows), encode_row, pretty)
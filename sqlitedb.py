@@ -0,0 +1,108 @@
+#!python3
+
+import itertools
+import sqlite3
+
+# rows passed to executemany at once.
+ROWS_PER_INSERT = 10000
+
+def quote(name):
+    return '"%s"' % name.replace('"', '""')
+
+def sql_names(keys):
+    """
+    returns column names unique without regard to case, as SQLite compares them.
+    a repeated name gets a suffix, as records.unique_keys does.
+    """
+    seen = set()
+    names = []
+    for key in keys:
+        name = key
+        n = 1
+        while name.lower() in seen or name.lower() == 'rowid':
+            n += 1
+            name = '%s_%d' % (key, n)
+        seen.add(name.lower())
+        names.append(name)
+    return names
+
+def has_trigram(connection):
+    """
+    tells if FTS5 and its trigram tokenizer, SQLite 3.34 or later, are available.
+    trigram matches Japanese text, which has no spaces between words.
+    """
+    try:
+        connection.execute("CREATE VIRTUAL TABLE temp.probe USING fts5(x, tokenize='trigram')")
+        connection.execute('DROP TABLE temp.probe')
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+def connect(file_name):
+    """
+    opens a database to be written at once; a lost run is just run again.
+    the journal is kept in memory, not off, for ROLLBACK of a failed table to work.
+    """
+    connection = sqlite3.connect(file_name, isolation_level=None)
+    connection.execute('PRAGMA journal_mode = MEMORY')
+    connection.execute('PRAGMA synchronous = OFF')
+    connection.execute('CREATE TABLE IF NOT EXISTS sheets '
+                       '(position INTEGER PRIMARY KEY, title TEXT, name TEXT, rows INTEGER, '
+                       'columns TEXT, fts TEXT)')
+    return connection
+
+def write_table(connection, table, names, rows):
+    """
+    creates table and inserts rows in one transaction, a batch each executemany.
+    rows may be an iterator; no more than a batch is held at once.
+    returns the number of rows.
+    """
+    columns = ', '.join(quote(name) for name in names)
+    connection.execute('DROP TABLE IF EXISTS %s' % quote(table))
+    connection.execute('CREATE TABLE %s (%s)' % (quote(table), columns))
+    insert = 'INSERT INTO %s VALUES (%s)' % (quote(table), ', '.join('?' * len(names)))
+    count = 0
+    rows = iter(rows)
+    connection.execute('BEGIN')
+    try:
+        while True:
+            batch = list(itertools.islice(rows, ROWS_PER_INSERT))
+            if not batch:
+                break
+            connection.executemany(insert, batch)
+            count += len(batch)
+    except Exception:
+        connection.execute('ROLLBACK')
+        raise
+    connection.execute('COMMIT')
+    return count
+
+def create_indexes(connection, table, names):
+    for name in names:
+        connection.execute('CREATE INDEX %s ON %s (%s)' % (
+            quote('%s_%s' % (table, name)), quote(table), quote(name)))
+
+def text_columns(connection, table, names):
+    """
+    returns names of columns holding any text.
+    """
+    found = []
+    for name in names:
+        sql = 'SELECT 1 FROM %s WHERE typeof(%s) = \'text\' LIMIT 1' % (quote(table), quote(name))
+        if connection.execute(sql).fetchone():
+            found.append(name)
+    return found
+
+def create_fts(connection, table, names):
+    """
+    creates table_fts, an external content FTS5 table over columns of table.
+    returns the name of the FTS table.
+    search it by: SELECT * FROM table WHERE rowid IN
+        (SELECT rowid FROM table_fts WHERE table_fts MATCH '低温特性')
+    """
+    fts = '%s_fts' % table
+    connection.execute('DROP TABLE IF EXISTS %s' % quote(fts))
+    connection.execute("CREATE VIRTUAL TABLE %s USING fts5(%s, content=%s, tokenize='trigram')" % (
+        quote(fts), ', '.join(quote(name) for name in names), quote(table)))
+    connection.execute("INSERT INTO %s (%s) VALUES ('rebuild')" % (quote(fts), quote(fts)))
+    return fts
@@ -0,0 +1,197 @@
+#!python3
+
+import random
+import zipfile
+from xml.sax.saxutils import escape, quoteattr
+import cellrange
+import fakeexcel
+
+# kinds of columns, in the order of weights of a mix.
+KINDS = ('string', 'number', 'date')
+
+DATE_FORMAT = 'yyyy/m/d'
+
+# width of date columns, as Excel widens a column on entering a date.
+DATE_WIDTH = 10.5
+
+# 2015/4/1 as an Excel serial date.
+DATE_BASE = 42095
+
+NS_MAIN = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+NS_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+NS_PKG = 'http://schemas.openxmlformats.org/package/2006/relationships'
+REL_DOCUMENT = NS_REL + '/officeDocument'
+REL_WORKSHEET = NS_REL + '/worksheet'
+REL_STYLES = NS_REL + '/styles'
+REL_STRINGS = NS_REL + '/sharedStrings'
+REL_HYPERLINK = NS_REL + '/hyperlink'
+
+def column_kinds(cols, mix):
+    """
+    returns a kind per column, spread by weights of mix, (string, number, date).
+    the first column is always a string, as a key column is.
+    """
+    counts = dict((kind, 0) for kind in KINDS)
+    kinds = []
+    for c in range(cols):
+        candidates = [(counts[kind] / weight, k, kind)
+                      for k, (kind, weight) in enumerate(zip(KINDS, mix)) if weight > 0]
+        kind = 'string' if c == 0 else min(candidates)[2]
+        counts[kind] += 1
+        kinds.append(kind)
+    return kinds
+
+class Table(object):
+    """
+    a synthetic sheet: a header row, then rows of strings, numbers and dates.
+    dates are serial numbers formatted as DATE_FORMAT, as Excel stores them.
+    the last column has a hyperlink in a url_density share of rows.
+    the same arguments make the same table.
+    """
+    def __init__(self, rows=1000, cols=8, mix=(4, 3, 1), url_density=0.1, seed=1):
+        generator = random.Random(seed)
+        self.rows = rows
+        self.cols = cols
+        self.kinds = column_kinds(cols, mix)
+        self.data = [tuple('%s%d' % (kind, c + 1) for c, kind in enumerate(self.kinds))]
+        for r in range(rows):
+            row = []
+            for kind in self.kinds:
+                if kind == 'string':
+                    row.append('項目%d' % generator.randrange(max(rows // 4, 1)))
+                elif kind == 'number':
+                    row.append(round(generator.uniform(0, 100000), 2))
+                else:
+                    row.append(float(DATE_BASE + generator.randrange(3650)))
+            self.data.append(tuple(row))
+        self.formats = dict((c + 1, DATE_FORMAT) for c, kind in enumerate(self.kinds)
+                            if kind == 'date')
+        self.links = {}
+        for r in range(2, rows + 2):
+            if generator.random() < url_density:
+                self.links[(r, cols)] = 'http://example.com/item/%d' % r
+    
+    @property
+    def cells(self):
+        return self.rows * self.cols
+
+def fake_book(app, filename, tables):
+    """
+    registers a book of tables, sheet1, sheet2, ..., with fakeexcel.
+    """
+    book = app.Workbooks.add(filename)
+    for k, table in enumerate(tables):
+        sheet = book.add_sheet('sheet%d' % (k + 1), table.data)
+        for col, format in table.formats.items():
+            for row in range(2, table.rows + 2):
+                sheet.formats[(row, col)] = format
+            sheet.widths[col] = DATE_WIDTH
+        for (row, col), address in sorted(table.links.items()):
+            sheet.hyperlinks.append(fakeexcel.FakeHyperlink(sheet, row, col, address))
+    return book
+
+def sheet_xml(table, strings):
+    """
+    returns the worksheet part of a table, adding its strings to strings.
+    """
+    parts = ['<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n',
+             '<worksheet xmlns="%s" xmlns:r="%s"><sheetData>' % (NS_MAIN, NS_REL)]
+    letters = [cellrange.col_letters(c + 1) for c in range(table.cols)]
+    for r, row in enumerate(table.data, 1):
+        parts.append('<row r="%d">' % r)
+        for c, value in enumerate(row):
+            ref = '%s%d' % (letters[c], r)
+            if value is None:
+                continue
+            if type(value) is str:
+                index = strings.setdefault(value, len(strings))
+                parts.append('<c r="%s" t="s"><v>%d</v></c>' % (ref, index))
+            elif r > 1 and (c + 1) in table.formats:
+                parts.append('<c r="%s" s="1"><v>%r</v></c>' % (ref, value))
+            else:
+                parts.append('<c r="%s"><v>%r</v></c>' % (ref, value))
+        parts.append('</row>')
+    parts.append('</sheetData>')
+    if table.links:
+        parts.append('<hyperlinks>')
+        for k, (row, col) in enumerate(sorted(table.links)):
+            parts.append('<hyperlink ref="%s" r:id="rId%d"/>' % (
+                cellrange.cell_address(row, col), k + 1))
+        parts.append('</hyperlinks>')
+    parts.append('</worksheet>')
+    return ''.join(parts)
+
+def relationships(rels):
+    """
+    returns a relationships part of [(type, target, external)], rId1, rId2, ...
+    """
+    parts = ['<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n',
+             '<Relationships xmlns="%s">' % NS_PKG]
+    for k, (kind, target, external) in enumerate(rels):
+        parts.append('<Relationship Id="rId%d" Type="%s" Target=%s%s/>' % (
+            k + 1, kind, quoteattr(target), ' TargetMode="External"' if external else ''))
+    parts.append('</Relationships>')
+    return ''.join(parts)
+
+def write_xlsx(filename, tables):
+    """
+    writes tables into an .xlsx package, sheet1, sheet2, ...,
+    with shared strings, a date format and hyperlinks, as Excel would save them.
+    """
+    strings = {}
+    with zipfile.ZipFile(filename, 'w', zipfile.ZIP_DEFLATED) as package:
+        overrides = [
+            ('/xl/workbook.xml', 'sheet.main+xml'),
+            ('/xl/styles.xml', 'styles+xml'),
+            ('/xl/sharedStrings.xml', 'sharedStrings+xml'),
+        ]
+        sheets = []
+        book_rels = []
+        for k, table in enumerate(tables):
+            part = 'worksheets/sheet%d.xml' % (k + 1)
+            package.writestr('xl/' + part, sheet_xml(table, strings))
+            if table.links:
+                package.writestr('xl/worksheets/_rels/sheet%d.xml.rels' % (k + 1), relationships(
+                    [(REL_HYPERLINK, table.links[key], True) for key in sorted(table.links)]))
+            overrides.append(('/xl/' + part, 'worksheet+xml'))
+            sheets.append('<sheet name="sheet%d" sheetId="%d" r:id="rId%d"/>' % (
+                k + 1, k + 1, len(book_rels) + 1))
+            book_rels.append((REL_WORKSHEET, part, False))
+        book_rels.append((REL_STYLES, 'styles.xml', False))
+        book_rels.append((REL_STRINGS, 'sharedStrings.xml', False))
+        
+        package.writestr('[Content_Types].xml', ''.join(
+            ['<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n',
+             '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">',
+             '<Default Extension="rels" ContentType='
+             '"application/vnd.openxmlformats-package.relationships+xml"/>',
+             '<Default Extension="xml" ContentType="application/xml"/>'] +
+            ['<Override PartName="%s" ContentType='
+             '"application/vnd.openxmlformats-officedocument.spreadsheetml.%s"/>' % override
+             for override in overrides] + ['</Types>']))
+        package.writestr('_rels/.rels', relationships([(REL_DOCUMENT, 'xl/workbook.xml', False)]))
+        package.writestr('xl/_rels/workbook.xml.rels', relationships(book_rels))
+        package.writestr('xl/workbook.xml', ''.join(
+            ['<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n',
+             '<workbook xmlns="%s" xmlns:r="%s"><sheets>' % (NS_MAIN, NS_REL)] + sheets +
+            ['</sheets></workbook>']))
+        package.writestr('xl/styles.xml', ''.join(
+            ['<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n',
+             '<styleSheet xmlns="%s">' % NS_MAIN,
+             '<numFmts count="1"><numFmt numFmtId="164" formatCode=%s/></numFmts>' % (
+                 quoteattr(DATE_FORMAT)),
+             '<fonts count="1"><font><sz val="11"/><name val="游ゴシック"/></font></fonts>',
+             '<fills count="2"><fill><patternFill patternType="none"/></fill>',
+             '<fill><patternFill patternType="gray125"/></fill></fills>',
+             '<borders count="1"><border/></borders>',
+             '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/>'
+             '</cellStyleXfs>',
+             '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>',
+             '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" '
+             'applyNumberFormat="1"/></cellXfs>',
+             '</styleSheet>']))
+        package.writestr('xl/sharedStrings.xml', ''.join(
+            ['<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n',
+             '<sst xmlns="%s" count="%d" uniqueCount="%d">' % (NS_MAIN, len(strings),
+                                                              len(strings))] +
+            ['<si><t>%s</t></si>' % escape(text) for text in strings] + ['</sst>']))
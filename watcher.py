@@ -0,0 +1,87 @@
+#!python3
+
+import os
+import time
+
+try:
+    import win32con
+    import win32event
+    import win32file
+except ImportError:
+    # polling alone works without pywin32.
+    win32file = None
+
+def file_stat(file_name):
+    """
+    returns (size, mtime) of a file, or None if it is gone.
+    """
+    try:
+        stat = os.stat(file_name)
+    except OSError:
+        return None
+    return (stat.st_size, stat.st_mtime_ns)
+
+class Watcher(object):
+    """
+    finds books changed since converted, by polling their size and mtime.
+    a changed book is ready once it stays the same for settle seconds,
+    so a burst of writes, or a copy in progress, is converted once after it ends.
+    find: returns the file names to watch, such as find_books of a pattern.
+    books found on the first poll are all changed, as none is converted yet.
+    """
+    def __init__(self, find, settle=5.0, clock=time.monotonic):
+        self.find = find
+        self.settle = settle
+        self.clock = clock
+        self.done = {}
+        self.pending = {}
+    
+    def poll(self):
+        """
+        returns books ready to convert, those changed first first.
+        """
+        now = self.clock()
+        found = set()
+        for file_name in self.find():
+            found.add(file_name)
+            stat = file_stat(file_name)
+            if stat is None or self.done.get(file_name) == stat:
+                self.pending.pop(file_name, None)
+                continue
+            seen = self.pending.get(file_name)
+            if seen is None or seen[0] != stat:
+                # changed again; wait for it to settle from now.
+                first = seen[2] if seen else now
+                self.pending[file_name] = (stat, now, first)
+        for file_name in list(self.pending):
+            if file_name not in found:
+                del self.pending[file_name]
+        ready = [(first, file_name) for file_name, (stat, since, first) in self.pending.items()
+                 if now - since >= self.settle]
+        return [file_name for first, file_name in sorted(ready)]
+    
+    def converted(self, file_name):
+        """
+        notes a book returned by poll as converted, failed or not;
+        it is ready again when it changes again, even while it was converted.
+        """
+        entry = self.pending.pop(file_name, None)
+        if entry is not None:
+            self.done[file_name] = entry[0]
+
+def wait(folder, timeout):
+    """
+    waits for timeout seconds, or until something in folder changes
+    where pywin32 gives change notifications.
+    """
+    if win32file is None or not os.path.isdir(folder):
+        time.sleep(timeout)
+        return
+    handle = win32file.FindFirstChangeNotification(
+        folder, False,
+        win32con.FILE_NOTIFY_CHANGE_FILE_NAME | win32con.FILE_NOTIFY_CHANGE_SIZE |
+        win32con.FILE_NOTIFY_CHANGE_LAST_WRITE)
+    try:
+        win32event.WaitForSingleObject(handle, int(timeout * 1000))
+    finally:
+        win32file.FindCloseChangeNotification(handle)
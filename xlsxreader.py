@@ -0,0 +1,419 @@
+#!python3
+
+import os.path
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+from cellrange import read_cell, parse_range, absolute_address
+
+NS_MAIN = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+NS_REL = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+NS_PKG = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+# Range.Value returns these integers for error cells.
+ERROR_CODES = {
+    '#NULL!': -2146826288,
+    '#DIV/0!': -2146826281,
+    '#VALUE!': -2146826273,
+    '#REF!': -2146826265,
+    '#NAME?': -2146826259,
+    '#NUM!': -2146826252,
+    '#N/A': -2146826246,
+}
+
+class Grid(object):
+    """
+    sparse cell values of a worksheet.
+    rows are keyed by 1-based row number and hold a list of values by column.
+    """
+    def __init__(self):
+        self.rows = {}
+        self.hyperlinks = {}
+        self.max_row = 0
+        self.max_col = 0
+    
+    def set(self, row, col, value):
+        cells = self.rows.get(row)
+        if cells is None:
+            cells = self.rows[row] = []
+        if len(cells) < col:
+            cells.extend([None] * (col - len(cells)))
+        cells[col - 1] = value
+        if row > self.max_row:
+            self.max_row = row
+        if col > self.max_col:
+            self.max_col = col
+    
+    def get(self, row, col):
+        cells = self.rows.get(row)
+        if cells is None or col > len(cells):
+            return None
+        return cells[col - 1]
+    
+    def block(self, row1, col1, row2, col2):
+        """
+        returns values in bounds as a tuple of row tuples.
+        """
+        width = col2 - col1 + 1
+        blank = (None,) * width
+        data = []
+        for r in range(row1, row2 + 1):
+            cells = self.rows.get(r)
+            if cells is None:
+                data.append(blank)
+                continue
+            row = tuple(cells[col1 - 1:col2])
+            if len(row) < width:
+                row += (None,) * (width - len(row))
+            data.append(row)
+        return tuple(data)
+    
+    def row_filled(self, row, col1, col2):
+        cells = self.rows.get(row)
+        if cells is None:
+            return False
+        return any(v is not None for v in cells[max(col1, 1) - 1:col2])
+    
+    def col_filled(self, col, row1, row2):
+        if col < 1:
+            return False
+        for r in range(max(row1, 1), row2 + 1):
+            cells = self.rows.get(r)
+            if cells is not None and col <= len(cells) and cells[col - 1] is not None:
+                return True
+        return False
+    
+    def current_region(self, row, col):
+        """
+        returns bounds of the block of filled cells around the cell,
+        expanding through edges and corners as Range.CurrentRegion does.
+        """
+        row1 = row2 = row
+        col1 = col2 = col
+        changed = True
+        while changed:
+            changed = False
+            while row1 > 1 and self.row_filled(row1 - 1, col1 - 1, col2 + 1):
+                row1 -= 1
+                changed = True
+            while row2 < self.max_row and self.row_filled(row2 + 1, col1 - 1, col2 + 1):
+                row2 += 1
+                changed = True
+            while col1 > 1 and self.col_filled(col1 - 1, row1 - 1, row2 + 1):
+                col1 -= 1
+                changed = True
+            while col2 < self.max_col and self.col_filled(col2 + 1, row1 - 1, row2 + 1):
+                col2 += 1
+                changed = True
+        return (row1, col1, row2, col2)
+
+class XlsxHyperlink(object):
+    """
+    Hyperlink with an Address and the anchor Range.
+    """
+    def __init__(self, sheet, row, col, address):
+        self.Range = XlsxRange(sheet, row, col, row, col)
+        self.Address = address
+
+class XlsxHyperlinks(object):
+    """
+    Hyperlinks collection; call with a 1-based index.
+    """
+    def __init__(self, links):
+        self.links = links
+        self.Count = len(links)
+    
+    def __call__(self, index):
+        return self.links[index - 1]
+    
+    def __iter__(self):
+        return iter(self.links)
+
+class XlsxLines(object):
+    """
+    Rows or Columns of a range; call with a 1-based index.
+    """
+    def __init__(self, range, by_row):
+        self.range = range
+        self.by_row = by_row
+        r = range
+        self.Count = (r.row2 - r.row1 + 1) if by_row else (r.col2 - r.col1 + 1)
+    
+    def __call__(self, index):
+        r = self.range
+        if self.by_row:
+            row = r.row1 + index - 1
+            return XlsxRange(r.sheet, row, r.col1, row, r.col2)
+        col = r.col1 + index - 1
+        return XlsxRange(r.sheet, r.row1, col, r.row2, col)
+    
+    def __iter__(self):
+        for i in range(self.Count):
+            yield self(i + 1)
+
+class XlsxRange(object):
+    """
+    Range read from a worksheet part.
+    """
+    def __init__(self, sheet, row1, col1, row2, col2):
+        self.sheet = sheet
+        self.row1 = row1
+        self.col1 = col1
+        self.row2 = row2
+        self.col2 = col2
+    
+    @property
+    def Value(self):
+        grid = self.sheet.grid
+        if (self.row1, self.col1) == (self.row2, self.col2):
+            return grid.get(self.row1, self.col1)
+        return grid.block(self.row1, self.col1, self.row2, self.col2)
+    
+    @property
+    def Address(self):
+        return absolute_address(self.row1, self.col1, self.row2, self.col2)
+    
+    @property
+    def CurrentRegion(self):
+        bounds = self.sheet.grid.current_region(self.row1, self.col1)
+        return XlsxRange(self.sheet, *bounds)
+    
+    @property
+    def Row(self):
+        return self.row1
+    
+    @property
+    def Column(self):
+        return self.col1
+    
+    @property
+    def Rows(self):
+        return XlsxLines(self, True)
+    
+    @property
+    def Columns(self):
+        return XlsxLines(self, False)
+    
+    @property
+    def Count(self):
+        return (self.row2 - self.row1 + 1) * (self.col2 - self.col1 + 1)
+    
+    def Cells(self, row, col):
+        r = self.row1 + row - 1
+        c = self.col1 + col - 1
+        return XlsxRange(self.sheet, r, c, r, c)
+    
+    @property
+    def Hyperlinks(self):
+        links = self.sheet.grid.hyperlinks
+        found = [XlsxHyperlink(self.sheet, key[0], key[1], links[key]) for key in sorted(links)
+                 if self.row1 <= key[0] <= self.row2 and self.col1 <= key[1] <= self.col2]
+        return XlsxHyperlinks(found)
+
+class XlsxSheet(object):
+    """
+    Worksheet read lazily from its part on the first access.
+    """
+    def __init__(self, book, name, part):
+        self.book = book
+        self.Name = name
+        self.part = part
+        self._grid = None
+    
+    @property
+    def name(self):
+        return self.Name
+    
+    @property
+    def grid(self):
+        if self._grid is None:
+            self._grid = self.book.read_sheet(self.part)
+        return self._grid
+    
+    def Range(self, address):
+        return XlsxRange(self, *parse_range(address))
+    
+    def Cells(self, row, col):
+        return XlsxRange(self, row, col, row, col)
+    
+    @property
+    def UsedRange(self):
+        grid = self.grid
+        return XlsxRange(self, 1, 1, max(grid.max_row, 1), max(grid.max_col, 1))
+    
+    @property
+    def Hyperlinks(self):
+        return self.UsedRange.Hyperlinks
+
+class XlsxSheets(list):
+    """
+    Worksheets collection; indexed 0-based.
+    """
+    @property
+    def Count(self):
+        return len(self)
+
+class XlsxBook(object):
+    """
+    Workbook read from an OOXML package (.xlsx, .xlsm) without Excel.
+    only cell values and hyperlinks are read.
+    dates stay serial numbers, as Range.Value2 returns them.
+    """
+    def __init__(self, filename):
+        if not zipfile.is_zipfile(filename):
+            raise IOError('%s is not an OOXML package' % filename)
+        self.filename = filename
+        self.Name = os.path.basename(filename)
+        self.Saved = True
+        self.zip = zipfile.ZipFile(filename)
+        self.shared_strings = self.read_shared_strings()
+        self.Worksheets = self.read_sheets()
+    
+    def Close(self):
+        self.zip.close()
+    
+    def rels(self, part):
+        """
+        returns {id: (target part, external)} of the part relations.
+        """
+        folder, name = posixpath.split(part)
+        rels_part = posixpath.join(folder, '_rels', name + '.rels')
+        rels = {}
+        if rels_part not in self.zip.namelist():
+            return rels
+        root = ET.fromstring(self.zip.read(rels_part))
+        for rel in root.iter(NS_PKG + 'Relationship'):
+            target = rel.get('Target')
+            if rel.get('TargetMode') == 'External':
+                rels[rel.get('Id')] = (target, True)
+            elif target.startswith('/'):
+                rels[rel.get('Id')] = (target[1:], False)
+            else:
+                rels[rel.get('Id')] = (posixpath.normpath(posixpath.join(folder, target)), False)
+        return rels
+    
+    def read_sheets(self):
+        part = 'xl/workbook.xml'
+        rels = self.rels(part)
+        root = ET.fromstring(self.zip.read(part))
+        sheets = XlsxSheets()
+        for sheet in root.iter(NS_MAIN + 'sheet'):
+            target = rels[sheet.get(NS_REL + 'id')][0]
+            if not target.startswith('xl/worksheets/'):
+                # chart sheets and dialog sheets are not Worksheets.
+                continue
+            sheets.append(XlsxSheet(self, sheet.get('name'), target))
+        return sheets
+    
+    def read_shared_strings(self):
+        part = 'xl/sharedStrings.xml'
+        strings = []
+        if part not in self.zip.namelist():
+            return strings
+        with self.zip.open(part) as stream:
+            for event, elem in ET.iterparse(stream):
+                if elem.tag == NS_MAIN + 'si':
+                    strings.append(text_of(elem))
+                    elem.clear()
+        return strings
+    
+    def read_sheet(self, part):
+        """
+        parses a worksheet part incrementally into a Grid.
+        """
+        grid = Grid()
+        strings = self.shared_strings
+        links = []
+        row = 0
+        col = 0
+        with self.zip.open(part) as stream:
+            for event, elem in ET.iterparse(stream, ('start', 'end')):
+                tag = elem.tag
+                if event == 'start':
+                    if tag == NS_MAIN + 'row':
+                        r = elem.get('r')
+                        row = int(r) if r else row + 1
+                        col = 0
+                    continue
+                if tag == NS_MAIN + 'c':
+                    r = elem.get('r')
+                    if r:
+                        row, col = read_cell(r)
+                    else:
+                        col += 1
+                    value = cell_value(elem, strings)
+                    if value is not None:
+                        grid.set(row, col, value)
+                    elem.clear()
+                elif tag == NS_MAIN + 'row':
+                    elem.clear()
+                elif tag == NS_MAIN + 'hyperlink':
+                    links.append((elem.get('ref'), elem.get(NS_REL + 'id')))
+        if links:
+            rels = self.rels(part)
+            for ref, rid in links:
+                address = rels[rid][0] if rid in rels else ''
+                row1, col1, row2, col2 = parse_range(ref)
+                for r in range(row1, row2 + 1):
+                    for c in range(col1, col2 + 1):
+                        grid.hyperlinks[(r, c)] = address
+        return grid
+
+class XlsxWorkbooks(object):
+    """
+    Workbooks collection opening packages with XlsxBook.
+    """
+    def Open(self, filename, *args, **kwargs):
+        return XlsxBook(filename)
+
+class XlsxApp(object):
+    """
+    stands for Excel.Application as a context, without Excel.
+    """
+    def __init__(self):
+        self.Workbooks = XlsxWorkbooks()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, type, value, traceback):
+        pass
+    
+    def Quit(self):
+        pass
+
+def text_of(elem):
+    """
+    concatenates text runs of a string item, skipping phonetic runs.
+    """
+    t = elem.find(NS_MAIN + 't')
+    if t is not None:
+        return t.text or ''
+    texts = []
+    for run in elem.findall(NS_MAIN + 'r'):
+        t = run.find(NS_MAIN + 't')
+        if t is not None and t.text:
+            texts.append(t.text)
+    return ''.join(texts)
+
+def cell_value(elem, strings):
+    """
+    converts a cell element into the value Range.Value returns.
+    """
+    kind = elem.get('t', 'n')
+    if kind == 'inlineStr':
+        inline = elem.find(NS_MAIN + 'is')
+        return text_of(inline) if inline is not None else None
+    v = elem.find(NS_MAIN + 'v')
+    if v is None or v.text is None:
+        return '' if kind == 'str' and elem.find(NS_MAIN + 'f') is not None else None
+    text = v.text
+    if kind == 's':
+        return strings[int(text)]
+    if kind == 'n':
+        return float(text)
+    if kind == 'b':
+        return text == '1'
+    if kind == 'e':
+        return ERROR_CODES.get(text, text)
+    return text